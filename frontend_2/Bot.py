@@ -1,11 +1,23 @@
 from src import chess_agent
 from src import train_utils
 import chess
+import os
+import sys
+
+# Książka debiutowa budowana w model1 (openings/book.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), "../machine_learning/model1/src"))
+from openings.book import DEFAULT_BOOK, OpeningBook
 
 class Bot:
-    def __init__(self, path):
+    def __init__(self, path, book_path=DEFAULT_BOOK, book_temperature=1.0):
         self.agent = chess_agent.ChessAgent(path)
+        # Bez pliku książki każdy ruch wybiera sieć
+        self.book = OpeningBook(book_path, temperature=book_temperature) if book_path and os.path.exists(book_path) else None
 
     def move(self, state):
         board = chess.Board(state)
-        return train_utils.choose_move(self.agent, board).uci()
\ No newline at end of file
+        if self.book is not None:
+            move = self.book.choose(board)
+            if move is not None:
+                return move.uci()
+        return train_utils.choose_move(self.agent, board).uci()
@@ -1,6 +1,7 @@
 # main.py
 
 import os
+import sys
 import logging
 import chess.engine
 
@@ -9,6 +10,11 @@ from src.train_utils import test_agent
 from src.q_learning import Q_learning
 from src.train_utils import read_fen
 
+# Trwała pamięć podręczna ocen Stockfisha współdzielona z treningiem model1
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../machine_learning/model1/src"))
+from eval_cache import CachedEngine, EvalCache
+from lite_engine import open_engine, parse_spec
+
 def main():
     """
     Funkcja main inicjalizuje agenta szachowego, włącza silnik Stockfish, konfiguruje planszę i uruchamia testy.
@@ -21,23 +27,29 @@ def main():
         logger.info("Inicjalizacja agenta szachowego.")
         agent_white = ChessAgent(name="Garry Kasparov")
         agent_black = ChessAgent(name="Magnus Carlsen")
-        # Zdefiniuj ścieżkę silnika Stockfish
-        stockfish_path = os.path.join(
+        # Zdefiniuj ścieżkę silnika Stockfish (STOCKFISH_PATH="lite" wybiera wbudowany silnik zastępczy)
+        stockfish_path = os.getenv("STOCKFISH_PATH", os.path.join(
             os.path.dirname(__file__), "../stockfish/stockfish-9-64"
-        )
+        ))
         model_save_path = os.path.join(
             os.path.dirname(__file__), "../models/trained_model.pth"
         )
         fen_path = os.path.join(
             os.path.dirname(__file__), "../fen/mate_in_5.fen"
         )
-        if not os.path.exists(stockfish_path):
+        eval_cache_path = os.path.join(
+            os.path.dirname(__file__), "../stockfish/eval_cache.sqlite"
+        )
+        if parse_spec(stockfish_path) is None and not os.path.exists(stockfish_path):
             logger.error(f"Nie znaleziono silnika Stockfish: {stockfish_path}")
             return
 
         # Zainicjuj silnik Stockfish
         logger.info(f"Włączanie silnika Stockfish ze ścieżki: {stockfish_path}")
-        with chess.engine.SimpleEngine.popen_uci(stockfish_path) as stockfish:
+        with open_engine(stockfish_path) as engine:
+            # Analizy (Q_learning, generate_random_sample) korzystają z pamięci podręcznej ocen
+            eval_cache = EvalCache(eval_cache_path)
+            stockfish = CachedEngine(engine, eval_cache)
             # Zdefiniuj konfigurację planszy
             board_fen = read_fen(fen_path)
             board = chess.Board(board_fen)
@@ -58,6 +70,8 @@ def main():
             
             test_agent(agent_white=agent_white, agent_black=agent_black, games=10, board_config=board_fen)
 
+            logger.info(f"Pamięć podręczna ocen: {eval_cache.stats()}")
+            eval_cache.close()
 
     except Exception as e:
         logger.exception(f"Błąd podczas działania testów lub trenowania: {e}")
@@ -1,39 +1,295 @@
 #DATASET Z: https://github.com/lichess-org/chess-openings
 
 
-import pandas as pd
+import argparse
+import bz2
+import csv
+import gzip
+import hashlib
+import io
+import json
+import logging
+import lzma
 import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import chess
 import chess.pgn
-import io
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model1', 'src'))
+
+from keyset import KeySet, pair_key
+
+logger = logging.getLogger(__name__)
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_FILE = 'fen_moves.tsv'
+CACHE_DIR = os.path.join(dirname, 'build')
+MANIFEST = 'manifest.json'
+
+def open_text(path):
+    """
+    Otwiera plik tekstowy, rozpakowując go według rozszerzenia (.gz, .bz2, .xz, .zst).
+
+    Wyjątki:
+    - ImportError: Dla plików .zst bez zainstalowanego pakietu zstandard.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Pliki .zst wymagają pakietu zstandard (pip install zstandard)")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')),
+                                encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+def read_games(path):
+    """
+    Czyta kolejne partie z pliku jako teksty PGN, bez parsowania ruchów.
+
+    Pliki .tsv (katalog debiutów lichess) są czytane wierszami z kolumny pgn.
+
+    Zwraca:
+    - generator str: Teksty kolejnych partii.
+    """
+    if path.endswith('.tsv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f, delimiter='\t'):
+                if row.get('pgn'):
+                    yield row['pgn']
+        return
+    with open_text(path) as f:
+        lines = []
+        movetext = False
+        for line in f:
+            # Nagłówek po zapisie ruchów zaczyna następną partię
+            if line.startswith('[') and movetext:
+                yield ''.join(lines)
+                lines = []
+                movetext = False
+            if line.strip() and not line.startswith('['):
+                movetext = True
+            lines.append(line)
+        if movetext:
+            yield ''.join(lines)
+
+def game_chunks(paths, games_per_chunk=256):
+    """
+    Grupuje partie z kolejnych plików w porcje tekstu dla procesów roboczych.
+
+    Zwraca:
+    - generator str: Porcje zawierające do games_per_chunk partii.
+    """
+    chunk = []
+    for path in paths:
+        for game in read_games(path):
+            chunk.append(game)
+            if len(chunk) == games_per_chunk:
+                yield '\n\n'.join(chunk)
+                chunk = []
+    if chunk:
+        yield '\n\n'.join(chunk)
+
+def parse_games(text, max_plies=None):
+    """
+    Parsuje porcję partii do par (FEN, ruch) z kluczami deduplikacji (wykonywane w procesach roboczych).
+
+    Parametry:
+    - text (str): Porcja tekstu PGN.
+    - max_plies (int, opcjonalnie): Liczba początkowych półruchów partii (domyślnie wszystkie).
+
+    Zwraca:
+    - (list, list, np.ndarray, int): FEN-y, ruchy UCI, klucze uint64 i liczba partii.
+    """
+    handle = io.StringIO(text)
+    fens, moves, keys = [], [], []
+    games = 0
+    while True:
+        # BoardBuilder pomija warianty i nie buduje drzewa partii
+        final_board = chess.pgn.read_game(handle, Visitor=chess.pgn.BoardBuilder)
+        if final_board is None:
+            break
+        games += 1
+        board = final_board.root()
+        for move in final_board.move_stack[:max_plies]:
+            fen, uci = board.fen(), move.uci()
+            fens.append(fen)
+            moves.append(uci)
+            keys.append(pair_key(fen, uci))
+            board.push(move)
+    return fens, moves, np.array(keys, dtype=np.uint64), games
+
+def _map_ordered(function, items, workers, *args):
+    """
+    Wykonuje function na kolejnych elementach w puli procesów z ograniczoną liczbą zadań w toku.
+
+    Zwraca:
+    - generator: Wyniki w kolejności elementów.
+    """
+    if workers == 0:
+        for item in items:
+            yield function(item, *args)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(function, item, *args))
+        while pending:
+            yield pending.popleft().result()
+
+def extract(paths, output_path, workers=None, games_per_chunk=256, max_plies=None, seen=None):
+    """
+    Strumieniowo wyodrębnia unikalne pary (FEN, ruch) z plików PGN i zapisuje je do TSV.
+
+    Parsowanie odbywa się w puli workers procesów, a wynik jest dopisywany do pliku porcjami
+    w kolejności partii, więc pamięć zależy tylko od liczby unikalnych kluczy (8 bajtów na parę).
+    Para jest pomijana, jeśli ta sama pozycja (bez liczników ruchów) z tym samym ruchem już wystąpiła.
+
+    Parametry:
+    - paths (lista str): Pliki .pgn (również .gz, .bz2, .xz, .zst) lub .tsv z kolumną pgn.
+    - output_path (str): Plik wynikowy TSV (kolumny FEN i Move), podmieniany atomowo.
+    - workers (int, opcjonalnie): Liczba procesów (domyślnie liczba rdzeni, 0 parsuje w bieżącym procesie).
+    - games_per_chunk (int): Liczba partii w porcji dla procesu roboczego.
+    - max_plies (int, opcjonalnie): Liczba początkowych półruchów każdej partii.
+    - seen (KeySet, opcjonalnie): Klucze już zapisanych par (pomijane); uzupełniany o nowe.
+
+    Zwraca:
+    - dict: Liczba partii, wszystkich par i zapisanych (unikalnych) par.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if seen is None:
+        seen = KeySet()
+    stats = {'games': 0, 'positions': 0, 'unique': 0}
+    temporary_path = f"{output_path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as out:
+        out.write('FEN\tMove\n')
+        for fens, moves, keys, games in _map_ordered(parse_games, game_chunks(paths, games_per_chunk), workers, max_plies):
+            new = seen.add(keys)
+            out.writelines(f"{fen}\t{move}\n" for fen, move, is_new in zip(fens, moves, new) if is_new)
+            stats['games'] += games
+            stats['positions'] += len(fens)
+            stats['unique'] += int(new.sum())
+    os.replace(temporary_path, output_path)
+    logger.info(f"Partie: {stats['games']}, pary (FEN, ruch): {stats['positions']}, unikalne: {stats['unique']}")
+    return stats
+
+def file_hash(path):
+    """
+    Zwraca skrót SHA-256 zawartości pliku (czytanego blokami).
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+def build(paths, output_path, cache_dir=CACHE_DIR, workers=None, games_per_chunk=256, max_plies=None, rebuild=False):
+    """
+    Przyrostowo buduje plik (FEN, ruch) z wielu plików wejściowych.
 
+    Dla każdego wejścia w manifeście cache_dir zapisywany jest skrót SHA-256 jego zawartości i plik
+    jego unikalnych par; ponownie wyodrębniane są tylko wejścia nowe lub zmienione. Wynik to złączenie
+    par wejść w podanej kolejności, deduplikowane między wejściami po kluczach par (bez parsowania
+    partii), więc zmiana jednego wejścia zmienia tylko jego fragment pliku wynikowego.
 
-tsv_files = [f for f in os.listdir("./") if f.endswith('tsv')]
+    Parametry:
+    - paths (lista str): Pliki wejściowe (jak w extract).
+    - output_path (str): Plik wynikowy TSV.
+    - cache_dir (str): Katalog par poszczególnych wejść i manifestu.
+    - workers, games_per_chunk, max_plies: Jak w extract.
+    - rebuild (bool): Jeśli True, wszystkie wejścia są wyodrębniane od nowa.
 
-dataframes = []
-for file in tsv_files:
-    file_path = os.path.join("./", file)
-    df = pd.read_csv(file_path, sep="\t")
-    dataframes.append(df)
+    Zwraca:
+    - dict: Zapisany manifest (skróty wejść i pliku wynikowego, lista ponownie wyodrębnionych wejść).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    config = {'max_plies': max_plies}
+    previous = _read_manifest(cache_dir)
+    cached = previous.get('inputs', {}) if previous.get('config') == config and not rebuild else {}
 
-combined_data = pd.concat(dataframes, ignore_index=True)
-pgn_list = combined_data['pgn'].tolist()
+    inputs = {}
+    extracted = []
+    for path in paths:
+        name = os.path.abspath(path)
+        digest = file_hash(path)
+        entry = cached.get(name)
+        if entry is None or entry['sha256'] != digest or not os.path.isfile(os.path.join(cache_dir, entry['pairs'])):
+            pairs = f"{os.path.basename(path)}.{hashlib.sha256(name.encode()).hexdigest()[:8]}.tsv"
+            stats = extract([path], os.path.join(cache_dir, pairs), workers=workers,
+                            games_per_chunk=games_per_chunk, max_plies=max_plies)
+            entry = dict(stats, sha256=digest, pairs=pairs)
+            extracted.append(name)
+        inputs[name] = entry
 
-fen_moves = []
+    # Złączenie par wejść z deduplikacją między wejściami
+    seen = KeySet()
+    temporary_path = f"{output_path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as out:
+        out.write('FEN\tMove\n')
+        for entry in inputs.values():
+            with open(os.path.join(cache_dir, entry['pairs']), encoding='utf-8') as f:
+                next(f)
+                while True:
+                    lines = [line for _, line in zip(range(65536), f)]
+                    if not lines:
+                        break
+                    keys = np.fromiter((pair_key(*line.rstrip('\n').split('\t')) for line in lines),
+                                       dtype=np.uint64, count=len(lines))
+                    out.writelines(line for line, is_new in zip(lines, seen.add(keys)) if is_new)
+    os.replace(temporary_path, output_path)
 
-for pgn in pgn_list:
-    if not isinstance(pgn, str):
-        continue
-    game = chess.pgn.read_game(io.StringIO(pgn))
-    if not game:
-        continue
-    board = game.board()
-    for move in game.mainline_moves():
-        fen_moves.append((board.fen(), str(move)))
-        board.push(move)
+    manifest = {'config': config, 'inputs': inputs, 'extracted': extracted,
+                'output': {'path': os.path.abspath(output_path), 'sha256': file_hash(output_path), 'pairs': len(seen)}}
+    _write_manifest(cache_dir, manifest)
+    # Pliki par wejść, których już nie ma
+    referenced = {MANIFEST} | {entry['pairs'] for entry in inputs.values()}
+    for name in os.listdir(cache_dir):
+        if name.endswith('.tsv') and name not in referenced:
+            os.remove(os.path.join(cache_dir, name))
+    logger.info(f"Wyodrębniono ponownie {len(extracted)} z {len(inputs)} wejść, zapisano {len(seen)} par do {output_path}")
+    return manifest
 
-fen_moves_df = pd.DataFrame(fen_moves, columns=['FEN', 'Move'])
+def main():
+    parser = argparse.ArgumentParser(description='Wyodrębnij pary (FEN, ruch) z partii PGN do fen_moves.tsv')
+    parser.add_argument('inputs', nargs='*', help='Pliki .pgn[.gz|.bz2|.xz|.zst] lub .tsv z kolumną pgn '
+                                                  '(domyślnie katalog debiutów *.tsv obok skryptu)')
+    parser.add_argument('--output', type=str, default=os.path.join(dirname, OUTPUT_FILE), help='Plik wynikowy TSV')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów parsujących (domyślnie liczba rdzeni)')
+    parser.add_argument('--games_per_chunk', type=int, default=256, help='Liczba partii w porcji dla procesu roboczego')
+    parser.add_argument('--max_plies', type=int, default=None, help='Liczba początkowych półruchów każdej partii')
+    parser.add_argument('--cache_dir', type=str, default=CACHE_DIR, help='Katalog par poszczególnych wejść (budowanie przyrostowe)')
+    parser.add_argument('--rebuild', action='store_true', help='Wyodrębnij wszystkie wejścia od nowa')
+    args = parser.parse_args()
 
-fen_moves_df = fen_moves_df.drop_duplicates()
-fen_moves_output_file = "./fen_moves.tsv"
-fen_moves_df.to_csv(fen_moves_output_file, sep="\t", index=False)
+    logging.basicConfig(level=logging.INFO)
+    inputs = args.inputs or sorted(os.path.join(dirname, name) for name in os.listdir(dirname)
+                                   if name.endswith('.tsv') and name != OUTPUT_FILE)
+    build(inputs, args.output, cache_dir=args.cache_dir, workers=args.workers, games_per_chunk=args.games_per_chunk,
+          max_plies=args.max_plies, rebuild=args.rebuild)
 
+if __name__ == "__main__":
+    main()
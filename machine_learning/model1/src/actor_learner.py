@@ -0,0 +1,318 @@
+# actor_learner.py
+
+import logging
+import queue
+import random
+import sys
+import time
+import traceback
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from agent import ChessAgent
+from environment import ChessEnvironment
+from eval_cache import EvalCache
+from model import LuigiCNN
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+# Czas oczekiwania (s) na kolejkę przy sprawdzaniu sygnału zatrzymania
+POLL_INTERVAL = 0.5
+
+class ActorFailure:
+    def __init__(self, actor_id, error):
+        """
+        Wiadomość o zakończeniu aktora błędem (zamiast sygnału zakończenia None).
+
+        Parametry:
+        - actor_id (int): Numer aktora.
+        - error (str): Ślad wyjątku.
+        """
+        self.actor_id = actor_id
+        self.error = error
+
+def episode_to_message(actor_id, version, total_reward, episode):
+    """
+    Pakuje epizod z bufora trajektorii w tensory przesyłane przez kolejkę we współdzielonej pamięci.
+
+    Parametry:
+    - actor_id (int): Numer aktora.
+    - version (int): Wersja wag, którymi rozegrano epizod.
+    - total_reward (float): Całkowita nagroda epizodu.
+    - episode (krotka): Epizod w formacie TrajectoryBuffer.episodes.
+
+    Zwraca:
+    - tuple: Wiadomość dla procesu uczącego.
+    """
+    states, legal_indices, actions, rewards = episode
+    lengths = np.array([len(indices) for indices in legal_indices], dtype=np.int64)
+    flat_indices = np.concatenate(legal_indices) if legal_indices else np.empty(0, dtype=np.int16)
+    return (actor_id, version, total_reward,
+            torch.from_numpy(states.view(np.int64)),
+            torch.from_numpy(flat_indices.astype(np.int16)),
+            torch.from_numpy(lengths),
+            torch.from_numpy(actions),
+            torch.from_numpy(rewards))
+
+def message_to_episode(message):
+    """
+    Odtwarza epizod z wiadomości (kopiując dane z pamięci współdzielonej).
+
+    Zwraca:
+    - (int, int, float, tuple): Numer aktora, wersja wag, całkowita nagroda i epizod (stany, indeksy, akcje, nagrody).
+    """
+    actor_id, version, total_reward, states, flat_indices, lengths, actions, rewards = message
+    legal_indices = np.split(flat_indices.numpy().copy(), np.cumsum(lengths.numpy())[:-1]) if len(lengths) else []
+    episode = (states.numpy().view(np.uint64).copy(), legal_indices, actions.numpy().copy(), rewards.numpy().copy())
+    return actor_id, version, total_reward, episode
+
+def _actor_main(actor_id, config, shared_model, version, weights_lock, trajectories, stop_event, epsilon, depth):
+    """
+    Pętla procesu aktora: odświeża wagi, rozgrywa epizody i wysyła trajektorie do procesu uczącego.
+
+    Błąd aktora (także przy uruchamianiu silnika) jest przekazywany uczniowi jako ActorFailure,
+    a proces kończy się kodem 1.
+    """
+    # Import lokalny: training importuje ten moduł
+    from training import play_episode
+
+    torch.set_num_threads(1)
+    torch.manual_seed(config['seed'] + actor_id)
+    np.random.seed(config['seed'] + actor_id)
+    random.seed(config['seed'] + actor_id)
+
+    agent, env, error = None, None, None
+    try:
+        # Agent aktora nie aktualizuje sieci: epizody zostają w buforze i są wysyłane
+        agent = ChessAgent(agent_color=config['agent_color'], device='cpu', update_every=float('inf'),
+                           inference_backend=config['inference_backend'])
+        eval_cache = EvalCache(config['eval_cache_path']) if config['eval_cache_path'] else None
+        env = ChessEnvironment(agent_color=config['agent_color'], stockfish_path=config['stockfish_path'],
+                               eval_cache=eval_cache)
+        local_version = -1
+        while not stop_event.is_set():
+            if version.value != local_version:
+                with weights_lock:
+                    agent.model.load_state_dict(shared_model.state_dict())
+                    local_version = version.value
+            if env.stockfish_depth != depth.value:
+                env.set_depth(depth.value)
+
+            total_reward = play_episode(agent, env, max_moves=config['max_moves'], epsilon=epsilon.value, verbose=False,
+                                        adjudicator=config['adjudicator'])
+            for episode in agent.buffer.episodes:
+                message = episode_to_message(actor_id, local_version, total_reward, episode)
+                while not stop_event.is_set():
+                    try:
+                        trajectories.put(message, timeout=POLL_INTERVAL)
+                        break
+                    except queue.Full:
+                        continue
+            agent.buffer.clear()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Aktor {actor_id} zakończony błędem: {e}")
+        error = traceback.format_exc()
+    finally:
+        if config['adjudicator'] is not None and config['adjudicator'].games:
+            logger.info(f"Aktor {actor_id}, rozstrzyganie partii: {config['adjudicator'].summary()}")
+        if env is not None:
+            env.close()
+        if agent is not None:
+            agent.close_mcts()
+        # Sygnał zakończenia pracy aktora (z opisem błędu, jeśli wystąpił); ponawiany do sygnału zatrzymania
+        while True:
+            try:
+                trajectories.put(ActorFailure(actor_id, error) if error else None, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                if stop_event.is_set():
+                    break
+    if error:
+        sys.exit(1)
+
+class ActorLearner:
+    def __init__(self, agent, num_actors, stockfish_path=None, max_moves=100, max_staleness=2,
+                 queue_size=None, seed=0, eval_cache_path=None, adjudicator=None):
+        """
+        Inicjalizuje tryb aktor–uczeń: num_actors procesów rozgrywa partie ze Stockfishem,
+        a bieżący proces (uczeń) aktualizuje sieć agenta na podstawie otrzymanych trajektorii.
+
+        Wagi publikowane są po każdej aktualizacji w modelu we współdzielonej pamięci; aktorzy
+        odświeżają je przed każdym epizodem. Trajektorie rozegrane wagami starszymi o więcej niż
+        max_staleness aktualizacji są odrzucane.
+
+        Parametry:
+        - agent (ChessAgent): Agent ucznia (jego update_every i profiler są używane przy aktualizacji).
+        - num_actors (int): Liczba procesów aktorów.
+        - stockfish_path (str): Ścieżka do silnika Stockfish (każdy aktor uruchamia własny).
+        - max_moves (int): Maksymalna liczba półruchów na partię.
+        - max_staleness (int): Maksymalna różnica wersji wag między uczniem a trajektorią.
+        - queue_size (int, opcjonalnie): Pojemność kolejki trajektorii (domyślnie 2 * num_actors).
+        - seed (int): Ziarno generatorów liczb losowych aktorów.
+        - eval_cache_path (str, opcjonalnie): Plik SQLite pamięci podręcznej ocen współdzielonej przez aktorów.
+        - adjudicator (Adjudicator, opcjonalnie): Reguły wczesnego rozstrzygania partii (każdy aktor ma kopię i własne statystyki).
+        """
+        self.agent = agent
+        self.num_actors = num_actors
+        self.max_staleness = max_staleness
+        self.config = {
+            'agent_color': agent.agent_color,
+            'stockfish_path': stockfish_path,
+            'max_moves': max_moves,
+            'inference_backend': agent.inference_backend,
+            'seed': seed,
+            'eval_cache_path': eval_cache_path,
+            'adjudicator': adjudicator
+        }
+        self.version = 0
+        self.accepted = 0
+        self.dropped = 0
+
+        ctx = mp.get_context('spawn')
+        self.shared_model = LuigiCNN(action_channels=agent.action_channels)
+        self.shared_model.load_state_dict(agent.model.state_dict())
+        self.shared_model.share_memory()
+        self._version = ctx.Value('l', 0)
+        self._weights_lock = ctx.Lock()
+        self._trajectories = ctx.Queue(maxsize=queue_size or 2 * num_actors)
+        self._stop_event = ctx.Event()
+        self._epsilon = ctx.Value('d', 1.0)
+        self._depth = ctx.Value('i', 5)
+        self._actors = [
+            ctx.Process(target=_actor_main, daemon=True,
+                        args=(actor_id, self.config, self.shared_model, self._version, self._weights_lock,
+                              self._trajectories, self._stop_event, self._epsilon, self._depth))
+            for actor_id in range(num_actors)
+        ]
+        self._running = 0
+
+    def start(self):
+        """
+        Uruchamia procesy aktorów.
+        """
+        for actor in self._actors:
+            actor.start()
+        self._running = len(self._actors)
+        logger.info(f"Uruchomiono {self.num_actors} aktorów (maks. opóźnienie wag: {self.max_staleness}).")
+
+    def set_epsilon(self, epsilon):
+        """
+        Ustawia epsilon używany przez aktorów w kolejnych epizodach.
+        """
+        self._epsilon.value = epsilon
+
+    def set_depth(self, depth):
+        """
+        Ustawia głębokość Stockfisha aktorów w kolejnych epizodach.
+        """
+        self._depth.value = depth
+
+    def collect(self, num_episodes):
+        """
+        Odbiera num_episodes aktualnych epizodów i aktualizuje sieć co agent.update_every epizodów.
+
+        Parametry:
+        - num_episodes (int): Liczba epizodów do przyjęcia.
+
+        Zwraca:
+        - lista float: Całkowite nagrody przyjętych epizodów.
+
+        Wyjątki:
+        - RuntimeError: Jeśli aktor zakończył się błędem lub wszyscy aktorzy zakończyli pracę.
+        """
+        rewards = []
+        while len(rewards) < num_episodes:
+            if self._running == 0:
+                raise RuntimeError("Wszyscy aktorzy zakończyli pracę.")
+            try:
+                with self.agent.profiler.phase('queue_wait'):
+                    message = self._trajectories.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                self._check_actors()
+                continue
+            except (OSError, EOFError) as e:
+                # Pamięć współdzielona wiadomości zniknęła razem z zakończonym aktorem
+                logger.warning(f"Nie udało się odebrać trajektorii: {e}")
+                continue
+            if message is None:
+                self._running -= 1
+                continue
+            if isinstance(message, ActorFailure):
+                self._running -= 1
+                raise RuntimeError(f"Aktor {message.actor_id} zakończony błędem:\n{message.error}")
+
+            actor_id, version, total_reward, episode = message_to_episode(message)
+            staleness = self.version - version
+            if staleness > self.max_staleness:
+                self.dropped += 1
+                logger.debug(f"Odrzucono epizod aktora {actor_id} (opóźnienie wag: {staleness}).")
+                continue
+
+            self.accepted += 1
+            rewards.append(total_reward)
+            self.agent.buffer.add_episode(*episode)
+            if len(self.agent.buffer) >= self.agent.update_every:
+                with self.agent.profiler.phase('learn'):
+                    self.agent.learn()
+                self.publish()
+        return rewards
+
+    def _check_actors(self):
+        """
+        Sprawdza procesy aktorów, gdy kolejka jest pusta (sygnał zakończenia aktora mógł nie dotrzeć).
+
+        Wyjątki:
+        - RuntimeError: Jeśli aktor zakończył się niezerowym kodem wyjścia lub żaden aktor nie działa.
+        """
+        for actor_id, actor in enumerate(self._actors):
+            if not actor.is_alive() and actor.exitcode:
+                self._running = 0
+                raise RuntimeError(f"Aktor {actor_id} zakończony błędem (kod wyjścia {actor.exitcode}).")
+        if not any(actor.is_alive() for actor in self._actors):
+            self._running = 0
+            raise RuntimeError("Wszyscy aktorzy zakończyli pracę.")
+
+    def publish(self):
+        """
+        Kopiuje aktualne wagi agenta do modelu we współdzielonej pamięci i zwiększa wersję wag.
+        """
+        with self._weights_lock:
+            self.shared_model.load_state_dict(self.agent.model.state_dict())
+            self.version += 1
+            self._version.value = self.version
+
+    def close(self, timeout=10.0):
+        """
+        Zatrzymuje aktorów: sygnalizuje zatrzymanie, opróżnia kolejkę do ich zakończenia,
+        a procesy niekończące się w czasie timeout kończy siłą.
+        """
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        while any(actor.is_alive() for actor in self._actors) and time.monotonic() < deadline:
+            # Opróżnianie kolejki pozwala aktorom zakończyć wysyłanie i wyjść
+            self._drain()
+            for actor in self._actors:
+                actor.join(timeout=0.05)
+        for actor in self._actors:
+            if actor.is_alive():
+                logger.warning(f"Aktor {actor.pid} nie zakończył się w czasie {timeout} s. Wymuszanie zakończenia.")
+                actor.terminate()
+                actor.join()
+        self._drain()
+        self._running = 0
+        logger.info(f"Aktorzy zatrzymani. Przyjęte epizody: {self.accepted}, odrzucone (zbyt stare wagi): {self.dropped}.")
+
+    def _drain(self):
+        """
+        Usuwa oczekujące wiadomości z kolejki trajektorii.
+        """
+        while True:
+            try:
+                self._trajectories.get_nowait()
+            except queue.Empty:
+                return
+            except (OSError, EOFError):
+                continue  # Wiadomość od zakończonego aktora
@@ -0,0 +1,157 @@
+# adjudication.py
+
+import logging
+import chess
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+# Ocena matowa zwracana przez ChessEnvironment
+MATE_EVAL = 100000
+
+class GameAdjudication:
+    """
+    Stan rozstrzygania jednej partii (liczniki kolejnych ocen spełniających reguły).
+    """
+    def __init__(self, agent_color):
+        self.agent_color = agent_color
+        self.winning = 0
+        self.losing = 0
+        self.drawish = 0
+        self.result = None
+        self.reason = None
+
+class Adjudicator:
+    def __init__(self, win_threshold=1000, win_evals=4, mate_immediate=True,
+                 draw_threshold=20, draw_evals=10, draw_after=80, max_moves=100):
+        """
+        Inicjalizuje reguły wczesnego rozstrzygania partii treningowych na podstawie ocen Stockfisha.
+
+        Partia kończy się wygraną lub poddaniem agenta, gdy ocena z jego perspektywy przez win_evals
+        kolejnych ocen przekracza +-win_threshold (ocena matowa rozstrzyga od razu, jeśli mate_immediate),
+        oraz remisem, gdy po draw_after półruchach ocena przez draw_evals kolejnych ocen mieści się
+        w +-draw_threshold. Wynik rozstrzygnięcia trafia do calculate_end_game_reward jak wynik partii.
+        Statystyki szacują zaoszczędzone półruchy i czas (względem gry do max_moves półruchów).
+
+        Parametry:
+        - win_threshold (int): Próg przewagi w centypionach (None wyłącza regułę wygranej/poddania).
+        - win_evals (int): Liczba kolejnych ocen powyżej progu potrzebna do rozstrzygnięcia.
+        - mate_immediate (bool): Czy wykryty mat rozstrzyga partię od razu.
+        - draw_threshold (int): Próg oceny remisowej w centypionach (None wyłącza regułę remisu).
+        - draw_evals (int): Liczba kolejnych ocen w progu remisowym.
+        - draw_after (int): Liczba półruchów, po której możliwy jest remis.
+        - max_moves (int): Limit półruchów partii (do szacowania oszczędności).
+        """
+        self.win_threshold = win_threshold
+        self.win_evals = win_evals
+        self.mate_immediate = mate_immediate
+        self.draw_threshold = draw_threshold
+        self.draw_evals = draw_evals
+        self.draw_after = draw_after
+        self.max_moves = max_moves
+        self.reset_stats()
+
+    def start_game(self, agent_color):
+        """
+        Rozpoczyna śledzenie nowej partii.
+
+        Parametry:
+        - agent_color (chess.Color): Kolor agenta.
+
+        Zwraca:
+        - GameAdjudication: Stan partii przekazywany do update i end_game.
+        """
+        return GameAdjudication(agent_color)
+
+    def update(self, game, board, evaluation):
+        """
+        Uwzględnia nową ocenę pozycji i sprawdza, czy partię można rozstrzygnąć.
+
+        Parametry:
+        - game (GameAdjudication): Stan partii.
+        - board (chess.Board): Oceniana pozycja.
+        - evaluation (int lub None): Ocena w centypionach z perspektywy strony na ruchu (jak w ChessEnvironment).
+
+        Zwraca:
+        - str lub None: Wynik partii ('1-0', '0-1', '1/2-1/2'), jeśli została rozstrzygnięta.
+        """
+        if game.result is not None:
+            return game.result
+        if evaluation is None or board.is_game_over():
+            return None
+        agent_eval = evaluation if board.turn == game.agent_color else -evaluation
+
+        if self.win_threshold is not None:
+            game.winning = game.winning + 1 if agent_eval >= self.win_threshold else 0
+            game.losing = game.losing + 1 if agent_eval <= -self.win_threshold else 0
+            mate = self.mate_immediate and abs(agent_eval) >= MATE_EVAL
+            if game.winning >= self.win_evals or (mate and agent_eval > 0):
+                return self._decide(game, game.agent_color, 'mat' if mate else 'przewaga')
+            if game.losing >= self.win_evals or (mate and agent_eval < 0):
+                return self._decide(game, not game.agent_color, 'mat' if mate else 'poddanie')
+
+        if self.draw_threshold is not None:
+            in_draw_range = abs(agent_eval) <= self.draw_threshold and len(board.move_stack) >= self.draw_after
+            game.drawish = game.drawish + 1 if in_draw_range else 0
+            if game.drawish >= self.draw_evals:
+                return self._decide(game, None, 'remis')
+        return None
+
+    def end_game(self, game, plies, seconds=0.0):
+        """
+        Zapisuje statystyki zakończonej partii.
+
+        Parametry:
+        - game (GameAdjudication): Stan partii.
+        - plies (int): Liczba rozegranych półruchów.
+        - seconds (float): Czas rozgrywki partii w sekundach.
+        """
+        self.games += 1
+        self.plies += plies
+        self.seconds += seconds
+        if game.result is not None:
+            self.adjudicated[game.reason] = self.adjudicated.get(game.reason, 0) + 1
+            self.plies_saved += max(self.max_moves - plies, 0)
+
+    def stats(self):
+        """
+        Zwraca statystyki rozstrzygnięć i szacowane oszczędności.
+
+        Zwraca:
+        - dict: Liczba partii, rozstrzygnięcia według powodu, średnia długość partii, zaoszczędzone półruchy
+          (górna granica względem max_moves) i szacowany zaoszczędzony czas (według średniego czasu półruchu).
+        """
+        seconds_per_ply = self.seconds / self.plies if self.plies else 0.0
+        return {
+            'games': self.games,
+            'adjudicated': dict(self.adjudicated),
+            'mean_plies': self.plies / self.games if self.games else 0.0,
+            'plies_saved': self.plies_saved,
+            'plies_saved_fraction': self.plies_saved / (self.plies + self.plies_saved) if self.plies_saved else 0.0,
+            'seconds_saved': self.plies_saved * seconds_per_ply
+        }
+
+    def summary(self):
+        """
+        Zwraca opis statystyk do logów.
+        """
+        stats = self.stats()
+        return (f"rozstrzygnięte partie: {sum(stats['adjudicated'].values())}/{stats['games']} {stats['adjudicated']}, "
+                f"średnia długość {stats['mean_plies']:.1f} półruchów, zaoszczędzone do {stats['plies_saved']} półruchów "
+                f"({100 * stats['plies_saved_fraction']:.1f}%), ok. {stats['seconds_saved']:.1f} s")
+
+    def reset_stats(self):
+        self.games = 0
+        self.plies = 0
+        self.seconds = 0.0
+        self.plies_saved = 0
+        self.adjudicated = {}
+
+    def _decide(self, game, winner, reason):
+        if winner is None:
+            game.result = '1/2-1/2'
+        else:
+            game.result = '1-0' if winner == chess.WHITE else '0-1'
+        game.reason = reason
+        logger.debug(f"Partia rozstrzygnięta ({reason}): {game.result}")
+        return game.result
@@ -5,14 +5,22 @@ import chess
 import torch
 import torch.nn.functional as F
 import random
-from model import LuigiCNN
+from model import LuigiCNN, LuigiPolicy, training_autocast
 from chess_utils import (
     index_to_move,
     move_to_index,
     board_to_tensor,
-    get_action_mask
+    encode_batch,
+    legal_move_indices,
+    indices_to_mask,
+    get_action_mask_batch,
+    board_masks,
+    bitboards_to_planes
 )
 from mcts_interface import MCTSInterface
+from trajectory_buffer import TrajectoryBuffer
+from profiler import NULL_PROFILER
+from quantization import model_state_dict_from_checkpoint, quantize_model, quantized_template
 import logging
 from torch.distributions import Categorical
 
@@ -20,8 +28,40 @@ from torch.distributions import Categorical
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+def legal_policy(logits, legal_indices):
+    """
+    Tworzy rozkład kategoryczny wyłącznie nad legalnymi akcjami.
+
+    Zamiast kopiować cały wektor 4096 logitów i nadpisywać nielegalne pola,
+    wybiera tylko logity o podanych indeksach.
+
+    Parametry:
+    - logits (torch.Tensor): Logity polityki dla jednej pozycji (dowolny kształt o 4096 elementach).
+    - legal_indices (np.ndarray lub torch.Tensor): Indeksy legalnych akcji.
+
+    Zwraca:
+    - (Categorical, torch.Tensor): Rozkład nad legalnymi akcjami oraz tensor indeksów akcji (long).
+    """
+    indices = torch.as_tensor(legal_indices, device=logits.device).long()
+    return Categorical(logits=logits.reshape(-1).index_select(0, indices)), indices
+
+def masked_log_softmax(logits, mask):
+    """
+    Oblicza log-softmax dla partii pozycji z pominięciem nielegalnych akcji.
+
+    Parametry:
+    - logits (torch.Tensor): Logity polityki o kształcie [N, 4096].
+    - mask (torch.Tensor): Maska bool [N, 4096] (np. z get_action_mask_batch).
+
+    Zwraca:
+    - torch.Tensor: Logarytmy prawdopodobieństw [N, 4096]; nielegalne akcje mają bardzo małe wartości.
+    """
+    return F.log_softmax(logits.masked_fill(~mask.to(logits.device), -1e9), dim=-1)
+
 class ChessAgent:
-    def __init__(self, lr=1e-4, gamma=0.99, entropy_coef=0.01, agent_color=chess.WHITE, device='cpu', mcts_binary_path=None):
+    def __init__(self, lr=1e-4, gamma=0.99, entropy_coef=0.01, agent_color=chess.WHITE, device='cpu', mcts_binary_path=None,
+                 position_cache=None, update_every=1, update_batch_size=256, inference_backend=None,
+                 mixed_precision=False, profiler=None, opening_book=None):
         """
         Inicjalizuje ChessAgent.
 
@@ -32,6 +72,16 @@ class ChessAgent:
         - agent_color (chess.Color): Kolor agenta (chess.WHITE lub chess.BLACK).
         - device (str): Urządzenie do uruchamiania modelu ('cpu' lub 'cuda').
         - mcts_binary_path (str, opcjonalnie): Ścieżka do wykonywalnego pliku binarnego MCTS w C++. Jeśli None, MCTS jest wyłączony.
+        - position_cache (PositionCache, opcjonalnie): Pamięć podręczna kodowań i legalnych ruchów pozycji.
+        - update_every (int): Liczba zakończonych epizodów między aktualizacjami sieci.
+        - update_batch_size (int): Maksymalna liczba pozycji w jednym przejściu sieci podczas aktualizacji.
+        - inference_backend (str, opcjonalnie): Sposób wykonania sieci przy wyborze ruchu: None (eager),
+          'compile' (torch.compile) lub 'trace' (TorchScript). Skompilowany graf jest tworzony raz i buforowany.
+        - mixed_precision (bool): Jeśli True, przejście sieci w learn() liczone jest w autocast bfloat16
+          (wagi, softmax i straty pozostają float32).
+        - profiler (PhaseProfiler, opcjonalnie): Profiler faz (kodowanie, przejście sieci, aktualizacja).
+        - opening_book (OpeningBook, opcjonalnie): Książka debiutowa sprawdzana w select_move przed eksploracją epsilon i siecią
+          (temperatura losowania ustawiana w książce).
         """
         self.device = device
         self.action_channels = 1  # Zmieniono z 10 na 1
@@ -41,46 +91,209 @@ class ChessAgent:
         self.entropy_coef = entropy_coef
         self.agent_color = agent_color
         self.mcts_interface = MCTSInterface(mcts_binary_path=mcts_binary_path) if mcts_binary_path else None
+        self.position_cache = position_cache
+        self.opening_book = opening_book
+
+        # Bufor trajektorii: stany, legalne akcje, wybrane akcje i nagrody (bez grafów autograd)
+        self.buffer = TrajectoryBuffer()
+        self.update_every = update_every
+        self.update_batch_size = update_batch_size
+        self.mixed_precision = mixed_precision
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
 
-        # Przechowywanie logarytmicznych prawdopodobieństw i nagród
-        self.log_probs = []
-        self.rewards = []
+        # Ścieżka inferencji (tryb eval, bez autograd), tworzona leniwie przy pierwszym wyborze ruchu
+        self.inference_backend = inference_backend
+        self._inference_model = None
 
+        # Model skwantyzowany (int8) służy wyłącznie do gry na CPU
+        self.quantized = False
 
 
 
 
 
-    def select_move(self, board, epsilon=0.1):
+
+    def select_move(self, board, epsilon=0.1, encoder=None):
         """
         Wybiera ruch za pomocą polityki sieci i MCTS, jeśli jest dostępny, z wykorzystaniem strategii epsilon-zachłannej.
+        Pozycje z książki debiutowej (opening_book) są rozgrywane bez przejścia sieci i bez eksploracji epsilon.
 
         Parametry:
         - board (chess.Board): Aktualna plansza gry.
         - epsilon (float): Prawdopodobieństwo wybrania losowego ruchu (strategia epsilon-zachłanna).
+        - encoder (IncrementalEncoder, opcjonalnie): Koder przyrostowy związany z planszą; jeśli podany,
+          stan nie jest kodowany od nowa.
 
         Zwraca:
         - chess.Move lub None: Wybrany ruch lub None, jeśli brak dostępnych ruchów.
         """
-        # Konwertuj aktualną planszę na tensor i uzyskaj maskę akcji za pomocą chess_utils
-        state = board_to_tensor(board).unsqueeze(0).to(self.device)  # Dodaj wymiar batcha i przenieś na urządzenie
-        action_mask = get_action_mask(board).unsqueeze(0).to(self.device)  # Dodaj wymiar batcha
+        # Pozycja z książki debiutowej: ruch bez przejścia sieci i MCTS (także przed eksploracją epsilon)
+        if self.opening_book is not None:
+            move = self._select_book_move(board)
+            if move:
+                return move
 
-        # Epsilon-zachłanna strategia: wybierz losowy ruch z prawdopodobieństwem epsilon
+        # Epsilon-zachłanna strategia: wybierz losowy ruch z prawdopodobieństwem epsilon (bez kodowania planszy)
         if random.random() < epsilon:
             return self._select_random_move(board)
 
         # Użyj MCTS do wyboru ruchu, jeśli dostępne
         if self.mcts_interface:
-            move = self._select_move_with_mcts(board, state, action_mask)
+            move = self._select_move_with_mcts(board, encoder)
             if move:
                 return move  # Ruch został pomyślnie wybrany przez MCTS
-            else:
-                self._select_move_with_policy(board, state, action_mask)
-            
+
         # Użyj polityki sieci do wyboru ruchu
-        return self._select_move_with_policy(board, state, action_mask)
+        with self.profiler.phase('encoding'):
+            if self.position_cache is not None:
+                legal_indices = self.position_cache.legal_indices(board)
+            else:
+                legal_indices = legal_move_indices(board)
+            state = self._encode(board, encoder)
+        return self._select_move_with_policy(board, state, legal_indices)
+
+    def _encode(self, board, encoder=None):
+        """
+        Koduje planszę do tensora [1, 12, 8, 8] na urządzeniu agenta.
+
+        Parametry:
+        - board (chess.Board): Aktualna plansza gry.
+        - encoder (IncrementalEncoder, opcjonalnie): Koder przyrostowy związany z planszą.
+
+        Zwraca:
+        - torch.Tensor: Stan planszy z wymiarem batcha.
+        """
+        if encoder is not None:
+            planes = encoder.tensor()
+        elif self.position_cache is not None:
+            planes = self.position_cache.tensor(board)
+        else:
+            planes = board_to_tensor(board)
+        return planes.unsqueeze(0).to(self.device)  # Dodaj wymiar batcha i przenieś na urządzenie
+
+    def policy_logits(self, states):
+        """
+        Oblicza logity polityki w trybie inferencji (BatchNorm w trybie eval, bez autograd).
+
+        Parametry:
+        - states (torch.Tensor): Stany plansz o kształcie [N, 12, 8, 8].
+
+        Zwraca:
+        - torch.Tensor: Logity o kształcie [N, 4096].
+        """
+        self.model.eval()
+        states = states.to(self.device)
+        with torch.inference_mode(), self.profiler.phase('forward'):
+            if self._inference_model is not None:
+                return self._inference_model(states)
+            if self.inference_backend not in ('compile', 'trace'):
+                self._inference_model = self._build_inference_model(states)
+                return self._inference_model(states)
+            try:
+                # Budowa (np. torch.jit.trace) lub pierwsze wywołanie (torch.compile kompiluje przy nim,
+                # np. bez kompilatora C++) mogą zawieść
+                inference_model = self._build_inference_model(states)
+                logits = inference_model(states)
+            except Exception as e:
+                logger.warning(f"Skompilowana ścieżka inferencji niedostępna ({e}). Używanie trybu eager.")
+                inference_model = LuigiPolicy(self.model)
+                logits = inference_model(states)
+            self._inference_model = inference_model
+            return logits
+
+    def _build_inference_model(self, example_states):
+        """
+        Tworzy (raz) model używany do wyboru ruchów zgodnie z inference_backend.
+        """
+        policy = LuigiPolicy(self.model)
+        if self.inference_backend == 'compile':
+            return torch.compile(policy)
+        if self.inference_backend == 'trace':
+            return torch.jit.trace(policy, example_states)
+        if self.inference_backend is not None:
+            logger.warning(f"Nieznany backend inferencji: {self.inference_backend}. Używanie trybu eager.")
+        return policy
+
+
+    def select_moves(self, boards, epsilon=0.1):
+        """
+        Wybiera ruchy dla wielu niezależnych partii jednym, wsadowym przejściem sieci.
+
+        Kroki nie są zapisywane w self.buffer - wybrane akcje zwracane są wywołującemu,
+        który przechowuje trajektorię każdej partii osobno (zob. store_episode). MCTS nie jest tu używany.
+        Pozycje z książki debiutowej (opening_book) są rozgrywane bez przejścia sieci i bez eksploracji epsilon.
+
+        Parametry:
+        - boards (lista chess.Board): Plansze, na których ruch ma agent.
+        - epsilon (float): Prawdopodobieństwo wybrania losowego ruchu w każdej partii.
+
+        Zwraca:
+        - lista krotek (chess.Move lub None, int): Wybrany ruch i indeks akcji (-1 dla ruchu losowego
+          lub z książki) dla każdej planszy.
+        """
+        results = [None] * len(boards)
+        policy_rows = []
+        for i, board in enumerate(boards):
+            book_move = self.opening_book.choose(board) if self.opening_book is not None else None
+            if book_move is not None:
+                results[i] = (book_move, -1)
+            elif random.random() < epsilon:
+                results[i] = (self._random_legal_move(board), -1)
+            else:
+                policy_rows.append(i)
 
+        if not policy_rows:
+            return results
+
+        policy_boards = [boards[i] for i in policy_rows]
+        with self.profiler.phase('encoding'):
+            if self.position_cache is not None:
+                states = self.position_cache.encode_batch(policy_boards)
+                legal_indices = [self.position_cache.legal_indices(board) for board in policy_boards]
+            else:
+                states = encode_batch(policy_boards)
+                legal_indices = [legal_move_indices(board) for board in policy_boards]
+            action_mask = get_action_mask_batch(indices=legal_indices)
+
+        # Gradienty liczone są dopiero w learn()
+        with torch.inference_mode():
+            log_probs = masked_log_softmax(self.policy_logits(states), action_mask)
+            # Losowanie akcji dla wszystkich partii naraz
+            actions = torch.multinomial(log_probs.exp(), 1).squeeze(1).tolist()
+
+        for row, i in enumerate(policy_rows):
+            board = boards[i]
+            if len(legal_indices[row]) == 0:
+                results[i] = (self._random_legal_move(board), -1)
+                continue
+            selected_move = index_to_move(board, actions[row])
+            if selected_move is None:
+                logger.warning(f"Sieć wybrała nielegalny ruch o indeksie {actions[row]}. Zamiast tego wybieranie losowego ruchu.")
+                results[i] = (self._random_legal_move(board), -1)
+            else:
+                results[i] = (selected_move, actions[row])
+        return results
+
+    def _random_legal_move(self, board):
+        """
+        Zwraca losowy, legalny ruch lub None, jeśli brak legalnych ruchów.
+        """
+        if self.position_cache is not None:
+            legal_moves = self.position_cache.legal_moves(board)
+        else:
+            legal_moves = list(board.legal_moves)
+        return random.choice(legal_moves) if legal_moves else None
+
+    def _record_step(self, board, legal_indices, action):
+        """
+        Zapisuje krok bieżącego epizodu w buforze trajektorii.
+
+        Parametry:
+        - board (chess.Board): Plansza przed wykonaniem ruchu.
+        - legal_indices (np.ndarray): Indeksy legalnych akcji.
+        - action (int): Indeks wybranej akcji lub -1 dla ruchu spoza polityki sieci.
+        """
+        self.buffer.record(board_masks(board), legal_indices, action)
 
     def _select_random_move(self, board):
         """
@@ -92,27 +305,42 @@ class ChessAgent:
         Zwraca:
         - chess.Move: Losowo wybrany ruch.
         """
-        legal_moves = list(board.legal_moves)
-        if not legal_moves:
+        selected_move = self._random_legal_move(board)
+        if selected_move is None:
             logger.warning("Brak dostępnych legalnych ruchów dla agenta.")
             return None
-        selected_move = random.choice(legal_moves)
-        # Przypisz neutralne log_prob (bez wkładu w gradient)
-        # Ustawienie log_prob na 0.0 zapewnia, że nie wpływa na proces uczenia
-        log_prob = torch.tensor(0.0, device=self.device)
-        self.log_probs.append(log_prob)
-        logger.debug(f"Losowo wybrany ruch: {board.san(selected_move)} z neutralnym prawdopodobieństwem {log_prob.item()}")
+        # Ruch spoza polityki nie wnosi wkładu w gradient
+        self.buffer.record_off_policy()
+        logger.debug(f"Losowo wybrany ruch: {board.san(selected_move)}")
         return selected_move
 
 
-    def _select_move_with_mcts(self, board, state, action_mask):
+    def _select_book_move(self, board):
         """
-        Wybiera ruch za pomocą silnika MCTS i loguje prawdopodobieństwo polityki sieciowej dla tego ruchu.
+        Wybiera ruch z książki debiutowej.
 
         Parametry:
         - board (chess.Board): Aktualna plansza gry.
-        - state (torch.Tensor): Reprezentacja tensorowa aktualnego stanu planszy.
-        - action_mask (torch.Tensor): Maska akcji wskazująca legalne ruchy.
+
+        Zwraca:
+        - chess.Move lub None: Ruch z książki lub None, jeśli pozycji nie ma w książce.
+        """
+        selected_move = self.opening_book.choose(board)
+        if selected_move is None:
+            return None
+        # Ruch z książki, tak jak losowy, nie wnosi wkładu w gradient
+        self.buffer.record_off_policy()
+        logger.debug(f"Ruch z książki debiutowej: {board.san(selected_move)}")
+        return selected_move
+
+    def _select_move_with_mcts(self, board, encoder=None):
+        """
+        Wybiera ruch za pomocą silnika MCTS. Przy poziomie logowania DEBUG loguje też
+        prawdopodobieństwo polityki sieciowej dla tego ruchu (tylko wtedy plansza jest kodowana).
+
+        Parametry:
+        - board (chess.Board): Aktualna plansza gry.
+        - encoder (IncrementalEncoder, opcjonalnie): Koder przyrostowy związany z planszą.
 
         Zwraca:
         - chess.Move lub None: Wybrany ruch lub None, jeśli MCTS zawiedzie.
@@ -127,22 +355,15 @@ class ChessAgent:
                     move_idx = move_to_index(selected_move)
                     logger.debug(f"Indeks ruchu wybranego przez MCTS: {move_idx}")
 
-                    # Pobierz prawdopodobieństwa polityki sieciowej
-                    with torch.no_grad():
-                        self.model.eval()
-                        output, _ = self.model(state, action_mask)  # Zakładając, że model zwraca politykę i wartość
-                        # Przekształć wynik w [batch_size, action_channels, 4096]
-                        output = output.view(-1, self.action_channels, 4096)
-                        # Zamaskuj nielegalne ruchy
-                        masked_output = output * action_mask
-                        # Zastosuj softmax, aby uzyskać prawdopodobieństwa dla wszystkich akcji
-                        action_probs = F.softmax(masked_output.view(-1), dim=0)
-                    # Wyciągnij prawdopodobieństwo dla wybranego ruchu
-                    move_prob = action_probs[move_idx]
-                    # Zaloguj prawdopodobieństwo polityki sieciowej dla tego ruchu (odłączone, aby uniknąć śledzenia gradientu)
-                    log_prob = torch.log(move_prob).detach()
-                    self.log_probs.append(log_prob)
-                    logger.debug(f"Ruch wybrany przez MCTS: {board.san(selected_move)} z prawdopodobieństwem sieci {move_prob.item()}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        # Pobierz prawdopodobieństwo polityki sieciowej dla wybranego ruchu
+                        legal_indices = legal_move_indices(board)
+                        action_mask = torch.from_numpy(indices_to_mask(legal_indices)).to(self.device).unsqueeze(0)
+                        log_probs = masked_log_softmax(self.policy_logits(self._encode(board, encoder)), action_mask)
+                        move_prob = log_probs[0, move_idx].exp()
+                        logger.debug(f"Ruch wybrany przez MCTS: {board.san(selected_move)} z prawdopodobieństwem sieci {move_prob.item()}")
+                    # Ruch wybrany przez MCTS nie pochodzi z polityki sieci, więc nie wnosi wkładu w gradient
+                    self.buffer.record_off_policy()
                     return selected_move
                 else:
                     logger.warning(f"MCTS zwrócił nielegalny ruch: {selected_move_uci}.")
@@ -157,34 +378,28 @@ class ChessAgent:
         return None  # MCTS nie podał prawidłowego ruchu
 
 
-    def _select_move_with_policy(self, board, state, action_mask):
+    def _select_move_with_policy(self, board, state, legal_indices):
         """
         Wybiera ruch na podstawie polityki sieci.
 
         Parametry:
         - board (chess.Board): Aktualna plansza gry.
         - state (torch.Tensor): Reprezentacja tensorowa aktualnego stanu planszy.
-        - action_mask (torch.Tensor): Maska akcji wskazująca legalne ruchy.
+        - legal_indices (np.ndarray): Indeksy legalnych akcji.
 
         Zwraca:
         - chess.Move lub None: Wybrany ruch lub None, jeśli brak dostępnych legalnych ruchów.
         """
-        self.model.train()  # Upewnij się, że model jest w trybie treningowym, aby śledzić gradienty
-        output, _ = self.model(state, action_mask)
-        # Przekształć wynik w [batch_size, action_channels, 4096]
-        output = output.view(-1, self.action_channels, 4096)
-        
-        # Zastosuj maskowanie poprzez ustawienie logitów nielegalnych ruchów na -inf
-        masked_output = output.clone()
-        masked_output[action_mask == 0] = -1e9  # Efektywnie usuwa nielegalne ruchy z rozważań
-        
-        # Zastosuj softmax, aby uzyskać prawdopodobieństwa dla wszystkich akcji
-        action_probs = F.softmax(masked_output.view(-1), dim=0)
-        
-        # Utwórz rozkład kategoryczny
-        m = Categorical(action_probs)
-        action = m.sample()
-        log_prob = m.log_prob(action)  # Ten tensor wymaga gradientu
+        if len(legal_indices) == 0:
+            return self._select_random_move(board)
+
+        with torch.inference_mode():  # Log-prawdopodobieństwa z gradientem liczone są dopiero w learn()
+            output = self.policy_logits(state)
+
+            # Rozkład kategoryczny tylko nad legalnymi akcjami (nielegalne mają zerowe prawdopodobieństwo)
+            m, indices = legal_policy(output, legal_indices)
+            choice = m.sample()
+            action = indices[choice]
 
         move_idx = action.item()
         logger.debug(f"Wylosowany indeks ruchu: {move_idx}")
@@ -200,9 +415,9 @@ class ChessAgent:
                 logger.warning(f"Sieć wybrała nielegalny ruch: {selected_move}. Zamiast tego wybieranie losowego ruchu.")
                 return self._select_random_move(board)
 
-            # Zaloguj prawdopodobieństwo polityki sieci dla wybranego ruchu
-            move_prob = action_probs[move_idx]
-            self.log_probs.append(log_prob)  # Zapisz log_prob z gradientem
+            # Zapisz krok; log_prob zostanie przeliczony podczas aktualizacji
+            move_prob = m.probs[choice]
+            self._record_step(board, legal_indices, move_idx)
             logger.debug(f"Sieć wybrała ruch: {board.san(selected_move)} z prawdopodobieństwem {move_prob.item()}")
             return selected_move
 
@@ -222,77 +437,90 @@ class ChessAgent:
         Parametry:
         - reward (float): Nagroda otrzymana po wykonaniu akcji.
         """
-        self.rewards.append(reward)
+        self.buffer.remember(reward)
+
+    def finish_episode(self):
+        """
+        Zamyka bieżący epizod w buforze i aktualizuje sieć co update_every epizodów.
+        """
+        self.buffer.end_episode()
+        if len(self.buffer) >= self.update_every:
+            with self.profiler.phase('learn'):
+                self.learn()
+
+    def store_episode(self, states, legal_indices, actions, rewards):
+        """
+        Dodaje kompletny epizod (np. z play_batched_episodes) i aktualizuje sieć co update_every epizodów.
+
+        Parametry:
+        - states (lista sekwencji int): Maski bierek (chess_utils.board_masks) kolejnych kroków.
+        - legal_indices (lista np.ndarray): Indeksy legalnych akcji kolejnych kroków.
+        - actions (lista int): Wybrane akcje (-1 dla ruchów spoza polityki).
+        - rewards (lista float): Nagrody epizodu.
+        """
+        self.buffer.add_episode(states, legal_indices, actions, rewards)
+        if len(self.buffer) >= self.update_every:
+            with self.profiler.phase('learn'):
+                self.learn()
 
     def learn(self):
         """
-        Wykonuje krok uczenia, aktualizując sieć neuronową na podstawie zapisanych logarytmów prawdopodobieństwa i nagród.
-        """
-        if not self.rewards:
-            logger.debug("Brak nagród do nauki.")
-            return  # Brak danych do nauki
-
-        self.model.train()
-
-        # Oblicz zdyskontowane nagrody
-        discounted_rewards = []
-        R = 0
-        for r in reversed(self.rewards):
-            R = r + self.gamma * R
-            discounted_rewards.insert(0, R)
-
-        discounted_rewards = torch.tensor(discounted_rewards, device=self.device)
-
-        # Normalizacja zdyskontowanych nagród (opcjonalna)
-        #if len(discounted_rewards) > 1:  # Sprawdź, czy są wystarczające dane do normalizacji
-        #    mean = discounted_rewards.mean()
-        #    std = discounted_rewards.std()
-        #    if std > 0:
-        #        discounted_rewards = (discounted_rewards - mean) / (std + 1e-9)
-
-        # Upewnij się, że zdyskontowane nagrody mają włączone śledzenie gradientów
-        # discounted_rewards = discounted_rewards.clone().detach()
-
-        # Oblicz straty
-        policy_losses = []
-        entropy_losses = []
-        for log_prob, reward in zip(self.log_probs, discounted_rewards):
-            if log_prob.requires_grad:
-                policy_losses.append(-log_prob * reward)
-                # Opcjonalna regularizacja entropii
-                entropy = -(torch.exp(log_prob) * log_prob)
-                entropy_losses.append(entropy)
-
-        if not policy_losses:
-            logger.debug("Brak prawidłowych log_probs do nauki.")
-            # Wyczyść zapisane nagrody i log_probs nawet jeśli nie ma danych do nauki
-            self.log_probs = []
-            self.rewards = []
-            return
+        Wykonuje krok uczenia na podstawie zakończonych epizodów z bufora trajektorii.
+
+        Log-prawdopodobieństwa wybranych akcji są przeliczane wsadowo (po update_batch_size
+        pozycji, z akumulacją gradientów), a zdyskontowane nagrody liczone wektorowo
+        osobno dla każdego epizodu. Sieć pracuje w trybie eval, więc BatchNorm używa statystyk
+        bieżących (tych samych co przy wyborze ruchu), a nie statystyk partii. Po aktualizacji bufor jest czyszczony.
+        """
+        if self.quantized:
+            raise RuntimeError("Model skwantyzowany (int8) nie może być trenowany. Wczytaj punkt kontrolny float32.")
 
-        # Sumowanie strat
-        policy_loss = torch.stack(policy_losses).sum()
-        entropy_loss = torch.stack(entropy_losses).sum() * self.entropy_coef if entropy_losses else 0
-        total_loss = policy_loss + entropy_loss
+        states, legal_indices, actions, returns = self.buffer.batch(self.gamma)
+        self.buffer.clear()
+        if len(actions) == 0:
+            logger.debug("Brak prawidłowych kroków do nauki.")
+            return
 
-        # Backpropagation (propagacja wsteczna)
+        # BatchNorm ze statystykami bieżącymi (tryb eval), jak przy losowaniu akcji w policy_logits:
+        # gradient REINFORCE dotyczy tej samej polityki, która wybrała ruchy (sieć nie ma warstw Dropout)
+        self.model.eval()
         self.optimizer.zero_grad()
-        total_loss.backward()
+        for start in range(0, len(actions), self.update_batch_size):
+            end = start + self.update_batch_size
+            log_probs = self.action_log_probs(states[start:end], legal_indices[start:end], actions[start:end])
+            discounted_rewards = torch.from_numpy(returns[start:end]).to(self.device)
+
+            # Oblicz straty (z opcjonalną regularyzacją entropii)
+            policy_loss = -(log_probs * discounted_rewards).sum()
+            entropy_loss = -(torch.exp(log_probs) * log_probs).sum() * self.entropy_coef
+            (policy_loss + entropy_loss).backward()
+
         # Ograniczenie gradientów dla stabilności
         torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
         self.optimizer.step()
 
-        # Wyczyść zapisane nagrody i log_probs
-        self.log_probs = []
-        self.rewards = []
-
-        logger.debug("Parametry modelu zaktualizowane.")
-
-
+        logger.debug(f"Parametry modelu zaktualizowane na podstawie {len(actions)} kroków.")
 
+    def action_log_probs(self, states, legal_indices, actions):
+        """
+        Przelicza log-prawdopodobieństwa wybranych akcji (z gradientem) dla partii kroków z bufora.
 
+        Parametry:
+        - states (np.ndarray): Maski bierek [N, 12] (uint64).
+        - legal_indices (lista np.ndarray): Indeksy legalnych akcji kolejnych kroków.
+        - actions (np.ndarray): Wybrane akcje [N].
 
+        Zwraca:
+        - torch.Tensor: Log-prawdopodobieństwa akcji [N] (float32).
+        """
+        planes = torch.from_numpy(bitboards_to_planes(states)).to(self.device)
+        action_mask = get_action_mask_batch(indices=legal_indices)
+        chosen = torch.from_numpy(actions).to(self.device).unsqueeze(1)
 
+        with training_autocast(self.device, self.mixed_precision):
+            output, _ = self.model(planes, None)
+        # Log-softmax i straty zawsze w float32
+        return masked_log_softmax(output.view(-1, 4096).float(), action_mask).gather(1, chosen).squeeze(1)
 
     def save_model(self, filepath, episode=None, rewards_history=None):
         """
@@ -305,43 +533,96 @@ class ChessAgent:
         """
         # Upewnij się, że katalog istnieje
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        torch.save(self.checkpoint_state(episode, rewards_history), filepath)
+        logger.info(f"Model zapisany do {filepath}")
+
+    def checkpoint_state(self, episode=None, rewards_history=None):
+        """
+        Zwraca słownik punktu kontrolnego (wagi, optymalizator i hiperparametry) w formacie save_model.
+
+        Tensory nie są kopiowane; zapis w tle wymaga wcześniejszej kopii (zob. checkpoints.snapshot).
 
+        Parametry:
+        - episode (int, opcjonalnie): Numer epizodu treningowego.
+        - rewards_history (list, opcjonalnie): Historia nagród.
+
+        Zwraca:
+        - dict: Punkt kontrolny.
+        """
         checkpoint = {
             'model_state_dict': self.model.state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
             'gamma': self.gamma,
             'entropy_coef': self.entropy_coef,
-            'agent_color': self.agent_color,
-            'log_probs': self.log_probs,
-            'rewards': self.rewards
+            'agent_color': self.agent_color
         }
+        if self.quantized:
+            # Optymalizator dotyczy wag float32, których model skwantyzowany już nie ma
+            del checkpoint['optimizer_state_dict']
+            checkpoint['quantized'] = True
         if episode is not None:
             checkpoint['episode'] = episode
         if rewards_history is not None:
             checkpoint['rewards_history'] = rewards_history
-        torch.save(checkpoint, filepath)
-        logger.info(f"Model zapisany do {filepath}")
+        return checkpoint
 
-    def load_model(self, filepath):
+    def load_model(self, filepath, quantized=False):
         """
         Ładuje stan modelu i optymalizatora z pliku.
 
+        Punkty kontrolne zapisane przez quantization.export_quantized są zawsze wczytywane
+        jako model skwantyzowany. Model skwantyzowany działa tylko na CPU i nie może być trenowany.
+
         Parametry:
         - filepath (str): Ścieżka do załadowania modelu.
+        - quantized (bool): Jeśli True, model float32 jest po wczytaniu kwantyzowany do int8 (do gry na CPU).
+
+        Zwraca:
+        - dict lub None: Wczytany punkt kontrolny (np. z numerem epizodu) albo None, jeśli plik nie istnieje.
         """
         if not os.path.isfile(filepath):
             logger.error(f"Plik punktu kontrolnego nie znaleziony w ścieżce: {filepath}")
-            return
+            return None
+
+        # Wczytanie na CPU: load_state_dict przenosi wagi na urządzenie modelu
+        checkpoint = torch.load(filepath, map_location='cpu')
+        self.load_checkpoint(checkpoint, quantized=quantized)
+        logger.info(f"Model załadowany z {filepath}" + (" (int8)" if self.quantized else ""))
+        return checkpoint
+
+    def load_checkpoint(self, checkpoint, quantized=False):
+        """
+        Ustawia stan agenta z wczytanego słownika punktu kontrolnego (zob. load_model).
 
-        checkpoint = torch.load(filepath, map_location=self.device)
-        self.model.load_state_dict(checkpoint['model_state_dict'])
-        self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        Parametry:
+        - checkpoint (dict): Punkt kontrolny (lub sam state_dict modelu).
+        - quantized (bool): Jeśli True, model float32 jest po wczytaniu kwantyzowany do int8.
+        """
+        if checkpoint.get('quantized', False):
+            model = quantized_template(self.action_channels)
+            model.load_state_dict(checkpoint['model_state_dict'])
+            self._use_quantized_model(model)
+        else:
+            # Obsługuje też sam state_dict (np. model wytrenowany na debiutach)
+            self.model.load_state_dict(model_state_dict_from_checkpoint(checkpoint))
+            if 'optimizer_state_dict' in checkpoint:
+                self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+            if quantized:
+                self._use_quantized_model(quantize_model(self.model.cpu()))
         self.gamma = checkpoint.get('gamma', self.gamma)
         self.entropy_coef = checkpoint.get('entropy_coef', self.entropy_coef)
         self.agent_color = checkpoint.get('agent_color', self.agent_color)
-        self.log_probs = checkpoint.get('log_probs', [])
-        self.rewards = checkpoint.get('rewards', [])
-        logger.info(f"Model załadowany z {filepath}")
+
+    def _use_quantized_model(self, model):
+        """
+        Podmienia model agenta na skwantyzowany i przełącza agenta na CPU.
+        """
+        if self.device != 'cpu':
+            logger.warning("Model skwantyzowany działa tylko na CPU. Przełączanie urządzenia na CPU.")
+        self.device = 'cpu'
+        self.model = model
+        self.quantized = True
+        self._inference_model = None
 
     def close_mcts(self):
         """
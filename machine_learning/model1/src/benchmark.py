@@ -0,0 +1,352 @@
+# benchmark.py
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+import chess
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, TensorDataset
+from agent import ChessAgent
+from chess_utils import board_masks, board_to_tensor, encode_batch, get_action_mask_batch, legal_move_indices, move_to_index
+from environment import ChessEnvironment
+from lite_engine import LITE_ENGINE
+from model import LuigiCNN
+from openings.dataset import ShardDataset, shard_loader
+from openings.prepare_data import prepare
+from openings.train_openings import train_model, validate_model, validation_loader
+from training import play_episode
+
+DEFAULT_OPENINGS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'datasets', 'fen_moves.tsv')
+
+def sample_positions(num_positions, seed=0, max_plies=40):
+    """
+    Generuje pozycje z losowych partii (do max_plies półruchów od pozycji początkowej).
+
+    Parametry:
+    - num_positions (int): Liczba pozycji.
+    - seed (int): Ziarno generatora liczb losowych.
+    - max_plies (int): Maksymalna liczba półruchów od pozycji początkowej.
+
+    Zwraca:
+    - lista chess.Board: Pozycje, w których strona na ruchu ma legalny ruch.
+    """
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < num_positions:
+        board = chess.Board()
+        for _ in range(rng.randrange(max_plies)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over():
+            boards.append(board)
+    return boards
+
+def _legacy_select(agent, board):
+    """
+    Dawna ścieżka wyboru ruchu: przejście w trybie train z autograd, gęsta maska,
+    kopia logitów z wartościami -1e9 na nielegalnych akcjach i pełny softmax.
+    """
+    agent.model.train()
+    state = board_to_tensor(board).unsqueeze(0).to(agent.device)
+    output, _ = agent.model(state, None)
+    action_mask = get_action_mask_batch([board]).to(agent.device)
+    masked = output.view(1, -1).clone()
+    masked[~action_mask] = -1e9
+    probs = F.softmax(masked, dim=-1)
+    return torch.distributions.Categorical(probs).sample().item()
+
+def _time_per_call(fn, boards, repeats):
+    """
+    Zwraca średni czas jednego wywołania fn(board) w milisekundach.
+    """
+    for board in boards[:5]:
+        fn(board)  # Rozgrzewka (w tym kompilacja)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for board in boards:
+            fn(board)
+    return (time.perf_counter() - start) * 1000 / (repeats * len(boards))
+
+def benchmark_select_move(num_positions=200, repeats=3, device='cpu', backends=('eager', 'trace', 'compile')):
+    """
+    Porównuje czas wyboru ruchu przez sieć (epsilon=0) dla dawnej ścieżki i backendów inferencji.
+
+    Parametry:
+    - num_positions (int): Liczba pozycji testowych.
+    - repeats (int): Liczba powtórzeń pomiaru.
+    - device (str): Urządzenie obliczeń.
+    - backends (sekwencja str): Backendy inferencji ('eager', 'trace', 'compile').
+
+    Zwraca:
+    - dict: Średni czas jednego ruchu (ms) dla każdej ścieżki.
+    """
+    boards = sample_positions(num_positions)
+    agent = ChessAgent(device=device)
+    results = {'legacy': _time_per_call(lambda board: _legacy_select(agent, board), boards, repeats)}
+
+    for backend in backends:
+        agent.inference_backend = None if backend == 'eager' else backend
+        agent._inference_model = None
+        agent.buffer.clear()
+
+        def select(board):
+            agent.select_move(board, epsilon=0.0)
+            agent.buffer.end_episode()
+        results[backend] = _time_per_call(select, boards, repeats)
+        agent.buffer.clear()
+
+    # Sprawdzenie zgodności: wszystkie backendy zwracają te same logity
+    states = torch.stack([board_to_tensor(board) for board in boards[:16]])
+    agent.inference_backend = None
+    agent._inference_model = None
+    reference = agent.policy_logits(states)
+    for backend in backends:
+        if backend == 'eager':
+            continue
+        agent.inference_backend = backend
+        agent._inference_model = None
+        if not torch.allclose(agent.policy_logits(states), reference, atol=1e-4):
+            print(f"UWAGA: logity backendu {backend} różnią się od trybu eager")
+    return results
+
+def load_openings_split(path=DEFAULT_OPENINGS_PATH, limit=2000, val_fraction=0.2, seed=0):
+    """
+    Wczytuje pierwsze limit wierszy fen_moves.tsv i dzieli je losowo na zbiór treningowy i walidacyjny.
+
+    Zwraca:
+    - (TensorDataset, TensorDataset): Dane treningowe i walidacyjne (pozycje, indeksy ruchów).
+    """
+    boards, targets = [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f, delimiter='\t'):
+            if len(boards) >= limit:
+                break
+            boards.append(chess.Board(row['FEN']))
+            targets.append(move_to_index(chess.Move.from_uci(row['Move'])))
+    inputs = encode_batch(boards)
+    targets = torch.tensor(targets)
+    order = torch.randperm(len(boards), generator=torch.Generator().manual_seed(seed))
+    num_val = int(len(boards) * val_fraction)
+    val_rows, train_rows = order[:num_val], order[num_val:]
+    return (TensorDataset(inputs[train_rows], targets[train_rows]),
+            TensorDataset(inputs[val_rows], targets[val_rows]))
+
+def _learn_step_ms(agent, boards, repeats):
+    """
+    Zwraca średni czas ChessAgent.learn() (ms) dla jednego epizodu z podanych pozycji.
+    """
+    def fill():
+        for board in boards:
+            indices = legal_move_indices(board)
+            agent.buffer.record(board_masks(board), indices, int(indices[0]))
+            agent.buffer.remember(random.random())
+        agent.buffer.end_episode()
+
+    fill()
+    agent.learn()  # Rozgrzewka
+    elapsed = 0.0
+    for _ in range(repeats):
+        fill()
+        start = time.perf_counter()
+        agent.learn()
+        elapsed += time.perf_counter() - start
+    return elapsed * 1000 / repeats
+
+def benchmark_mixed_precision(epochs=3, limit=2000, batch_size=64, learn_positions=256, repeats=5, seed=0):
+    """
+    Porównuje trening float32 i autocast bfloat16 na CPU: czas kroku ChessAgent.learn(),
+    czas kroku train_model na debiutach oraz końcową trafność na walidacji.
+
+    Zwraca:
+    - dict: Wyniki dla trybów 'float32' i 'bfloat16'.
+    """
+    train_data, val_data = load_openings_split(limit=limit, seed=seed)
+    boards = sample_positions(learn_positions, seed=seed)
+    criterion = torch.nn.CrossEntropyLoss()
+    results = {}
+    for name, mixed_precision in (('float32', False), ('bfloat16', True)):
+        torch.manual_seed(seed)
+        random.seed(seed)
+        agent = ChessAgent(mixed_precision=mixed_precision)
+        learn_ms = _learn_step_ms(agent, boards, repeats)
+
+        torch.manual_seed(seed)
+        model = LuigiCNN(action_channels=1)
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+        train_loader = DataLoader(train_data, batch_size=batch_size, shuffle=True,
+                                  generator=torch.Generator().manual_seed(seed))
+        val_loader = DataLoader(val_data, batch_size=batch_size, shuffle=False)
+        start = time.perf_counter()
+        train_model(model, train_loader, val_loader, optimizer, criterion, epochs=epochs, mixed_precision=mixed_precision)
+        train_ms = (time.perf_counter() - start) * 1000 / (epochs * len(train_loader))
+        # Trafność zawsze oceniana w float32 (tak jak po wczytaniu punktu kontrolnego)
+        _, val_accuracy = validate_model(model, val_loader, criterion)
+        results[name] = {'learn_ms': learn_ms, 'train_step_ms': train_ms, 'val_accuracy': val_accuracy}
+    return results
+
+def _legacy_train_epoch(model, train_loader, val_loader, optimizer, criterion):
+    """
+    Dawna epoka train_openings.py: loss.item() (synchronizacja) po każdej partii
+    i pełna walidacja z loss.item() na partię.
+    """
+    model.train()
+    total_loss = 0
+    for inputs, targets in train_loader:
+        outputs, _ = model(inputs, None)
+        loss = criterion(outputs.view(-1, 4096), targets)
+        total_loss += loss.item()
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    model.eval()
+    with torch.no_grad():
+        for inputs, targets in val_loader:
+            outputs, _ = model(inputs, None)
+            total_loss += criterion(outputs.view(-1, 4096), targets).item()
+    return total_loss
+
+def benchmark_openings_trainer(epochs=2, batch_size=256, accumulation_steps=1, num_workers=2, val_samples=256,
+                               path=DEFAULT_OPENINGS_PATH, seed=0):
+    """
+    Porównuje przepustowość dawnego skryptu train_openings.py (partia 64, jeden proces, loss.item()
+    w każdym kroku, pełna walidacja co epokę) z train_model na tych samych shardach.
+
+    Parametry:
+    - epochs (int): Liczba epok każdego wariantu.
+    - batch_size (int): Rozmiar partii nowego wariantu.
+    - accumulation_steps (int): Liczba partii na krok optymalizatora nowego wariantu.
+    - num_workers (int): Liczba procesów ładujących nowego wariantu.
+    - val_samples (int): Rozmiar podzbioru walidacji nowego wariantu.
+    - path (str): Plik fen_moves.tsv.
+    - seed (int): Ziarno losowania.
+
+    Zwraca:
+    - dict: Kroki optymalizatora i próbki treningowe na sekundę (z walidacją) dla 'legacy' i 'trainer'.
+    """
+    criterion = torch.nn.CrossEntropyLoss()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        prepare(path, directory, workers=0)
+        train_data, val_data = ShardDataset(directory, 'train'), ShardDataset(directory, 'val')
+
+        torch.manual_seed(seed)
+        model = LuigiCNN(action_channels=1)
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+        train_loader = DataLoader(TensorDataset(*train_data.tensors()), batch_size=64, shuffle=True,
+                                  generator=torch.Generator().manual_seed(seed))
+        val_loader = DataLoader(TensorDataset(*val_data.tensors()), batch_size=64, shuffle=False)
+        start = time.perf_counter()
+        for _ in range(epochs):
+            _legacy_train_epoch(model, train_loader, val_loader, optimizer, criterion)
+        elapsed = time.perf_counter() - start
+        results['legacy'] = {'steps_per_s': epochs * len(train_loader) / elapsed,
+                             'samples_per_s': epochs * len(train_data) / elapsed}
+
+        torch.manual_seed(seed)
+        model = LuigiCNN(action_channels=1)
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+        train_loader = shard_loader(train_data, batch_size=batch_size, shuffle=True, seed=seed,
+                                    num_workers=num_workers, prefetch_factor=4)
+        val_loader = validation_loader(val_data, val_samples, batch_size=batch_size, seed=seed)
+        start = time.perf_counter()
+        train_model(model, train_loader, val_loader, optimizer, criterion, epochs=epochs,
+                    accumulation_steps=accumulation_steps, device=torch.device('cpu'))
+        elapsed = time.perf_counter() - start
+        steps = epochs * -(-len(train_loader) // accumulation_steps)
+        results['trainer'] = {'steps_per_s': steps / elapsed, 'samples_per_s': epochs * len(train_data) / elapsed}
+    return results
+
+def benchmark_episodes(num_episodes=10, max_moves=60, engine=f'{LITE_ENGINE}:depth_cap=2', depth=2, seed=0):
+    """
+    Mierzy przepustowość rozgrywki treningowej (play_episode) z deterministycznym przeciwnikiem.
+
+    Domyślnie używany jest wbudowany silnik LiteEngine, więc pomiar jest powtarzalny na każdej maszynie.
+
+    Parametry:
+    - num_episodes (int): Liczba epizodów.
+    - max_moves (int): Maksymalna liczba półruchów na epizod.
+    - engine (str): Ścieżka silnika lub "lite[:opcje]".
+    - depth (int): Głębokość wyszukiwania przeciwnika i ocen.
+    - seed (int): Ziarno generatorów liczb losowych agenta.
+
+    Zwraca:
+    - dict: Epizody i półruchy na sekundę oraz średnia nagroda.
+    """
+    torch.manual_seed(seed)
+    random.seed(seed)
+    agent = ChessAgent(update_every=float('inf'))
+    env = ChessEnvironment(stockfish_path=engine, stockfish_depth=depth)
+    rewards, plies = [], 0
+    try:
+        start = time.perf_counter()
+        for _ in range(num_episodes):
+            rewards.append(play_episode(agent, env, max_moves=max_moves, epsilon=0.5, verbose=False))
+            plies += len(env.board.move_stack)
+            agent.buffer.clear()
+        elapsed = time.perf_counter() - start
+    finally:
+        env.close()
+    return {'episodes_per_s': num_episodes / elapsed, 'plies_per_s': plies / elapsed,
+            'mean_reward': sum(rewards) / len(rewards)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Pomiary wydajności agenta szachowego')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    select_parser = subparsers.add_parser('select_move', help='Czas wyboru ruchu przez sieć')
+    select_parser.add_argument('--num_positions', type=int, default=200, help='Liczba pozycji testowych')
+    select_parser.add_argument('--repeats', type=int, default=3, help='Liczba powtórzeń pomiaru')
+    select_parser.add_argument('--device', type=str, default='cpu', choices=['cpu', 'cuda'], help='Urządzenie obliczeń')
+    select_parser.add_argument('--backends', type=str, nargs='+', default=['eager', 'trace', 'compile'],
+                               choices=['eager', 'trace', 'compile'], help='Backendy inferencji do porównania')
+
+    precision_parser = subparsers.add_parser('mixed_precision', help='Trening float32 vs autocast bfloat16')
+    precision_parser.add_argument('--epochs', type=int, default=3, help='Liczba epok treningu na debiutach')
+    precision_parser.add_argument('--limit', type=int, default=2000, help='Liczba wierszy fen_moves.tsv')
+    precision_parser.add_argument('--batch_size', type=int, default=64, help='Rozmiar partii')
+    precision_parser.add_argument('--learn_positions', type=int, default=256, help='Liczba kroków epizodu w pomiarze learn()')
+
+    trainer_parser = subparsers.add_parser('openings_trainer', help='Dawny train_openings.py vs train_model')
+    trainer_parser.add_argument('--epochs', type=int, default=2, help='Liczba epok każdego wariantu')
+    trainer_parser.add_argument('--batch_size', type=int, default=256, help='Rozmiar partii nowego wariantu')
+    trainer_parser.add_argument('--accumulation_steps', type=int, default=1, help='Liczba partii na krok optymalizatora')
+    trainer_parser.add_argument('--num_workers', type=int, default=2, help='Liczba procesów ładujących')
+    trainer_parser.add_argument('--val_samples', type=int, default=256, help='Rozmiar podzbioru walidacji')
+
+    episodes_parser = subparsers.add_parser('episodes', help='Przepustowość rozgrywki treningowej')
+    episodes_parser.add_argument('--num_episodes', type=int, default=10, help='Liczba epizodów')
+    episodes_parser.add_argument('--max_moves', type=int, default=60, help='Maksymalna liczba półruchów na epizod')
+    episodes_parser.add_argument('--engine', type=str, default=f'{LITE_ENGINE}:depth_cap=2', help='Ścieżka silnika lub "lite[:opcje]"')
+    episodes_parser.add_argument('--depth', type=int, default=2, help='Głębokość wyszukiwania przeciwnika')
+
+    args = parser.parse_args()
+    if args.command == 'episodes':
+        results = benchmark_episodes(args.num_episodes, args.max_moves, args.engine, args.depth)
+        print(f"{results['episodes_per_s']:.3f} epizodów/s, {results['plies_per_s']:.1f} półruchów/s, "
+              f"średnia nagroda {results['mean_reward']:.2f}")
+    elif args.command == 'mixed_precision':
+        results = benchmark_mixed_precision(args.epochs, args.limit, args.batch_size, args.learn_positions)
+        for name, metrics in results.items():
+            print(f"{name:>8}: learn() {metrics['learn_ms']:8.1f} ms, krok train_model {metrics['train_step_ms']:7.1f} ms, "
+                  f"trafność walidacji {metrics['val_accuracy']:.2f}%")
+    elif args.command == 'openings_trainer':
+        results = benchmark_openings_trainer(args.epochs, args.batch_size, args.accumulation_steps,
+                                             args.num_workers, args.val_samples)
+        baseline = results['legacy']['samples_per_s']
+        for name, metrics in results.items():
+            print(f"{name:>8}: {metrics['steps_per_s']:7.2f} kroków/s, {metrics['samples_per_s']:8.1f} próbek/s "
+                  f"(x{metrics['samples_per_s'] / baseline:.2f})")
+    elif args.command == 'select_move':
+        results = benchmark_select_move(args.num_positions, args.repeats, args.device, args.backends)
+        baseline = results['legacy']
+        for name, ms in results.items():
+            print(f"{name:>8}: {ms:8.3f} ms/ruch  (x{baseline / ms:.2f})")
+
+if __name__ == "__main__":
+    main()
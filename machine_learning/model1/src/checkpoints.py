@@ -0,0 +1,232 @@
+# checkpoints.py
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import re
+import torch
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = 'metrics.jsonl'
+BEST_FILE = 'best.pth'
+_CHECKPOINT_PATTERN = re.compile(r'^checkpoint_(\d+)\.pth$')
+
+def snapshot(state):
+    """
+    Zwraca kopię punktu kontrolnego z tensorami skopiowanymi na CPU.
+
+    Kopia jest niezależna od modelu i optymalizatora, więc trening może je zmieniać w trakcie zapisu w tle.
+
+    Parametry:
+    - state: Słownik (lub lista, krotka, tensor, wartość) do skopiowania.
+
+    Zwraca:
+    - Kopia o tej samej strukturze.
+    """
+    if isinstance(state, torch.Tensor):
+        return state.detach().to('cpu', copy=True)
+    if isinstance(state, dict):
+        return {key: snapshot(value) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot(value) for value in state)
+    return state
+
+def checkpoint_name(episode):
+    return f"checkpoint_{episode:08d}.pth"
+
+class CheckpointManager:
+    def __init__(self, directory, keep_last=3, max_pending=2):
+        """
+        Inicjalizuje katalog punktów kontrolnych z zapisem w tle.
+
+        Zapis robi jeden wątek z kopii stanu (snapshot), więc pętla treningowa czeka tylko na skopiowanie tensorów.
+        Plik jest zapisywany obok docelowego i podmieniany atomowo (os.replace), więc przerwany zapis nie psuje
+        poprzedniego punktu kontrolnego. Zachowywane są keep_last ostatnie punkty kontrolne (checkpoint_<epizod>.pth)
+        i najlepszy (best.pth). Historia metryk trafia do osobnego pliku metrics.jsonl dopisywanego wierszami,
+        zamiast być zapisywana w całości w każdym punkcie kontrolnym.
+
+        Parametry:
+        - directory (str): Katalog punktów kontrolnych.
+        - keep_last (int): Liczba zachowywanych ostatnich punktów kontrolnych.
+        - max_pending (int): Maksymalna liczba oczekujących zapisów (kolejny zapis czeka na najstarszy).
+
+        Wyjątki:
+        - ValueError: Jeśli keep_last < 1 (rotacja usunęłaby także właśnie zapisany punkt kontrolny).
+        """
+        if keep_last < 1:
+            raise ValueError(f"keep_last musi wynosić co najmniej 1, podano {keep_last}")
+        self.directory = directory
+        self.keep_last = keep_last
+        self.max_pending = max_pending
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checkpoint')
+        self._pending = deque()
+        self._metrics = open(os.path.join(directory, METRICS_FILE), 'a', encoding='utf-8')
+
+    def save(self, agent, episode, **training_state):
+        """
+        Zleca zapis okresowego punktu kontrolnego i usunięcie najstarszych ponad keep_last.
+
+        Parametry:
+        - agent (ChessAgent): Zapisywany agent.
+        - episode (int): Numer epizodu.
+        - **training_state: Dodatkowy stan treningu zapisywany w punkcie kontrolnym (np. epsilon).
+
+        Zwraca:
+        - str: Ścieżka zapisywanego pliku.
+        """
+        path = os.path.join(self.directory, checkpoint_name(episode))
+        self._submit(agent, episode, path, rotate=True, training_state=training_state)
+        return path
+
+    def save_best(self, agent, episode, **training_state):
+        """
+        Zleca zapis najlepszego punktu kontrolnego (best.pth, nie podlega rotacji).
+
+        Parametry:
+        - agent (ChessAgent): Zapisywany agent.
+        - episode (int): Numer epizodu.
+        - **training_state: Dodatkowy stan treningu zapisywany w punkcie kontrolnym (np. epsilon).
+
+        Zwraca:
+        - str: Ścieżka zapisywanego pliku.
+        """
+        path = os.path.join(self.directory, BEST_FILE)
+        self._submit(agent, episode, path, rotate=False, training_state=training_state)
+        return path
+
+    def log_metrics(self, episode, **metrics):
+        """
+        Dopisuje metryki epizodu jako wiersz JSON do metrics.jsonl.
+
+        Parametry:
+        - episode (int): Numer epizodu.
+        - **metrics: Wartości metryk (liczby lub napisy).
+        """
+        record = {'episode': episode}
+        record.update({key: float(value) if hasattr(value, 'item') else value for key, value in metrics.items()})
+        self._metrics.write(json.dumps(record) + '\n')
+        self._metrics.flush()
+
+    def read_metrics(self, up_to_episode=None):
+        """
+        Wczytuje historię metryk, po jednym wpisie na epizod w kolejności epizodów.
+
+        Po wznowieniu treningu epizody mogą się powtarzać: obowiązuje ostatni wpis. Niepełny ostatni
+        wiersz (przerwany zapis) jest pomijany.
+
+        Parametry:
+        - up_to_episode (int, opcjonalnie): Pomija epizody późniejsze niż podany (np. rozegrane po ostatnim zapisie).
+
+        Zwraca:
+        - list: Słowniki metryk z kluczem 'episode'.
+        """
+        self._metrics.flush()
+        records = {}
+        with open(os.path.join(self.directory, METRICS_FILE), encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Pominięto uszkodzony wiersz metryk: {line.strip()[:80]}")
+                    continue
+                if up_to_episode is None or record['episode'] <= up_to_episode:
+                    records[record['episode']] = record
+        return [records[episode] for episode in sorted(records)]
+
+    def checkpoints(self):
+        """
+        Zwraca ścieżki okresowych punktów kontrolnych od najstarszego.
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            match = _CHECKPOINT_PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return [path for _, path in sorted(found)]
+
+    def latest(self):
+        """
+        Zwraca ścieżkę najnowszego okresowego punktu kontrolnego (lub best.pth, jeśli brak okresowych).
+
+        Zwraca:
+        - str lub None: Ścieżka punktu kontrolnego albo None, jeśli katalog jest pusty.
+        """
+        self.wait()
+        checkpoints = self.checkpoints()
+        if checkpoints:
+            return checkpoints[-1]
+        best = os.path.join(self.directory, BEST_FILE)
+        return best if os.path.isfile(best) else None
+
+    def load(self, agent, path=None, mmap=True):
+        """
+        Wczytuje punkt kontrolny do agenta jednym odczytem pliku.
+
+        Parametry:
+        - agent (ChessAgent): Agent, do którego wczytywane są wagi.
+        - path (str, opcjonalnie): Ścieżka punktu kontrolnego (domyślnie latest()).
+        - mmap (bool): Czy mapować tensory z pliku do pamięci zamiast wczytywać cały plik.
+
+        Zwraca:
+        - dict lub None: Wczytany punkt kontrolny (z kluczem 'episode') albo None, jeśli brak punktów kontrolnych.
+        """
+        path = path or self.latest()
+        if path is None:
+            return None
+        checkpoint = torch.load(path, map_location='cpu', mmap=mmap)
+        agent.load_checkpoint(checkpoint)
+        logger.info(f"Punkt kontrolny wczytany z {path} (epizod {checkpoint.get('episode')})")
+        return checkpoint
+
+    def wait(self):
+        """
+        Czeka na zakończenie zleconych zapisów i zgłasza ich błędy.
+        """
+        while self._pending:
+            self._pending.popleft().result()
+
+    def close(self):
+        """
+        Kończy zapisy w tle i zamyka plik metryk; błędy zapisu są logowane.
+        """
+        try:
+            self.wait()
+        except Exception as e:
+            logger.error(f"Błąd zapisu punktu kontrolnego: {e}")
+        finally:
+            self._pending.clear()
+            self._executor.shutdown(wait=True)
+            self._metrics.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _submit(self, agent, episode, path, rotate, training_state=None):
+        # Zakończone zapisy zgłaszają błędy przy kolejnym zleceniu, a zbyt wiele oczekujących ogranicza pamięć
+        while self._pending and (self._pending[0].done() or len(self._pending) >= self.max_pending):
+            self._pending.popleft().result()
+        state = agent.checkpoint_state(episode=episode)
+        state.update(training_state or {})
+        state = snapshot(state)
+        self._pending.append(self._executor.submit(self._write, state, path, rotate))
+
+    def _write(self, state, path, rotate):
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'wb') as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, path)
+        logger.debug(f"Punkt kontrolny zapisany do {path}")
+        if rotate:
+            for old_path in self.checkpoints()[:-self.keep_last]:
+                os.remove(old_path)
+                logger.debug(f"Usunięto stary punkt kontrolny {old_path}")
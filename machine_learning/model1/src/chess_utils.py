@@ -39,6 +39,45 @@ def legal_moves_to_indices(board):
     """
     return [move_to_index(move) for move in board.legal_moves]
 
+# Kolejność kanałów [12, 8, 8]: białe P, N, B, R, Q, K, następnie czarne p, n, b, r, q, k
+PIECE_CHANNELS = [(piece_type, color) for color in (chess.WHITE, chess.BLACK)
+                  for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP,
+                                     chess.ROOK, chess.QUEEN, chess.KING)]
+
+def board_masks(board):
+    """
+    Zwraca 64-bitowe maski bierek dla każdego z 12 kanałów wejściowych.
+
+    Parametry:
+    - board (chess.Board): Aktualna plansza gry.
+
+    Zwraca:
+    - lista int: 12 masek bitowych w kolejności PIECE_CHANNELS (bit i = pole i).
+    """
+    return [board.pieces_mask(piece_type, color) for piece_type, color in PIECE_CHANNELS]
+
+def bitboards_to_planes(masks, out=None):
+    """
+    Rozpakowuje maski bitowe [N, C] (uint64) do płaszczyzn [N, C, 8, 8] operacjami tablicowymi.
+
+    Wiersz 0 odpowiada ósmej linii (jak w board_to_tensor), kolumna 0 linii "a".
+
+    Parametry:
+    - masks (np.ndarray): Tablica masek o kształcie [N, C] i typie uint64.
+    - out (np.ndarray, opcjonalnie): Bufor float32 [N, C, 8, 8] wypełniany w miejscu.
+
+    Zwraca:
+    - np.ndarray: Płaszczyzny o kształcie [N, C, 8, 8].
+    """
+    masks = np.ascontiguousarray(masks, dtype='<u8')
+    n, channels = masks.shape
+    if out is None:
+        out = np.empty((n, channels, 8, 8), dtype=np.float32)
+    # Każda maska to 8 bajtów (po jednym na linię), bity w bajcie to kolumny a-h
+    bits = np.unpackbits(masks.view(np.uint8).reshape(n, channels, 8, 1), axis=-1, bitorder='little')
+    out[...] = bits[:, :, ::-1, :]
+    return out
+
 def get_attacked_squares(board, color):
     """
     Zwraca zestaw pól atakowanych przez dany kolor.
@@ -51,7 +90,7 @@ def get_attacked_squares(board, color):
     - chess.SquareSet: Zestaw pól atakowanych przez określony kolor.
     """
     attacked = chess.SquareSet()
-    for square in board.occupied_co[color]:
+    for square in chess.SquareSet(board.occupied_co[color]):
         attacked |= board.attacks(square)
     return attacked
 
@@ -68,19 +107,9 @@ def generate_bitboards(board):
     # 0-5: Typy figur, 6: Kontrolowane pola, 7-10: Prawa do roszady, 11: Bicie w przelocie
     bitboards = np.zeros((12, 8, 8), dtype=np.float32)
 
-    # Bierki
-    for piece_type, index in PIECE_TO_INDEX.items():
-        # Białe bierki
-        white_squares = board.pieces(piece_type, chess.WHITE)
-        for square in white_squares:
-            row, col = divmod(square, 8)
-            bitboards[index, row, col] = 1.0  # Białe jako +1
-
-        # Czarne bierki
-        black_squares = board.pieces(piece_type, chess.BLACK)
-        for square in black_squares:
-            row, col = divmod(square, 8)
-            bitboards[index, row, col] = -1.0  # Czarne jako -1
+    # Bierki (białe jako +1, czarne jako -1); wiersz odpowiada linii planszy
+    pieces = bitboards_to_planes(np.array([board_masks(board)], dtype=np.uint64))[0, :, ::-1, :]
+    bitboards[:6] = pieces[:6] - pieces[6:]
 
     # Kontrolowane pola
     controlled_squares = np.zeros((8, 8), dtype=np.float32)
@@ -111,41 +140,45 @@ def generate_bitboards(board):
 
     return bitboards
 
+def encode_batch(boards, out=None):
+    """
+    Koduje wiele plansz naraz do tensora wejściowego sieci neuronowej.
+
+    Wynik dla każdej planszy jest identyczny z board_to_tensor.
+
+    Parametry:
+    - boards (lista chess.Board): Plansze do zakodowania.
+    - out (torch.Tensor, opcjonalnie): Prealokowany bufor float32 [N, 12, 8, 8] wypełniany w miejscu.
+
+    Zwraca:
+    - torch.Tensor: Tensor o kształcie [N, 12, 8, 8].
+    """
+    masks = np.fromiter((mask for board in boards for mask in board_masks(board)),
+                        dtype=np.uint64).reshape(-1, len(PIECE_CHANNELS))
+    if out is None:
+        out = torch.empty(masks.shape[0], len(PIECE_CHANNELS), 8, 8, dtype=torch.float32)
+    if out.shape != (masks.shape[0], len(PIECE_CHANNELS), 8, 8):
+        raise ValueError(f"Nieprawidłowy kształt bufora: {tuple(out.shape)}")
+
+    if out.device.type == 'cpu' and out.is_contiguous():
+        bitboards_to_planes(masks, out=out.numpy())
+    else:
+        out.copy_(torch.from_numpy(bitboards_to_planes(masks)))
+    return out
+
 def board_to_tensor(board):
     """
     Konwertuje obiekt chess.Board na tensor wejściowy dla sieci neuronowej.
 
+    Kanały 0-5 to białe P, N, B, R, Q, K, kanały 6-11 to czarne p, n, b, r, q, k.
+
     Parametry:
     - board (chess.Board): Aktualna plansza gry.
 
     Zwraca:
     - torch.Tensor: Tensor o kształcie [12, 8, 8] reprezentujący stan planszy.
     """
-    tensor = torch.zeros(12, 8, 8)
-
-    piece_to_channel = {
-        'P': 0,  # Biały pion
-        'N': 1,  # Biały skoczek
-        'B': 2,  # Biały goniec
-        'R': 3,  # Biała wieża
-        'Q': 4,  # Biała hetman
-        'K': 5,  # Biały król
-        'p': 6,  # Czarny pion
-        'n': 7,  # Czarny skoczek
-        'b': 8,  # Czarny goniec
-        'r': 9,  # Czarna wieża
-        'q': 10, # Czarna hetman
-        'k': 11  # Czarny król
-    }
-
-    for square, piece in board.piece_map().items():
-        row = 7 - (square // 8)
-        col = square % 8
-        channel = piece_to_channel.get(piece.symbol())
-        if channel is not None:
-            tensor[channel, row, col] = 1.0
-
-    return tensor
+    return encode_batch([board])[0]
 
 def index_to_move(board, idx):
     """
@@ -177,6 +210,61 @@ def index_to_move(board, idx):
     else:
         return None
 
+def legal_move_indices(board):
+    """
+    Zwraca posortowane, unikalne indeksy akcji legalnych ruchów w zwartej postaci.
+
+    Promocje na różne figury mają ten sam indeks (from * 64 + to), więc występują raz.
+
+    Parametry:
+    - board (chess.Board): Aktualna plansza gry.
+
+    Zwraca:
+    - np.ndarray: Tablica int16 indeksów akcji (0-4095).
+    """
+    indices = np.fromiter((move.from_square * 64 + move.to_square for move in board.legal_moves),
+                          dtype=np.int16)
+    return np.unique(indices)
+
+def indices_to_mask(indices, out=None):
+    """
+    Zamienia indeksy legalnych akcji na mapę bitową [4096] typu bool.
+
+    Parametry:
+    - indices (np.ndarray): Indeksy akcji (np. z legal_move_indices).
+    - out (np.ndarray, opcjonalnie): Bufor bool [4096] nadpisywany w miejscu.
+
+    Zwraca:
+    - np.ndarray: Maska bool o kształcie [4096].
+    """
+    if out is None:
+        out = np.zeros(4096, dtype=bool)
+    else:
+        out[:] = False
+    out[indices] = True
+    return out
+
+def get_action_mask_batch(boards=None, indices=None):
+    """
+    Tworzy maski akcji dla N pozycji jednym rozproszonym zapisem (scatter).
+
+    Parametry:
+    - boards (lista chess.Board, opcjonalnie): Plansze, dla których liczone są legalne ruchy.
+    - indices (lista np.ndarray, opcjonalnie): Gotowe indeksy legalnych akcji dla każdej pozycji.
+
+    Zwraca:
+    - torch.Tensor: Maska bool o kształcie [N, 4096].
+    """
+    if indices is None:
+        indices = [legal_move_indices(board) for board in boards]
+    counts = np.fromiter((len(idx) for idx in indices), dtype=np.int64, count=len(indices))
+    rows = np.repeat(np.arange(len(indices)), counts)
+    cols = np.concatenate(indices).astype(np.int64) if counts.sum() else np.empty(0, dtype=np.int64)
+
+    mask = torch.zeros(len(indices), 4096, dtype=torch.bool)
+    mask[torch.from_numpy(rows), torch.from_numpy(cols)] = True
+    return mask
+
 def get_action_mask(board):
     """
     Tworzy maskę akcji wskazującą, które ruchy są legalne.
@@ -188,10 +276,4 @@ def get_action_mask(board):
     - torch.Tensor: Tensor o kształcie [1, 4096], gdzie każdy element odpowiada ruchowi.
                     Wartość 1.0 wskazuje legalny ruch, a 0.0 przeciwnie.
     """
-    action_mask = torch.zeros(1, 4096, dtype=torch.float32)
-
-    for move in board.legal_moves:
-        action_idx = move_to_index(move)
-        action_mask[0, action_idx] = 1.0
-
-    return action_mask
+    return get_action_mask_batch([board]).to(torch.float32)
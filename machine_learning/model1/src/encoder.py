@@ -0,0 +1,185 @@
+# encoder.py
+
+import chess
+import numpy as np
+import torch
+from chess_utils import (
+    board_masks,
+    bitboards_to_planes,
+    board_to_tensor,
+    generate_bitboards
+)
+
+
+def _squares(mask):
+    """
+    Zwraca numery pól ustawionych w masce bitowej.
+    """
+    while mask:
+        lsb = mask & -mask
+        yield lsb.bit_length() - 1
+        mask ^= lsb
+
+
+class IncrementalEncoder:
+    def __init__(self, board=None, debug=False):
+        """
+        Inicjalizuje koder pozycji aktualizowany przyrostowo przy push()/pop().
+
+        Koder jest związany z obiektem planszy: ruchy należy wykonywać przez
+        encoder.push()/encoder.pop(), a po zmianach wykonanych bezpośrednio na
+        planszy wywołać reset().
+
+        Parametry:
+        - board (chess.Board, opcjonalnie): Plansza, na której działa koder. Domyślnie pozycja początkowa.
+        - debug (bool): Jeśli True, po każdej zmianie wynik jest porównywany z pełnym kodowaniem.
+        """
+        self.board = board if board is not None else chess.Board()
+        self.debug = debug
+        self.reset()
+
+    def reset(self):
+        """
+        Koduje całą planszę od nowa i czyści historię zmian.
+        """
+        self._masks = board_masks(self.board)
+        self._planes = board_to_tensor(self.board).clone()
+        self._planes_np = self._planes.numpy()  # Widok do szybkich zapisów pojedynczych pól
+        self._attacks = {square: self.board.attacks_mask(square)
+                         for square in _squares(self.board.occupied)}
+        self._history = []
+        self._verify()
+
+    def push(self, move):
+        """
+        Wykonuje ruch na planszy i aktualizuje płaszczyzny tylko na zmienionych polach.
+
+        Parametry:
+        - move (chess.Move): Ruch do wykonania.
+        """
+        old_masks = self._masks
+        self.board.push(move)
+        self._masks = board_masks(self.board)
+
+        changed = 0
+        for channel, (old, new) in enumerate(zip(old_masks, self._masks)):
+            diff = old ^ new
+            if diff:
+                changed |= diff
+                self._update_planes(channel, diff)
+
+        # Zmieniają się ataki bierek z przestawionych pól oraz bierek, których
+        # aktualne linie ataku przechodzą przez zmienione pola (blokery)
+        attack_changes = []
+        affected = changed
+        for square, attacks in self._attacks.items():
+            if attacks & changed:
+                affected |= chess.BB_SQUARES[square]
+        for square in _squares(affected):
+            attack_changes.append((square, self._attacks.get(square)))
+            if self.board.occupied & chess.BB_SQUARES[square]:
+                self._attacks[square] = self.board.attacks_mask(square)
+            else:
+                self._attacks.pop(square, None)
+
+        self._history.append((old_masks, attack_changes))
+        self._verify()
+
+    def pop(self):
+        """
+        Cofa ostatni ruch i przywraca poprzedni stan płaszczyzn.
+
+        Zwraca:
+        - chess.Move: Cofnięty ruch.
+        """
+        move = self.board.pop()
+        old_masks, attack_changes = self._history.pop()
+        current_masks, self._masks = self._masks, old_masks
+        for channel, (old, new) in enumerate(zip(old_masks, current_masks)):
+            diff = old ^ new
+            if diff:
+                self._update_planes(channel, diff)
+
+        for square, attacks in reversed(attack_changes):
+            if attacks is None:
+                self._attacks.pop(square, None)
+            else:
+                self._attacks[square] = attacks
+
+        self._verify()
+        return move
+
+    def tensor(self):
+        """
+        Zwraca płaszczyzny bierek w układzie board_to_tensor.
+
+        Zwracany tensor jest współdzielony z koderem i zmienia się przy push()/pop();
+        aby go zachować, należy wykonać .clone().
+
+        Zwraca:
+        - torch.Tensor: Tensor o kształcie [12, 8, 8].
+        """
+        return self._planes
+
+    def attacked_mask(self, color):
+        """
+        Zwraca maskę pól atakowanych przez dany kolor (odpowiednik get_attacked_squares).
+
+        Parametry:
+        - color (chess.Color): Kolor atakujący.
+
+        Zwraca:
+        - int: Maska bitowa atakowanych pól.
+        """
+        occupied = self.board.occupied_co[color]
+        attacked = 0
+        for square, attacks in self._attacks.items():
+            if occupied & chess.BB_SQUARES[square]:
+                attacked |= attacks
+        return attacked
+
+    def bitboards(self):
+        """
+        Zwraca płaszczyzny w układzie generate_bitboards (bierki, kontrolowane pola, roszady, bicie w przelocie).
+
+        Zwraca:
+        - np.ndarray: Tablica 12x8x8.
+        """
+        bitboards = np.zeros((12, 8, 8), dtype=np.float32)
+
+        pieces = bitboards_to_planes(np.array([self._masks], dtype=np.uint64))[0, :, ::-1, :]
+        bitboards[:6] = pieces[:6] - pieces[6:]
+
+        attacks = np.array([[self.attacked_mask(chess.WHITE), self.attacked_mask(chess.BLACK)]], dtype=np.uint64)
+        controlled = bitboards_to_planes(attacks)[0, :, ::-1, :]
+        bitboards[6] = controlled[0] - controlled[1]
+
+        bitboards[7] = self.board.has_kingside_castling_rights(chess.WHITE)
+        bitboards[8] = self.board.has_queenside_castling_rights(chess.WHITE)
+        bitboards[9] = self.board.has_kingside_castling_rights(chess.BLACK)
+        bitboards[10] = self.board.has_queenside_castling_rights(chess.BLACK)
+
+        if self.board.ep_square is not None:
+            row, col = divmod(self.board.ep_square, 8)
+            bitboards[11, row, col] = 1.0
+
+        return bitboards
+
+    def _update_planes(self, channel, diff):
+        """
+        Przepisuje płaszczyznę kanału na polach z maski diff zgodnie z aktualnymi maskami.
+        """
+        mask = self._masks[channel]
+        for square in _squares(diff):
+            self._planes_np[channel, 7 - square // 8, square % 8] = 1.0 if mask & chess.BB_SQUARES[square] else 0.0
+
+    def _verify(self):
+        """
+        W trybie debug porównuje stan kodera z pełnym kodowaniem planszy.
+        """
+        if not self.debug:
+            return
+        if not torch.equal(self._planes, board_to_tensor(self.board)):
+            raise RuntimeError(f"Płaszczyzny bierek niezgodne z pełnym kodowaniem dla FEN: {self.board.fen()}")
+        if not np.array_equal(self.bitboards(), generate_bitboards(self.board)):
+            raise RuntimeError(f"Bitboardy niezgodne z pełnym kodowaniem dla FEN: {self.board.fen()}")
@@ -0,0 +1,228 @@
+# engine_limits.py
+
+import logging
+from collections import deque
+import chess.engine
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+LIMIT_MODES = ('depth', 'nodes')
+BUDGET_SCOPES = ('search', 'episode')
+
+class EngineLimitScheduler:
+    def __init__(self, mode='depth', budget_ms=None, budget_nodes=None, per='search',
+                 start_depth=5, min_depth=1, max_depth=20,
+                 start_nodes=20000, min_nodes=1000, max_nodes=2000000, nodes_step=1000,
+                 raise_every=10000, raise_factor=2.0, tolerance=0.2, smoothing=0.3, history_size=1000):
+        """
+        Inicjalizuje harmonogram limitów silnika utrzymujący koszt wyszukiwań w zadanym budżecie.
+
+        Środowisko zgłasza koszt każdego wyszukiwania (czas i liczbę węzłów), a po każdym epizodzie
+        harmonogram porównuje wygładzony koszt z budżetem: przy przekroczeniu obniża limit, a poniżej
+        budżetu podnosi go w stronę docelowej siły przeciwnika. Docelowa siła rośnie co raise_every
+        epizodów (o jeden poziom głębokości lub raise_factor razy liczba węzłów), tak jak dawny
+        harmonogram głębokości, ale nigdy ponad budżet.
+
+        Parametry:
+        - mode (str): Rodzaj regulowanego limitu: 'depth' lub 'nodes'.
+        - budget_ms (float, opcjonalnie): Budżet czasu w milisekundach.
+        - budget_nodes (int, opcjonalnie): Budżet liczby węzłów (gdy silnik je raportuje).
+        - per (str): Zakres budżetu: 'search' (jedno wyszukiwanie) lub 'episode' (suma w epizodzie).
+        - start_depth, min_depth, max_depth (int): Początkowa, minimalna i maksymalna głębokość.
+        - start_nodes, min_nodes, max_nodes (int): Początkowa, minimalna i maksymalna liczba węzłów.
+        - nodes_step (int): Krok zaokrąglania liczby węzłów (stałe wartości sprzyjają pamięci podręcznej ocen).
+        - raise_every (int): Co ile epizodów rośnie docelowa siła przeciwnika.
+        - raise_factor (float): Mnożnik docelowej liczby węzłów przy każdym wzroście siły.
+        - tolerance (float): Względna tolerancja budżetu, w której limit nie jest zmieniany.
+        - smoothing (float): Waga nowego pomiaru w średniej wykładniczej kosztu.
+        - history_size (int): Liczba ostatnich epizodów przechowywanych w historii (starsze są usuwane).
+        """
+        if mode not in LIMIT_MODES:
+            raise ValueError(f"Nieznany rodzaj limitu: {mode}")
+        if per not in BUDGET_SCOPES:
+            raise ValueError(f"Nieznany zakres budżetu: {per}")
+        if budget_ms is None and budget_nodes is None:
+            raise ValueError("Podaj budget_ms lub budget_nodes.")
+        self.mode = mode
+        self.budget_ms = budget_ms
+        self.budget_nodes = budget_nodes
+        self.per = per
+        self.start_depth, self.min_depth, self.max_depth = start_depth, min_depth, max_depth
+        self.start_nodes, self.min_nodes, self.max_nodes = start_nodes, min_nodes, max_nodes
+        self.nodes_step = nodes_step
+        self.raise_every = raise_every
+        self.raise_factor = raise_factor
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+
+        self.depth = start_depth
+        self.nodes = start_nodes
+        self.history = deque(maxlen=history_size)  # (epizod, limit, koszt ms, koszt w węzłach, liczba wyszukiwań)
+        self._cost_by_level = {}  # Wygładzony koszt (ms, węzły) dla każdego poziomu limitu
+        self._reset_episode()
+
+    def limit(self):
+        """
+        Zwraca bieżący limit wyszukiwania.
+
+        Zwraca:
+        - chess.engine.Limit: Limit głębokości lub liczby węzłów.
+        """
+        if self.mode == 'depth':
+            return chess.engine.Limit(depth=self.depth)
+        return chess.engine.Limit(nodes=self.nodes)
+
+    def level(self):
+        """
+        Zwraca wartość regulowanego limitu (głębokość lub liczba węzłów).
+        """
+        return self.depth if self.mode == 'depth' else self.nodes
+
+    def describe(self):
+        """
+        Zwraca opis bieżącego limitu do logów, np. "depth=6".
+        """
+        return f"{self.mode}={self.level()}"
+
+    def record(self, seconds, nodes=None, searches=1):
+        """
+        Zapisuje koszt wyszukiwań wykonanych z bieżącym limitem.
+
+        Parametry:
+        - seconds (float): Czas ściany wyszukiwań w sekundach.
+        - nodes (int, opcjonalnie): Łączna liczba węzłów (jeśli silnik ją podał).
+        - searches (int): Liczba wyszukiwań (wyszukiwania zbiorcze mierzone są razem).
+        """
+        self._episode_seconds += seconds
+        self._episode_searches += searches
+        if nodes is not None:
+            self._episode_nodes += nodes
+            self._episode_node_searches += searches
+
+    def end_episode(self, episode, num_episodes=1):
+        """
+        Kończy pomiar epizodu i dostosowuje limit do budżetu oraz docelowej siły przeciwnika.
+
+        Parametry:
+        - episode (int): Numer ostatniego zakończonego epizodu.
+        - num_episodes (int): Liczba epizodów rozegranych od poprzedniego wywołania (partie równoległe).
+
+        Zwraca:
+        - bool: Czy limit został zmieniony.
+        """
+        searches = self._episode_searches
+        cost_ms = 1000 * self._episode_seconds
+        cost_nodes = self._episode_nodes if self._episode_node_searches else None
+        if self.per == 'search' and searches:
+            cost_ms /= searches
+            if cost_nodes is not None:
+                cost_nodes /= self._episode_node_searches
+        elif self.per == 'episode':
+            cost_ms /= num_episodes
+            if cost_nodes is not None:
+                cost_nodes /= num_episodes
+        self.history.append((episode, self.level(), cost_ms, cost_nodes, searches))
+        self._reset_episode()
+        if not searches:
+            return False
+
+        level = self.level()
+        smoothed = self._smooth(level, cost_ms, cost_nodes)
+        new_level = self._next_depth(smoothed, episode) if self.mode == 'depth' else self._next_nodes(smoothed, episode)
+        if new_level == level:
+            return False
+        if self.mode == 'depth':
+            self.depth = new_level
+        else:
+            self.nodes = new_level
+        logger.info(f"Limit silnika zmieniony: {self.mode} {level} -> {new_level} "
+                    f"(koszt {self._format_cost(smoothed)}, budżet {self._format_budget()} na {self.per})")
+        return True
+
+    def target_level(self, episode):
+        """
+        Zwraca docelową siłę przeciwnika (limit bez ograniczenia budżetem) po danym epizodzie.
+        """
+        raises = max(episode, 0) // self.raise_every if self.raise_every else 0
+        if self.mode == 'depth':
+            return min(self.start_depth + raises, self.max_depth)
+        return min(self._round_nodes(self.start_nodes * self.raise_factor ** raises), self.max_nodes)
+
+    def _ratio(self, cost):
+        """
+        Zwraca stosunek kosztu do budżetu (największy z dostępnych rodzajów budżetu) lub None.
+        """
+        cost_ms, cost_nodes = cost
+        ratios = []
+        if self.budget_ms is not None:
+            ratios.append(cost_ms / self.budget_ms)
+        if self.budget_nodes is not None and cost_nodes is not None:
+            ratios.append(cost_nodes / self.budget_nodes)
+        return max(ratios) if ratios else None
+
+    def _next_depth(self, cost, episode):
+        depth = self.depth
+        ratio = self._ratio(cost)
+        if ratio is None:
+            return depth
+        if ratio > 1 + self.tolerance:
+            return max(depth - 1, self.min_depth)
+        target = self.target_level(episode)
+        if depth > target:
+            return depth - 1
+        if depth < target:
+            # Koszt następnej głębokości: zmierzony wcześniej albo przewidziany ze wzrostu między głębokościami
+            predicted = self._cost_by_level.get(depth + 1)
+            if predicted is None:
+                previous = self._cost_by_level.get(depth - 1)
+                growth = self._ratio(cost) / self._ratio(previous) if previous and self._ratio(previous) else 3.0
+                predicted_ratio = ratio * max(growth, 1.0)
+            else:
+                predicted_ratio = self._ratio(predicted)
+            if predicted_ratio is not None and predicted_ratio <= 1 + self.tolerance:
+                return depth + 1
+        return depth
+
+    def _next_nodes(self, cost, episode):
+        nodes = self.nodes
+        ratio = self._ratio(cost)
+        if ratio is None:
+            return nodes
+        target = self.target_level(episode)
+        if ratio > 1 + self.tolerance or ratio < 1 - self.tolerance or nodes > target:
+            # Koszt rośnie w przybliżeniu liniowo z liczbą węzłów; zmiana ograniczona do 2x na epizod
+            scale = min(max(1 / max(ratio, 1e-9), 0.5), 2.0)
+            nodes = self._round_nodes(nodes * scale)
+        return min(max(nodes, self.min_nodes), target)
+
+    def _round_nodes(self, nodes):
+        return max(int(round(nodes / self.nodes_step)) * self.nodes_step, self.nodes_step)
+
+    def _smooth(self, level, cost_ms, cost_nodes):
+        previous = self._cost_by_level.get(level)
+        if previous is not None:
+            cost_ms = (1 - self.smoothing) * previous[0] + self.smoothing * cost_ms
+            if cost_nodes is not None and previous[1] is not None:
+                cost_nodes = (1 - self.smoothing) * previous[1] + self.smoothing * cost_nodes
+        self._cost_by_level[level] = (cost_ms, cost_nodes)
+        return cost_ms, cost_nodes
+
+    def _format_cost(self, cost):
+        cost_ms, cost_nodes = cost
+        text = f"{cost_ms:.1f} ms"
+        return text + (f", {cost_nodes:.0f} węzłów" if cost_nodes is not None else "")
+
+    def _format_budget(self):
+        parts = []
+        if self.budget_ms is not None:
+            parts.append(f"{self.budget_ms:g} ms")
+        if self.budget_nodes is not None:
+            parts.append(f"{self.budget_nodes} węzłów")
+        return ", ".join(parts)
+
+    def _reset_episode(self):
+        self._episode_seconds = 0.0
+        self._episode_searches = 0
+        self._episode_nodes = 0
+        self._episode_node_searches = 0
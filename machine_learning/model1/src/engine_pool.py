@@ -0,0 +1,191 @@
+# engine_pool.py
+
+import asyncio
+import logging
+import threading
+import chess
+import chess.engine
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+class EnginePool:
+    def __init__(self, engine_path, size=2, timeout=30.0, options=None, max_retries=1):
+        """
+        Inicjalizuje pulę size procesów silnika UCI obsługiwanych przez asynchroniczne API python-chess.
+
+        Pętla asyncio działa w osobnym wątku, a metody publiczne są synchroniczne, więc pula może
+        zastąpić chess.engine.SimpleEngine (analyse, play, quit). Zapytania z analyse_many/play_many
+        są rozdzielane na wolne silniki, a wyniki zwracane w kolejności plansz. Silnik, który przekroczy
+        timeout lub zakończy się błędem, jest uruchamiany ponownie, a zapytanie powtarzane.
+
+        Parametry:
+        - engine_path (str): Ścieżka do pliku wykonywalnego silnika (lub lista argumentów polecenia).
+        - size (int): Liczba procesów silnika.
+        - timeout (float): Maksymalny czas jednego zapytania w sekundach.
+        - options (dict, opcjonalnie): Opcje UCI ustawiane w każdym silniku (np. {"Threads": 1}).
+        - max_retries (int): Liczba powtórzeń zapytania po ponownym uruchomieniu silnika.
+        """
+        self.engine_path = engine_path
+        self.size = size
+        self.timeout = timeout
+        self.options = options or {}
+        self.max_retries = max_retries
+        self.restarts = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="EnginePool", daemon=True)
+        self._thread.start()
+        self._engines = [None] * size
+        self._idle = None
+        try:
+            self._call(self._start())
+        except Exception:
+            self.quit()
+            raise
+        logger.info(f"Pula silników uruchomiona: {size} x {engine_path}")
+
+    def analyse(self, board, limit, **kwargs):
+        """
+        Analizuje pozycję (jak SimpleEngine.analyse).
+
+        Zwraca:
+        - dict: Informacje analizy (np. "score", "pv").
+        """
+        return self._call(self._run('analyse', board.copy(), limit, kwargs))
+
+    def play(self, board, limit, **kwargs):
+        """
+        Wybiera ruch w pozycji (jak SimpleEngine.play).
+
+        Zwraca:
+        - chess.engine.PlayResult: Wynik z wybranym ruchem.
+        """
+        return self._call(self._run('play', board.copy(), limit, kwargs))
+
+    def analyse_many(self, boards, limit, **kwargs):
+        """
+        Analizuje wiele pozycji równolegle na wszystkich silnikach puli.
+
+        Parametry:
+        - boards (lista chess.Board): Pozycje do analizy.
+        - limit (chess.engine.Limit): Limit wyszukiwania.
+
+        Zwraca:
+        - lista dict lub None: Informacje analizy w kolejności plansz (None, jeśli zapytanie się nie powiodło).
+        """
+        return self._call(self._run_many('analyse', boards, limit, kwargs))
+
+    def play_many(self, boards, limit, **kwargs):
+        """
+        Wybiera ruchy w wielu pozycjach równolegle na wszystkich silnikach puli.
+
+        Parametry:
+        - boards (lista chess.Board): Pozycje.
+        - limit (chess.engine.Limit): Limit wyszukiwania.
+
+        Zwraca:
+        - lista chess.engine.PlayResult lub None: Wyniki w kolejności plansz (None, jeśli zapytanie się nie powiodło).
+        """
+        return self._call(self._run_many('play', boards, limit, kwargs))
+
+    def quit(self):
+        """
+        Zamyka wszystkie silniki i zatrzymuje wątek pętli zdarzeń.
+        """
+        if not self._loop.is_running():
+            return
+        try:
+            self._call(self._stop())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            logger.info("Pula silników zamknięta.")
+
+    def close(self):
+        self.quit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.quit()
+
+    def _call(self, coroutine):
+        """
+        Wykonuje korutynę w pętli puli i czeka na wynik.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _start(self):
+        self._idle = asyncio.Queue()
+        await asyncio.gather(*(self._open(index) for index in range(self.size)))
+        for index in range(self.size):
+            self._idle.put_nowait(index)
+
+    async def _open(self, index):
+        _, engine = await chess.engine.popen_uci(self.engine_path)
+        if self.options:
+            await engine.configure(self.options)
+        self._engines[index] = engine
+
+    async def _restart(self, index):
+        """
+        Zamyka (lub porzuca) silnik o danym indeksie i uruchamia nowy proces.
+        """
+        engine = self._engines[index]
+        self._engines[index] = None
+        if engine is not None:
+            try:
+                await asyncio.wait_for(engine.quit(), timeout=1.0)
+            except Exception:
+                pass
+            # Zamknięcie transportu kończy proces, który nie odpowiada
+            transport = getattr(engine, 'transport', None)
+            if transport is not None:
+                transport.close()
+        self.restarts += 1
+        await self._open(index)
+        logger.warning(f"Silnik {index} puli uruchomiony ponownie (łącznie restartów: {self.restarts}).")
+
+    async def _run(self, method, board, limit, kwargs):
+        """
+        Wykonuje zapytanie na pierwszym wolnym silniku, z limitem czasu i ponownym uruchomieniem po błędzie.
+        """
+        index = await self._idle.get()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if self._engines[index] is None:
+                        await self._open(index)
+                    query = getattr(self._engines[index], method)(board, limit, **kwargs)
+                    return await asyncio.wait_for(query, timeout=self.timeout)
+                except (asyncio.TimeoutError, chess.engine.EngineError, chess.engine.EngineTerminatedError, OSError) as e:
+                    logger.warning(f"Błąd silnika {index} puli ({type(e).__name__}: {e}). Próba {attempt + 1}.")
+                    if attempt == self.max_retries:
+                        raise
+                    await self._restart(index)
+        finally:
+            self._idle.put_nowait(index)
+
+    async def _run_many(self, method, boards, limit, kwargs):
+        results = await asyncio.gather(*(self._run(method, board.copy(), limit, kwargs) for board in boards),
+                                       return_exceptions=True)
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.error(f"Zapytanie {method} dla pozycji {boards[i].fen()} nie powiodło się: {result}")
+                results[i] = None
+        return results
+
+    async def _stop(self):
+        for engine in self._engines:
+            if engine is None:
+                continue
+            try:
+                await asyncio.wait_for(engine.quit(), timeout=2.0)
+            except Exception:
+                transport = getattr(engine, 'transport', None)
+                if transport is not None:
+                    transport.close()
+        self._engines = [None] * self.size
@@ -1,25 +1,51 @@
 import chess
 import chess.engine
 import logging
+import time
+from collections import namedtuple
+from engine_pool import EnginePool
+from lite_engine import engine_command, open_engine
+from profiler import NULL_PROFILER
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Wynik jednego wyszukiwania w pozycji przeciwnika: ruch, ocena przed ruchem i wariant główny
+OpponentStep = namedtuple('OpponentStep', ['move', 'score', 'pv'])
+
 class ChessEnvironment:
-    def __init__(self, agent_color=chess.WHITE, stockfish_path=None, stockfish_depth=5):
+    def __init__(self, agent_color=chess.WHITE, stockfish_path=None, stockfish_depth=5, position_cache=None, profiler=None,
+                 eval_cache=None, stockfish_engines=1, limit_scheduler=None):
         """
         Inicjalizuje środowisko szachowe.
 
         Parametry:
         - agent_color (chess.Color): Kolor agenta (chess.WHITE lub chess.BLACK).
-        - stockfish_path (str): Ścieżka do pliku wykonywalnego silnika Stockfish.
+        - stockfish_path (str): Ścieżka do pliku wykonywalnego silnika Stockfish albo "lite[:opcje]"
+          dla wbudowanego silnika LiteEngine (w procesie; z pulą - jako procesy UCI).
         - stockfish_depth (int): Początkowa głębokość analizy dla Stockfisha.
+        - position_cache (PositionCache, opcjonalnie): Pamięć podręczna legalnych ruchów pozycji.
+        - profiler (PhaseProfiler, opcjonalnie): Profiler faz (oceny i ruchy Stockfisha).
+        - eval_cache (EvalCache, opcjonalnie): Pamięć podręczna ocen Stockfisha (w pamięci i na dysku).
+        - stockfish_engines (int): Liczba procesów Stockfisha. Dla wartości > 1 używana jest EnginePool,
+          a get_stockfish_evaluations/get_opponent_moves rozdzielają pozycje na wszystkie silniki.
+        - limit_scheduler (EngineLimitScheduler, opcjonalnie): Harmonogram limitów wyszukiwania; jeśli podany,
+          zastępuje stałą głębokość stockfish_depth i otrzymuje koszt każdego wyszukiwania.
         """
         self.board = chess.Board()
         self.agent_color = agent_color
-        self.stockfish = chess.engine.SimpleEngine.popen_uci(stockfish_path) if stockfish_path else None
+        if not stockfish_path:
+            self.stockfish = None
+        elif stockfish_engines > 1:
+            self.stockfish = EnginePool(engine_command(stockfish_path), size=stockfish_engines)
+        else:
+            self.stockfish = open_engine(stockfish_path)
         self.stockfish_depth = stockfish_depth  # Dynamiczne zarządzanie głębokością
+        self.position_cache = position_cache
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.eval_cache = eval_cache
+        self.limit_scheduler = limit_scheduler
         if not self.stockfish:
             logger.warning("Silnik Stockfish nie został zainicjalizowany. Przeciwnik i ocena pozycji nie będą działać.")
 
@@ -33,10 +59,13 @@ class ChessEnvironment:
         self.board.reset()
         return
 
-    def get_stockfish_evaluation(self):
+    def get_stockfish_evaluation(self, board=None):
         """
         Pobiera bieżącą ocenę planszy od Stockfisha.
 
+        Parametry:
+        - board (chess.Board, opcjonalnie): Plansza do oceny; domyślnie plansza środowiska.
+
         Zwraca:
         - Ocena pozycji w centypionach (int) lub None, jeśli silnik jest niedostępny.
         """
@@ -44,34 +73,48 @@ class ChessEnvironment:
             logger.warning("Silnik Stockfish nie został zainicjalizowany.")
             return None
         try:
-            limit = chess.engine.Limit(depth=self.stockfish_depth)
-            info = self.stockfish.analyse(self.board, limit)
-            score = info["score"].relative
-            if score.is_mate():  # Obsługa ocen mata
-                mate_score = 100000 if score.mate() > 0 else -100000
-                logger.debug(f"Wykryto mata z oceną: {mate_score}")
-                return mate_score
-            logger.debug(f"Ocena Stockfisha: {score.score(mate_score=100000)} centypionów")
-            return score.score(mate_score=100000)
+            board = board if board is not None else self.board
+            with self.profiler.phase('stockfish_eval'):
+                info = self._analyse(board, self.search_limit())
+            return self._score_to_centipawns(info)
         except Exception as e:
             logger.error(f"Błąd podczas pobierania oceny od Stockfisha: {e}")
             return None
 
-    def get_opponent_move(self):
+    def get_stockfish_evaluations(self, boards):
+        """
+        Pobiera oceny wielu plansz; z pulą silników (stockfish_engines > 1) analizy wykonywane są równolegle.
+
+        Parametry:
+        - boards (lista chess.Board): Plansze do oceny.
+
+        Zwraca:
+        - lista int lub None: Oceny w centypionach w kolejności plansz (jak get_stockfish_evaluation).
+        """
+        if not isinstance(self.stockfish, EnginePool):
+            return [self.get_stockfish_evaluation(board) for board in boards]
+        infos = self._analyse_many(boards)
+        return [self._score_to_centipawns(info) if info is not None else None for info in infos]
+
+    def get_opponent_move(self, board=None):
         """
         Pobiera ruch przeciwnika generowany przez Stockfisha.
 
+        Parametry:
+        - board (chess.Board, opcjonalnie): Plansza, dla której szukany jest ruch; domyślnie plansza środowiska.
+
         Zwraca:
         - Ruch przeciwnika (chess.Move) lub None, jeśli wystąpił błąd.
         """
         if not self.stockfish:
             logger.warning("Silnik Stockfish nie został zainicjalizowany.")
             return None
+        board = board if board is not None else self.board
         try:
-            limit = chess.engine.Limit(depth=self.stockfish_depth)
-            result = self.stockfish.play(self.board, limit)
-            if result.move and result.move in self.board.legal_moves:
-                logger.debug(f"Ruch przeciwnika Stockfisha: {self.board.san(result.move)}")
+            with self.profiler.phase('opponent_move'):
+                result = self._timed(self.stockfish.play, board, self.search_limit())
+            if result.move and result.move in self.legal_moves(board):
+                logger.debug(f"Ruch przeciwnika Stockfisha: {board.san(result.move)}")
                 return result.move
             else:
                 logger.warning(f"Nieprawidłowy ruch od Stockfisha: {result.move}")
@@ -80,6 +123,188 @@ class ChessEnvironment:
             logger.error(f"Błąd podczas pobierania ruchu przeciwnika od Stockfisha: {e}")
             return None
 
+    def get_opponent_moves(self, boards):
+        """
+        Pobiera ruchy przeciwnika dla wielu plansz; z pulą silników wyszukiwania wykonywane są równolegle.
+
+        Parametry:
+        - boards (lista chess.Board): Plansze, dla których szukane są ruchy.
+
+        Zwraca:
+        - lista chess.Move lub None: Ruchy w kolejności plansz (jak get_opponent_move).
+        """
+        if not isinstance(self.stockfish, EnginePool):
+            return [self.get_opponent_move(board) for board in boards]
+        with self.profiler.phase('opponent_move'):
+            results = self._timed_many(self.stockfish.play_many, boards, self.search_limit())
+        moves = []
+        for board, result in zip(boards, results):
+            if result is not None and result.move and result.move in self.legal_moves(board):
+                moves.append(result.move)
+            else:
+                logger.warning(f"Nieprawidłowy ruch od Stockfisha: {result.move if result else None}")
+                moves.append(None)
+        return moves
+
+    def opponent_step(self, board=None):
+        """
+        Ocenia pozycję, w której ruch ma przeciwnik, i wybiera jego ruch jednym wyszukiwaniem Stockfisha.
+
+        Ocena jest tą samą wartością, którą zwraca get_stockfish_evaluation, a ruch to pierwszy ruch
+        wariantu głównego tej analizy, więc pętla treningowa nie musi osobno wywoływać get_opponent_move.
+        Jeśli ocena pochodzi z pamięci podręcznej (bez wariantu), ruch wybierany jest osobnym zapytaniem.
+
+        Parametry:
+        - board (chess.Board, opcjonalnie): Plansza z przeciwnikiem na ruchu; domyślnie plansza środowiska.
+
+        Zwraca:
+        - OpponentStep: Ruch przeciwnika (chess.Move lub None, np. po końcu gry), ocena pozycji przed ruchem
+          w centypionach (int lub None) i wariant główny (lista chess.Move).
+        """
+        if not self.stockfish:
+            logger.warning("Silnik Stockfish nie został zainicjalizowany.")
+            return OpponentStep(None, None, [])
+        board = board if board is not None else self.board
+        try:
+            with self.profiler.phase('stockfish_eval'):
+                info = self._analyse(board, self.search_limit())
+            score = self._score_to_centipawns(info)
+        except Exception as e:
+            logger.error(f"Błąd podczas analizy pozycji przeciwnika: {e}")
+            return OpponentStep(None, None, [])
+        move = self._principal_move(board, info)
+        if move is None and not board.is_game_over():
+            move = self.get_opponent_move(board)
+        return OpponentStep(move, score, info.get("pv", []))
+
+    def opponent_steps(self, boards):
+        """
+        Wykonuje opponent_step dla wielu plansz; z pulą silników analizy wykonywane są równolegle.
+
+        Parametry:
+        - boards (lista chess.Board): Plansze z przeciwnikiem na ruchu.
+
+        Zwraca:
+        - lista OpponentStep: Wyniki w kolejności plansz.
+        """
+        if not isinstance(self.stockfish, EnginePool):
+            return [self.opponent_step(board) for board in boards]
+        infos = self._analyse_many(boards)
+        moves = [self._principal_move(board, info) if info is not None else None for board, info in zip(boards, infos)]
+        # Pozycje bez wariantu głównego (oceny z pamięci podręcznej) wymagają osobnego wyboru ruchu
+        missing = [i for i, move in enumerate(moves) if move is None and not boards[i].is_game_over()]
+        if missing:
+            for i, move in zip(missing, self.get_opponent_moves([boards[i] for i in missing])):
+                moves[i] = move
+        return [OpponentStep(move, self._score_to_centipawns(info) if info is not None else None,
+                             info.get("pv", []) if info is not None else [])
+                for move, info in zip(moves, infos)]
+
+    def _analyse_many(self, boards):
+        """
+        Analizuje plansze pulą silników, korzystając najpierw z pamięci podręcznej ocen.
+
+        Zwraca:
+        - lista dict lub None: Informacje analizy w kolejności plansz.
+        """
+        limit = self.search_limit()
+        infos = [self.eval_cache.get(board, limit) if self.eval_cache is not None else None for board in boards]
+        missing = [i for i, info in enumerate(infos) if info is None]
+        if missing:
+            with self.profiler.phase('stockfish_eval'):
+                analysed = self._timed_many(self.stockfish.analyse_many, [boards[i] for i in missing], limit)
+            for i, info in zip(missing, analysed):
+                infos[i] = info
+                if info is not None and self.eval_cache is not None:
+                    self.eval_cache.put(boards[i], limit, info.get("score"))
+        return infos
+
+    def search_limit(self):
+        """
+        Zwraca limit wyszukiwania: z harmonogramu limitów albo stałą głębokość stockfish_depth.
+
+        Zwraca:
+        - chess.engine.Limit: Limit kolejnego wyszukiwania.
+        """
+        if self.limit_scheduler is not None:
+            return self.limit_scheduler.limit()
+        return chess.engine.Limit(depth=self.stockfish_depth)
+
+    def _analyse(self, board, limit):
+        """
+        Zwraca analizę z pamięci podręcznej ocen albo analizuje pozycję silnikiem i zapisuje wynik.
+        """
+        info = self.eval_cache.get(board, limit) if self.eval_cache is not None else None
+        if info is None:
+            info = self._timed(self.stockfish.analyse, board, limit)
+            if self.eval_cache is not None:
+                self.eval_cache.put(board, limit, info.get("score"))
+        return info
+
+    def _timed(self, search, board, limit):
+        """
+        Wykonuje wyszukiwanie silnika i zgłasza jego koszt do harmonogramu limitów.
+        """
+        if self.limit_scheduler is None:
+            return search(board, limit)
+        start = time.perf_counter()
+        result = search(board, limit)
+        info = result.info if isinstance(result, chess.engine.PlayResult) else result
+        self.limit_scheduler.record(time.perf_counter() - start, info.get("nodes"))
+        return result
+
+    def _timed_many(self, search_many, boards, limit):
+        """
+        Wykonuje zbiorcze wyszukiwanie puli i zgłasza łączny koszt do harmonogramu limitów.
+        """
+        if self.limit_scheduler is None:
+            return search_many(boards, limit)
+        start = time.perf_counter()
+        results = search_many(boards, limit)
+        infos = [result.info if isinstance(result, chess.engine.PlayResult) else result
+                 for result in results if result is not None]
+        nodes = [info["nodes"] for info in infos if "nodes" in info]
+        self.limit_scheduler.record(time.perf_counter() - start, sum(nodes) if len(nodes) == len(infos) else None,
+                                    searches=len(boards))
+        return results
+
+    def _principal_move(self, board, info):
+        """
+        Zwraca pierwszy ruch wariantu głównego analizy, jeśli jest legalny.
+        """
+        pv = info.get("pv")
+        if pv and pv[0] in self.legal_moves(board):
+            logger.debug(f"Ruch przeciwnika Stockfisha: {board.san(pv[0])}")
+            return pv[0]
+        return None
+
+    def _score_to_centipawns(self, info):
+        """
+        Zamienia wynik analizy na ocenę w centypionach z perspektywy strony na ruchu (mat = +-100000).
+        """
+        score = info["score"].relative
+        if score.is_mate():  # Obsługa ocen mata
+            mate_score = 100000 if score.mate() > 0 else -100000
+            logger.debug(f"Wykryto mata z oceną: {mate_score}")
+            return mate_score
+        logger.debug(f"Ocena Stockfisha: {score.score(mate_score=100000)} centypionów")
+        return score.score(mate_score=100000)
+
+    def legal_moves(self, board=None):
+        """
+        Zwraca legalne ruchy pozycji, korzystając z pamięci podręcznej, jeśli jest dostępna.
+
+        Parametry:
+        - board (chess.Board, opcjonalnie): Plansza; domyślnie plansza środowiska.
+
+        Zwraca:
+        - lista chess.Move lub chess.LegalMoveGenerator: Legalne ruchy.
+        """
+        board = board if board is not None else self.board
+        if self.position_cache is not None:
+            return self.position_cache.legal_moves(board)
+        return board.legal_moves
+
     def update_board(self, board):
         """
         Aktualizuje wewnętrzny stan planszy.
@@ -98,6 +323,8 @@ class ChessEnvironment:
         - depth (int): Nowa głębokość analizy dla Stockfisha.
         """
         self.stockfish_depth = depth
+        if self.limit_scheduler is not None and self.limit_scheduler.mode == 'depth':
+            self.limit_scheduler.depth = depth
         logger.info(f"Głębokość Stockfisha ustawiona na: {self.stockfish_depth}")
 
     def close(self):
@@ -107,3 +334,6 @@ class ChessEnvironment:
         if self.stockfish:
             self.stockfish.quit()
             logger.info("Silnik Stockfish zamknięty.")
+        if self.eval_cache is not None:
+            logger.info(f"Pamięć podręczna ocen: {self.eval_cache.stats()}")
+            self.eval_cache.close()
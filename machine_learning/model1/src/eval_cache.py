@@ -0,0 +1,259 @@
+# eval_cache.py
+
+from collections import OrderedDict
+import logging
+import os
+import sqlite3
+import chess
+import chess.engine
+import chess.polyglot
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+# Rodzaje limitów wyszukiwania, które można buforować (wynik zależy tylko od pozycji i limitu)
+LIMIT_DEPTH = 0
+LIMIT_NODES = 1
+LIMIT_NAMES = {LIMIT_DEPTH: 'depth', LIMIT_NODES: 'nodes'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evals (
+    hash INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    amount INTEGER NOT NULL,
+    cp INTEGER,
+    mate INTEGER,
+    PRIMARY KEY (hash, kind)
+) WITHOUT ROWID
+"""
+
+# Zachowuje tylko głębszy (większy) wynik dla danej pozycji i rodzaju limitu
+_UPSERT = """
+INSERT INTO evals (hash, kind, amount, cp, mate) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (hash, kind) DO UPDATE SET amount = excluded.amount, cp = excluded.cp, mate = excluded.mate
+WHERE excluded.amount > evals.amount
+"""
+
+def limit_key(limit):
+    """
+    Zwraca rodzaj i wielkość limitu, jeśli wynik wyszukiwania można buforować.
+
+    Buforowane są limity samej głębokości lub samej liczby węzłów; limity czasowe
+    i zegarowe dają wyniki zależne od obciążenia maszyny.
+
+    Parametry:
+    - limit (chess.engine.Limit): Limit wyszukiwania.
+
+    Zwraca:
+    - (int, int) lub None: Rodzaj limitu (LIMIT_DEPTH lub LIMIT_NODES) i jego wielkość.
+    """
+    others = (limit.time, limit.mate, limit.white_clock, limit.black_clock,
+              limit.white_inc, limit.black_inc, limit.remaining_moves)
+    if any(value is not None for value in others):
+        return None
+    if limit.depth is not None and limit.nodes is None:
+        return LIMIT_DEPTH, limit.depth
+    if limit.nodes is not None and limit.depth is None:
+        return LIMIT_NODES, limit.nodes
+    return None
+
+def position_hash(board):
+    """
+    Zwraca 64-bitowy skrót Zobrista pozycji jako liczbę ze znakiem (typ INTEGER w SQLite).
+    """
+    key = chess.polyglot.zobrist_hash(board)
+    return key - 2**64 if key >= 2**63 else key
+
+class EvalCache:
+    def __init__(self, path=None, max_memory_entries=100000, allow_deeper=True):
+        """
+        Inicjalizuje pamięć podręczną ocen Stockfisha: warstwę LRU w pamięci i opcjonalną bazę SQLite na dysku.
+
+        Kluczem jest skrót Zobrista pozycji i rodzaj limitu (głębokość lub liczba węzłów). Dla każdej
+        pozycji przechowywany jest najgłębszy wynik, który odpowiada też na płytsze zapytania
+        (allow_deeper=True). Baza działa w trybie WAL, więc może być współdzielona przez wiele procesów;
+        każdy proces otwiera własne połączenie.
+
+        Parametry:
+        - path (str, opcjonalnie): Ścieżka pliku SQLite. Jeśli None, używana jest tylko pamięć.
+        - max_memory_entries (int): Maksymalna liczba wpisów w warstwie LRU.
+        - allow_deeper (bool): Czy głębszy wynik może odpowiedzieć na płytsze zapytanie.
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.allow_deeper = allow_deeper
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._entries = OrderedDict()
+        self._connection = None
+        self._pid = None
+
+    def get(self, board, limit):
+        """
+        Zwraca zbuforowaną ocenę pozycji dla danego limitu.
+
+        Parametry:
+        - board (chess.Board): Pozycja.
+        - limit (chess.engine.Limit): Limit wyszukiwania.
+
+        Zwraca:
+        - dict lub None: {"score": chess.engine.PovScore, "depth" lub "nodes": wielkość limitu wyniku} albo None.
+        """
+        key = limit_key(limit)
+        if key is None:
+            return None
+        kind, amount = key
+        entry_key = (position_hash(board), kind)
+
+        entry = self._entries.get(entry_key)
+        if entry is not None and self._answers(entry[0], amount):
+            self.memory_hits += 1
+            self._entries.move_to_end(entry_key)
+            return self._info(board, kind, entry)
+
+        connection = self._db()
+        if connection is not None:
+            row = connection.execute("SELECT amount, cp, mate FROM evals WHERE hash = ? AND kind = ?", entry_key).fetchone()
+            if row is not None and self._answers(row[0], amount):
+                self.disk_hits += 1
+                self._remember(entry_key, row)
+                return self._info(board, kind, row)
+
+        self.misses += 1
+        return None
+
+    def put(self, board, limit, score):
+        """
+        Zapisuje ocenę pozycji (zachowując głębszy z istniejących wyników).
+
+        Parametry:
+        - board (chess.Board): Pozycja.
+        - limit (chess.engine.Limit): Limit, z którym wykonano wyszukiwanie.
+        - score (chess.engine.PovScore): Ocena zwrócona przez silnik.
+        """
+        key = limit_key(limit)
+        if key is None or score is None:
+            return
+        kind, amount = key
+        relative = score.pov(board.turn)  # Ocena z perspektywy strony na ruchu
+        entry = (amount, relative.score(), relative.mate())
+        entry_key = (position_hash(board), kind)
+
+        current = self._entries.get(entry_key)
+        if current is None or current[0] < amount:
+            self._remember(entry_key, entry)
+        connection = self._db()
+        if connection is not None:
+            with connection:
+                connection.execute(_UPSERT, entry_key + entry)
+        self.stores += 1
+
+    def analyse(self, engine, board, limit):
+        """
+        Zwraca ocenę z pamięci podręcznej albo analizuje pozycję silnikiem i zapisuje wynik.
+
+        Parametry:
+        - engine (chess.engine.SimpleEngine): Silnik UCI.
+        - board (chess.Board): Pozycja.
+        - limit (chess.engine.Limit): Limit wyszukiwania.
+
+        Zwraca:
+        - dict: Informacje analizy (co najmniej "score").
+        """
+        info = self.get(board, limit)
+        if info is None:
+            info = engine.analyse(board, limit)
+            self.put(board, limit, info.get("score"))
+        return info
+
+    def stats(self):
+        """
+        Zwraca statystyki trafień pamięci podręcznej.
+
+        Zwraca:
+        - dict: Trafienia w pamięci i na dysku, chybienia, zapisy, liczba wpisów LRU i odsetek trafień.
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'entries': len(self._entries),
+            'hit_rate': hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """
+        Zamyka połączenie z bazą (warstwa w pamięci pozostaje).
+        """
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def _answers(self, stored, requested):
+        return stored == requested or (self.allow_deeper and stored > requested)
+
+    def _info(self, board, kind, entry):
+        amount, cp, mate = entry
+        score = chess.engine.Mate(mate) if mate is not None else chess.engine.Cp(cp)
+        return {"score": chess.engine.PovScore(score, board.turn), LIMIT_NAMES[kind]: amount}
+
+    def _remember(self, entry_key, entry):
+        self._entries[entry_key] = tuple(entry)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_memory_entries:
+            self._entries.popitem(last=False)
+
+    def _db(self):
+        """
+        Zwraca połączenie SQLite bieżącego procesu (połączenia nie są dziedziczone po fork).
+        """
+        if self.path is None:
+            return None
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30.0)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(_SCHEMA)
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+    def __getstate__(self):
+        # Do innego procesu przekazywana jest tylko konfiguracja; połączenie i LRU tworzone są od nowa
+        return {'path': self.path, 'max_memory_entries': self.max_memory_entries, 'allow_deeper': self.allow_deeper}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+class CachedEngine:
+    def __init__(self, engine, cache):
+        """
+        Opakowuje silnik UCI tak, aby analyse() korzystało z EvalCache; pozostałe metody są przekazywane do silnika.
+
+        Pozwala użyć pamięci podręcznej w kodzie przyjmującym obiekt silnika (np. generate_random_sample, Q_learning).
+
+        Parametry:
+        - engine (chess.engine.SimpleEngine): Silnik UCI.
+        - cache (EvalCache): Pamięć podręczna ocen.
+        """
+        self.engine = engine
+        self.cache = cache
+
+    def analyse(self, board, limit, **kwargs):
+        """
+        Analizuje pozycję; zapytania z dodatkowymi opcjami (np. multipv) trafiają bezpośrednio do silnika.
+        """
+        if kwargs:
+            return self.engine.analyse(board, limit, **kwargs)
+        return self.cache.analyse(self.engine, board, limit)
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
@@ -0,0 +1,79 @@
+# keyset.py
+
+import hashlib
+import numpy as np
+
+def pair_key(fen, uci):
+    """
+    Zwraca 64-bitowy klucz pary (pozycja, ruch) do deduplikacji.
+
+    Klucz to skrót BLAKE2b FEN-u bez liczników ruchów i ruchu, więc te same pozycje
+    o różnych licznikach są traktowane jak jedna (ok. 1 µs zamiast ok. 20 µs haszu Zobrista).
+
+    Parametry:
+    - fen (str): FEN pozycji przed ruchem.
+    - uci (str): Ruch w notacji UCI.
+
+    Zwraca:
+    - int: Klucz bez znaku (0 .. 2**64 - 1).
+    """
+    position = fen.rsplit(' ', 2)[0]
+    return int.from_bytes(hashlib.blake2b(f"{position} {uci}".encode(), digest_size=8).digest(), 'little')
+
+class KeySet:
+    def __init__(self, keys=None, merge_ratio=8, min_recent=1 << 16):
+        """
+        Inicjalizuje zwarty zbiór 64-bitowych kluczy (8 bajtów na klucz zamiast ok. 70 w set()).
+
+        Klucze są trzymane w posortowanej tablicy uint64 i mniejszej tablicy ostatnio dodanych,
+        scalanej z główną, gdy przekroczy 1/merge_ratio jej rozmiaru; sprawdzanie obecności
+        to wyszukiwanie binarne dla całej partii kluczy naraz.
+
+        Parametry:
+        - keys (np.ndarray, opcjonalnie): Klucze początkowe (np. stan z poprzedniej ekstrakcji).
+        - merge_ratio (int): Stosunek rozmiaru tablicy głównej do bufora, przy którym następuje scalenie.
+        - min_recent (int): Minimalny rozmiar bufora przed scaleniem.
+        """
+        self._sorted = np.unique(np.asarray(keys, dtype=np.uint64)) if keys is not None else np.empty(0, dtype=np.uint64)
+        self._recent = np.empty(0, dtype=np.uint64)
+        self.merge_ratio = merge_ratio
+        self.min_recent = min_recent
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+    def add(self, keys):
+        """
+        Dodaje klucze i zwraca maskę tych, które wystąpiły po raz pierwszy.
+
+        Powtórzenia w obrębie partii są oznaczane jako nowe tylko przy pierwszym wystąpieniu.
+
+        Parametry:
+        - keys (np.ndarray): Klucze uint64.
+
+        Zwraca:
+        - np.ndarray: Maska bool nowych kluczy.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        new = np.zeros(len(keys), dtype=bool)
+        new[np.unique(keys, return_index=True)[1]] = True
+        new &= ~(self._contains(self._sorted, keys) | self._contains(self._recent, keys))
+        if new.any():
+            self._recent = np.sort(np.concatenate([self._recent, keys[new]]))
+            if len(self._recent) > max(self.min_recent, len(self._sorted) // self.merge_ratio):
+                self._sorted = np.union1d(self._sorted, self._recent)
+                self._recent = np.empty(0, dtype=np.uint64)
+        return new
+
+    def keys(self):
+        """
+        Zwraca wszystkie klucze jako posortowaną tablicę uint64 (stan do zapisania i ponownego użycia).
+        """
+        return np.union1d(self._sorted, self._recent)
+
+    @staticmethod
+    def _contains(sorted_keys, keys):
+        if not len(sorted_keys):
+            return np.zeros(len(keys), dtype=bool)
+        index = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        return sorted_keys[index] == keys
@@ -0,0 +1,463 @@
+# lite_engine.py
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+import chess
+import chess.engine
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+# Wartość stockfish_path wybierająca wbudowany silnik (np. "lite" lub "lite:depth_cap=2,evaluation=material")
+LITE_ENGINE = 'lite'
+
+MATE_SCORE = 100000
+MAX_PLY = 64
+EVALUATIONS = ('material', 'pst')
+
+# Wartości figur w centypionach
+MATERIAL = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0
+}
+
+# Tablice pozycyjne z perspektywy białych, od 8. linii (a8) do 1. linii (h1)
+PST = {
+    chess.PAWN: (
+          0,   0,   0,   0,   0,   0,   0,   0,
+         50,  50,  50,  50,  50,  50,  50,  50,
+         10,  10,  20,  30,  30,  20,  10,  10,
+          5,   5,  10,  25,  25,  10,   5,   5,
+          0,   0,   0,  20,  20,   0,   0,   0,
+          5,  -5, -10,   0,   0, -10,  -5,   5,
+          5,  10,  10, -20, -20,  10,  10,   5,
+          0,   0,   0,   0,   0,   0,   0,   0),
+    chess.KNIGHT: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20,   0,   0,   0,   0, -20, -40,
+        -30,   0,  10,  15,  15,  10,   0, -30,
+        -30,   5,  15,  20,  20,  15,   5, -30,
+        -30,   0,  15,  20,  20,  15,   0, -30,
+        -30,   5,  10,  15,  15,  10,   5, -30,
+        -40, -20,   0,   5,   5,   0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50),
+    chess.BISHOP: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,  10,  10,   5,   0, -10,
+        -10,   5,   5,  10,  10,   5,   5, -10,
+        -10,   0,  10,  10,  10,  10,   0, -10,
+        -10,  10,  10,  10,  10,  10,  10, -10,
+        -10,   5,   0,   0,   0,   0,   5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20),
+    chess.ROOK: (
+          0,   0,   0,   0,   0,   0,   0,   0,
+          5,  10,  10,  10,  10,  10,  10,   5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+          0,   0,   0,   5,   5,   0,   0,   0),
+    chess.QUEEN: (
+        -20, -10, -10,  -5,  -5, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,   5,   5,   5,   0, -10,
+         -5,   0,   5,   5,   5,   5,   0,  -5,
+          0,   0,   5,   5,   5,   5,   0,  -5,
+        -10,   5,   5,   5,   5,   5,   0, -10,
+        -10,   0,   5,   0,   0,   0,   0, -10,
+        -20, -10, -10,  -5,  -5, -10, -10, -20),
+    chess.KING: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+         20,  20,   0,   0,   0,   0,  20,  20,
+         20,  30,  10,   0,   0,  10,  30,  20)
+}
+
+class _SearchAborted(Exception):
+    """
+    Przerwanie wyszukiwania po przekroczeniu limitu węzłów lub czasu.
+    """
+
+class LiteEngine:
+    def __init__(self, evaluation='pst', seed=0, quiescence=True, depth_cap=None):
+        """
+        Inicjalizuje wbudowany, lekki silnik szachowy (alfa-beta z iteracyjnym pogłębianiem) zastępujący
+        Stockfisha w pomiarach wydajności i testach, gdy binarka Stockfisha jest niedostępna.
+
+        Obiekt ma interfejs chess.engine.SimpleEngine (analyse, play, configure, quit), więc może działać
+        w procesie (ChessEnvironment(stockfish_path="lite")), a uruchomienie modułu jako skryptu udostępnia
+        ten sam silnik przez protokół UCI (engine_command). Wyniki zależą tylko od pozycji, limitu, opcji i ziarna;
+        limity głębokości i węzłów są w pełni deterministyczne, limity czasowe nie.
+
+        Parametry:
+        - evaluation (str): Funkcja oceny: 'material' lub 'pst' (materiał i tablice pozycyjne).
+        - seed (int): Ziarno kolejności ruchów w korzeniu (rozstrzyga remisy między równie dobrymi ruchami).
+        - quiescence (bool): Czy na końcu wariantu rozpatrywać bicia (przeszukiwanie spoczynkowe).
+        - depth_cap (int, opcjonalnie): Maksymalna głębokość wyszukiwania niezależnie od limitu zapytania.
+        """
+        self.options = {}
+        self.configure({'Evaluation': evaluation, 'Seed': seed, 'Quiescence': quiescence, 'DepthCap': depth_cap or 0})
+        self.nodes = 0  # Łączna liczba odwiedzonych węzłów
+
+    def configure(self, options):
+        """
+        Ustawia opcje silnika (nazwy jak w protokole UCI: Evaluation, Seed, Quiescence, DepthCap).
+        """
+        for name, value in options.items():
+            if name == 'Evaluation':
+                if value not in EVALUATIONS:
+                    raise chess.engine.EngineError(f"Nieznana funkcja oceny: {value}")
+                self.evaluation = value
+            elif name == 'Seed':
+                self.seed = int(value)
+            elif name == 'Quiescence':
+                self.quiescence = value if isinstance(value, bool) else str(value).lower() == 'true'
+            elif name == 'DepthCap':
+                self.depth_cap = int(value) or None
+            else:
+                raise chess.engine.EngineError(f"Nieznana opcja silnika: {name}")
+            self.options[name] = value
+
+    def analyse(self, board, limit, multipv=None, **kwargs):
+        """
+        Analizuje pozycję (jak SimpleEngine.analyse; obsługiwany jest jeden wariant).
+
+        Zwraca:
+        - dict: Informacje analizy ("score", "pv", "depth", "nodes", "time"); lista z jednym słownikiem, jeśli podano multipv.
+        """
+        info = self.search(board, limit)
+        return [info] if multipv is not None else info
+
+    def play(self, board, limit, **kwargs):
+        """
+        Wybiera ruch w pozycji (jak SimpleEngine.play).
+
+        Zwraca:
+        - chess.engine.PlayResult: Wynik z wybranym ruchem i informacjami analizy.
+        """
+        info = self.search(board, limit)
+        return chess.engine.PlayResult(info["pv"][0] if info["pv"] else None, None, info)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        self.quit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.quit()
+
+    def search(self, board, limit):
+        """
+        Przeszukuje pozycję z iteracyjnym pogłębianiem do limitu głębokości, węzłów lub czasu.
+
+        Pierwsza iteracja jest zawsze kończona; wynik pochodzi z ostatniej pełnej iteracji.
+
+        Parametry:
+        - board (chess.Board): Pozycja (nie jest modyfikowana).
+        - limit (chess.engine.Limit): Limit wyszukiwania.
+
+        Zwraca:
+        - dict: Ocena (chess.engine.PovScore), wariant główny, osiągnięta głębokość, liczba węzłów i czas.
+        """
+        start = time.perf_counter()
+        board = board.copy(stack=False)
+        max_depth = limit.depth if limit.depth is not None else (MAX_PLY if limit.nodes or self._time_budget(board, limit) else 3)
+        if self.depth_cap:
+            max_depth = min(max_depth, self.depth_cap)
+        max_depth = max(max_depth, 1)
+        budget = self._time_budget(board, limit)
+        self._deadline = start + budget if budget else None
+        self._max_nodes = limit.nodes
+        self._nodes = 0
+        self._completed = 0
+
+        result = (self._terminal_score(board, 0), [])
+        if any(board.generate_legal_moves()):
+            for depth in range(1, max_depth + 1):
+                try:
+                    result = self._root(board, depth)
+                except _SearchAborted:
+                    break
+                self._completed = depth
+                if abs(result[0]) >= MATE_SCORE - MAX_PLY:
+                    break  # Znaleziony mat nie zmieni się w głębszych iteracjach
+
+        score, pv = result
+        self.nodes += self._nodes
+        return {
+            "score": chess.engine.PovScore(self._to_engine_score(score), board.turn),
+            "pv": pv,
+            "depth": self._completed,
+            "nodes": self._nodes,
+            "time": time.perf_counter() - start
+        }
+
+    def evaluate(self, board):
+        """
+        Statyczna ocena pozycji w centypionach z perspektywy strony na ruchu.
+        """
+        score = 0
+        use_pst = self.evaluation == 'pst'
+        for piece_type, value in MATERIAL.items():
+            table = PST[piece_type]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.WHITE)):
+                score += value + (table[chess.square_mirror(square)] if use_pst else 0)
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.BLACK)):
+                score -= value + (table[square] if use_pst else 0)
+        return score if board.turn == chess.WHITE else -score
+
+    def _time_budget(self, board, limit):
+        """
+        Zwraca czas na ruch w sekundach (limit czasu lub 1/30 pozostałego czasu zegara) albo None.
+        """
+        if limit.time is not None:
+            return limit.time
+        clock = limit.white_clock if board.turn == chess.WHITE else limit.black_clock
+        if clock is not None:
+            increment = (limit.white_inc if board.turn == chess.WHITE else limit.black_inc) or 0.0
+            return clock / (limit.remaining_moves or 30) + increment
+        return None
+
+    def _count_node(self):
+        self._nodes += 1
+        if self._completed == 0:
+            return  # Pierwsza iteracja jest zawsze kończona
+        if self._max_nodes is not None and self._nodes > self._max_nodes:
+            raise _SearchAborted()
+        if self._deadline is not None and self._nodes % 256 == 0 and time.perf_counter() > self._deadline:
+            raise _SearchAborted()
+
+    def _root(self, board, depth):
+        moves = list(board.generate_legal_moves())
+        # Kolejność ruchów o równym priorytecie zależy od ziarna i pozycji
+        rng = random.Random(f"{self.seed}:{board.fen()}")
+        moves.sort(key=lambda move: (-self._priority(board, move), rng.random()))
+
+        alpha, beta = -MATE_SCORE - 1, MATE_SCORE + 1
+        best_pv = []
+        for move in moves:
+            board.push(move)
+            score, pv = self._negamax(board, depth - 1, -beta, -alpha, 1)
+            board.pop()
+            score = -score
+            if score > alpha:
+                alpha = score
+                best_pv = [move] + pv
+        return alpha, best_pv
+
+    def _negamax(self, board, depth, alpha, beta, ply):
+        self._count_node()
+        moves = list(board.generate_legal_moves())
+        if not moves:
+            return self._terminal_score(board, ply), []
+        if board.is_insufficient_material() or board.halfmove_clock >= 100:
+            return 0, []
+        if depth <= 0:
+            return (self._quiescence(board, alpha, beta) if self.quiescence else self.evaluate(board)), []
+
+        best_pv = []
+        for move in self._ordered(board, moves):
+            board.push(move)
+            score, pv = self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            score = -score
+            if score >= beta:
+                return score, []
+            if score > alpha:
+                alpha = score
+                best_pv = [move] + pv
+        return alpha, best_pv
+
+    def _quiescence(self, board, alpha, beta):
+        self._count_node()
+        stand_pat = self.evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        for move in self._ordered(board, list(board.generate_legal_captures())):
+            board.push(move)
+            score = -self._quiescence(board, -beta, -alpha)
+            board.pop()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def _ordered(self, board, moves):
+        """
+        Sortuje ruchy: najpierw bicia (najcenniejsza ofiara, najtańszy napastnik), potem promocje.
+        """
+        return sorted(moves, key=lambda move: -self._priority(board, move))
+
+    def _priority(self, board, move):
+        priority = 0
+        if board.is_capture(move):
+            victim = board.piece_type_at(move.to_square) or chess.PAWN  # Bicie w przelocie
+            priority += 10 * MATERIAL[victim] - MATERIAL[board.piece_type_at(move.from_square)] + 10000
+        if move.promotion:
+            priority += MATERIAL[move.promotion]
+        return priority
+
+    def _terminal_score(self, board, ply):
+        return -MATE_SCORE + ply if board.is_check() else 0
+
+    def _to_engine_score(self, score):
+        if score >= MATE_SCORE - MAX_PLY:
+            return chess.engine.Mate((MATE_SCORE - score + 1) // 2)
+        if score <= -MATE_SCORE + MAX_PLY:
+            return chess.engine.Mate(-((MATE_SCORE + score) // 2))
+        return chess.engine.Cp(score)
+
+def parse_spec(spec):
+    """
+    Odczytuje opcje wbudowanego silnika ze ścieżki "lite" lub "lite:klucz=wartość,...".
+
+    Parametry:
+    - spec (str): Wartość stockfish_path.
+
+    Zwraca:
+    - dict lub None: Argumenty LiteEngine albo None, jeśli spec nie wskazuje wbudowanego silnika.
+    """
+    if not isinstance(spec, str) or spec.split(':', 1)[0] != LITE_ENGINE:
+        return None
+    options = {}
+    _, _, params = spec.partition(':')
+    for item in filter(None, params.split(',')):
+        key, _, value = item.partition('=')
+        if key == 'evaluation':
+            options[key] = value
+        elif key in ('seed', 'depth_cap'):
+            options[key] = int(value)
+        elif key == 'quiescence':
+            options[key] = value.lower() in ('1', 'true', 'yes')
+        else:
+            raise ValueError(f"Nieznana opcja silnika {LITE_ENGINE}: {key}")
+    return options
+
+def engine_command(spec):
+    """
+    Zwraca polecenie uruchomienia silnika UCI: dla "lite[:opcje]" proces z tym modułem, w pozostałych przypadkach spec.
+    """
+    options = parse_spec(spec)
+    if options is None:
+        return spec
+    command = [sys.executable, os.path.abspath(__file__)]
+    for key, value in options.items():
+        command += [f'--{key}', str(value).lower()]
+    return command
+
+def open_engine(spec):
+    """
+    Otwiera silnik: wbudowany LiteEngine w procesie dla "lite[:opcje]", w przeciwnym razie proces UCI ze ścieżki spec.
+
+    Zwraca:
+    - LiteEngine lub chess.engine.SimpleEngine: Silnik z interfejsem analyse/play/quit.
+    """
+    options = parse_spec(spec)
+    if options is not None:
+        logger.info(f"Używanie wbudowanego silnika {LITE_ENGINE} ({options or 'opcje domyślne'}).")
+        return LiteEngine(**options)
+    return chess.engine.SimpleEngine.popen_uci(spec)
+
+def _format_score(score):
+    if isinstance(score, chess.engine.Mate):
+        return f"mate {score.moves}"
+    return f"cp {score.score()}"
+
+def _parse_go(tokens):
+    """
+    Zamienia argumenty polecenia UCI "go" na chess.engine.Limit.
+    """
+    values = {}
+    for i, token in enumerate(tokens[:-1]):
+        if token in ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo'):
+            values[token] = int(tokens[i + 1])
+    seconds = lambda name: values[name] / 1000 if name in values else None
+    return chess.engine.Limit(depth=values.get('depth'), nodes=values.get('nodes'), time=seconds('movetime'),
+                              white_clock=seconds('wtime'), black_clock=seconds('btime'),
+                              white_inc=seconds('winc'), black_inc=seconds('binc'),
+                              remaining_moves=values.get('movestogo'))
+
+def uci_loop(engine, stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Obsługuje protokół UCI dla silnika na podanych strumieniach (do polecenia "quit" lub końca wejścia).
+    """
+    def send(line):
+        stdout.write(line + "\n")
+        stdout.flush()
+
+    board = chess.Board()
+    for line in stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+        if command == 'uci':
+            send('id name LiteEngine')
+            send('id author chess-ai')
+            send(f"option name Evaluation type combo default {engine.evaluation} var material var pst")
+            send(f"option name Seed type spin default {engine.seed} min 0 max 2147483647")
+            send(f"option name Quiescence type check default {str(engine.quiescence).lower()}")
+            send(f"option name DepthCap type spin default {engine.depth_cap or 0} min 0 max {MAX_PLY}")
+            send('uciok')
+        elif command == 'isready':
+            send('readyok')
+        elif command == 'setoption' and 'name' in tokens:
+            name_end = tokens.index('value') if 'value' in tokens else len(tokens)
+            name = ' '.join(tokens[tokens.index('name') + 1:name_end])
+            value = ' '.join(tokens[name_end + 1:])
+            try:
+                engine.configure({name: value})
+            except chess.engine.EngineError as e:
+                send(f"info string {e}")
+        elif command == 'ucinewgame':
+            board = chess.Board()
+        elif command == 'position':
+            if tokens[1] == 'startpos':
+                board = chess.Board()
+            else:
+                fen_end = tokens.index('moves') if 'moves' in tokens else len(tokens)
+                board = chess.Board(' '.join(tokens[2:fen_end]))
+            if 'moves' in tokens:
+                for uci in tokens[tokens.index('moves') + 1:]:
+                    board.push_uci(uci)
+        elif command == 'go':
+            info = engine.search(board, _parse_go(tokens[1:]))
+            pv = ' '.join(move.uci() for move in info["pv"])
+            send(f"info depth {info['depth']} score {_format_score(info['score'].relative)} "
+                 f"nodes {info['nodes']} time {int(info['time'] * 1000)}" + (f" pv {pv}" if pv else ""))
+            send(f"bestmove {info['pv'][0].uci() if info['pv'] else '(none)'}")
+        elif command == 'quit':
+            break
+
+def main():
+    parser = argparse.ArgumentParser(description='Lekki silnik szachowy UCI zastępujący Stockfisha')
+    parser.add_argument('--evaluation', type=str, default='pst', choices=EVALUATIONS, help='Funkcja oceny')
+    parser.add_argument('--seed', type=int, default=0, help='Ziarno kolejności ruchów')
+    parser.add_argument('--quiescence', type=str, default='true', choices=['true', 'false'], help='Przeszukiwanie spoczynkowe')
+    parser.add_argument('--depth_cap', type=int, default=0, help='Maksymalna głębokość wyszukiwania (0 - bez limitu)')
+    args = parser.parse_args()
+    engine = LiteEngine(evaluation=args.evaluation, seed=args.seed, quiescence=args.quiescence == 'true',
+                        depth_cap=args.depth_cap or None)
+    uci_loop(engine)
+
+if __name__ == "__main__":
+    main()
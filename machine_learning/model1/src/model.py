@@ -4,6 +4,23 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+def training_autocast(device, enabled=True):
+    """
+    Zwraca kontekst autocast bfloat16 dla treningu w mieszanej precyzji.
+
+    Konwolucje i warstwy liniowe liczone są w bfloat16, a wagi pozostają float32, więc punkty
+    kontrolne są zgodne z treningiem float32. Softmax, logarytmy i redukcje strat należy liczyć
+    na wynikach przekonwertowanych do float32 (.float()) poza kontekstem.
+
+    Parametry:
+    - device (str lub torch.device): Urządzenie obliczeń ('cpu' lub 'cuda').
+    - enabled (bool): Jeśli False, kontekst nie zmienia precyzji.
+
+    Zwraca:
+    - torch.autocast: Kontekst autocast.
+    """
+    return torch.autocast(device_type=torch.device(device).type, dtype=torch.bfloat16, enabled=enabled)
+
 class ResidualBlock(nn.Module):
     """
     Standardowy blok resztkowy z dwoma warstwami konwolucyjnymi i połączeniem przeskakującym (skip connection).
@@ -28,6 +45,21 @@ class ResidualBlock(nn.Module):
         out = F.relu(out)                      # Aktywacja ReLU
         return out
 
+class LuigiPolicy(nn.Module):
+    """
+    Opakowanie LuigiCNN zwracające tylko logity polityki [batch_size, 4096].
+
+    Ma jedno wejście tensorowe, więc nadaje się do torch.compile i torch.jit.trace.
+    Współdzieli parametry z opakowanym modelem.
+    """
+    def __init__(self, model):
+        super(LuigiPolicy, self).__init__()
+        self.model = model
+
+    def forward(self, x):
+        x_policy, _ = self.model(x, None)
+        return x_policy.view(x.size(0), -1)
+
 class LuigiCNN(nn.Module):
     def __init__(self, action_channels=1):  # action_channels ustawiony na 1
         super(LuigiCNN, self).__init__()
@@ -22,6 +22,29 @@ def main():
     parser.add_argument('--agent_color', type=str, choices=['white', 'black'], default='white', help='Kolor agenta')
     parser.add_argument('--device', type=str, default='cuda', choices=['cpu', 'cuda'], help='Urządzenie do treningu')
     parser.add_argument('--save_every', type=int, default=100, help='Liczba epizodów pomiędzy zapisami modelu')
+    parser.add_argument('--parallel_games', type=int, default=1, help='Liczba partii rozgrywanych równolegle (wsadowe przejścia sieci)')
+    parser.add_argument('--update_every', type=int, default=1, help='Liczba epizodów między aktualizacjami sieci')
+    parser.add_argument('--inference_backend', type=str, default=None, choices=['compile', 'trace'], help='Skompilowana ścieżka inferencji przy wyborze ruchów (domyślnie eager)')
+    parser.add_argument('--mixed_precision', action='store_true', help='Aktualizacja sieci w autocast bfloat16 (wagi pozostają float32)')
+    parser.add_argument('--profile', action='store_true', help='Mierz czas faz pętli treningowej')
+    parser.add_argument('--profile_every', type=int, default=100, help='Liczba epizodów między podsumowaniami profilu')
+    parser.add_argument('--profile_trace', type=str, default=None, help='Ścieżka śladu Chrome torch.profiler')
+    parser.add_argument('--profile_trace_episodes', type=int, nargs=2, default=None, metavar=('PIERWSZY', 'OSTATNI'),
+                        help='Zakres epizodów nagrywanych do śladu Chrome')
+    parser.add_argument('--num_actors', type=int, default=0, help='Liczba procesów aktorów (0 - trening w jednym procesie)')
+    parser.add_argument('--max_staleness', type=int, default=2, help='Maksymalne opóźnienie wag trajektorii aktorów (liczba aktualizacji)')
+    parser.add_argument('--eval_cache', type=str, default=None, help='Plik SQLite trwałej pamięci podręcznej ocen Stockfisha')
+    parser.add_argument('--engine_budget_ms', type=float, default=None, help='Budżet czasu silnika w ms (na wyszukiwanie lub epizod)')
+    parser.add_argument('--engine_budget_nodes', type=int, default=None, help='Budżet liczby węzłów silnika (na wyszukiwanie lub epizod)')
+    parser.add_argument('--engine_limit_mode', type=str, default='depth', choices=['depth', 'nodes'], help='Rodzaj limitu regulowanego budżetem')
+    parser.add_argument('--engine_budget_per', type=str, default='search', choices=['search', 'episode'], help='Zakres budżetu silnika')
+    parser.add_argument('--adjudicate', action='store_true', help='Wczesne rozstrzyganie partii na podstawie ocen Stockfisha')
+    parser.add_argument('--adjudicate_win_cp', type=int, default=1000, help='Próg przewagi (cp) dla wygranej/poddania')
+    parser.add_argument('--adjudicate_win_evals', type=int, default=4, help='Liczba kolejnych ocen powyżej progu przewagi')
+    parser.add_argument('--adjudicate_draw_cp', type=int, default=20, help='Próg oceny remisowej (cp)')
+    parser.add_argument('--adjudicate_draw_evals', type=int, default=10, help='Liczba kolejnych ocen w progu remisowym')
+    parser.add_argument('--adjudicate_draw_after', type=int, default=80, help='Liczba półruchów, po której możliwy jest remis')
+    parser.add_argument('--stockfish_engines', type=int, default=1, help='Liczba procesów Stockfisha w puli (ocena partii równoległych)')
     parser.add_argument('--load_checkpoint', type=str, default=default_load_path, help='Ścieżka do wczytania wcześniej wytrenowanego modelu')
 
     # Argumenty wizualizacji
@@ -32,7 +55,9 @@ def main():
     # Ścieżki
     parser.add_argument('--save_path', type=str, default=default_save_path, help='Ścieżka do zapisu wytrenowanego modelu')
     parser.add_argument('--best_save_path', type=str, default=default_best_save_path, help='Ścieżka do zapisu najlepszego modelu')
-    parser.add_argument('--stockfish_path', type=str, default=default_stockfish_path, help='Ścieżka do wykonywalnego pliku Stockfish')
+    parser.add_argument('--checkpoint_dir', type=str, default=None, help='Katalog punktów kontrolnych zapisywanych w tle (zastępuje --save_path i --best_save_path, wznawia trening)')
+    parser.add_argument('--keep_checkpoints', type=int, default=3, help='Liczba zachowywanych ostatnich punktów kontrolnych w --checkpoint_dir')
+    parser.add_argument('--stockfish_path', type=str, default=default_stockfish_path, help='Ścieżka do wykonywalnego pliku Stockfish lub "lite[:opcje]" dla wbudowanego silnika (np. lite:depth_cap=2)')
     parser.add_argument('--mcts_binary_path', type=str, default=default_mcts_path, help='Ścieżka do pliku binarnego silnika MCTS')
 
     args = parser.parse_args()
@@ -51,7 +76,31 @@ def main():
         best_save_path=args.best_save_path,
         load_checkpoint=args.load_checkpoint,
         stockfish_path=args.stockfish_path,
-        mcts_binary_path=args.mcts_binary_path
+        mcts_binary_path=args.mcts_binary_path,
+        parallel_games=args.parallel_games,
+        update_every=args.update_every,
+        inference_backend=args.inference_backend,
+        mixed_precision=args.mixed_precision,
+        profile=args.profile,
+        profile_every=args.profile_every,
+        profile_trace=args.profile_trace,
+        profile_trace_episodes=args.profile_trace_episodes,
+        num_actors=args.num_actors,
+        max_staleness=args.max_staleness,
+        eval_cache_path=args.eval_cache,
+        stockfish_engines=args.stockfish_engines,
+        engine_budget_ms=args.engine_budget_ms,
+        engine_budget_nodes=args.engine_budget_nodes,
+        engine_limit_mode=args.engine_limit_mode,
+        engine_budget_per=args.engine_budget_per,
+        adjudicate=args.adjudicate,
+        adjudicate_win_cp=args.adjudicate_win_cp,
+        adjudicate_win_evals=args.adjudicate_win_evals,
+        adjudicate_draw_cp=args.adjudicate_draw_cp,
+        adjudicate_draw_evals=args.adjudicate_draw_evals,
+        adjudicate_draw_after=args.adjudicate_draw_after,
+        checkpoint_dir=args.checkpoint_dir,
+        keep_checkpoints=args.keep_checkpoints
     )
 
     # Wykres postępu treningu
@@ -0,0 +1,184 @@
+#book.py
+
+import argparse
+import csv
+import io
+import logging
+import os
+import random
+import struct
+from collections import Counter
+import chess
+import chess.pgn
+import chess.polyglot
+
+logger = logging.getLogger(__name__)
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+DATASETS_DIR = os.path.join(dirname, '..', '..', '..', 'datasets')
+# Katalog debiutów lichess (kolumny eco, name, pgn), z którego powstaje też fen_moves.tsv
+DEFAULT_INPUTS = [os.path.join(DATASETS_DIR, f"{volume}.tsv") for volume in 'abcde']
+DEFAULT_BOOK = os.path.join(dirname, 'opening_book.bin')
+
+# Format Polyglot: posortowane wpisy (hasz Zobrista, ruch, waga, learn), big-endian, 16 bajtów na wpis
+ENTRY = struct.Struct('>QHHI')
+MAX_WEIGHT = 0xFFFF
+
+def polyglot_move(board, move):
+    """
+    Koduje ruch w formacie Polyglot (roszada jako ruch króla na pole wieży).
+
+    Parametry:
+    - board (chess.Board): Pozycja przed ruchem.
+    - move (chess.Move): Legalny ruch.
+
+    Zwraca:
+    - int: Ruch jako 16-bitowa liczba (pole docelowe, pole startowe, promocja).
+    """
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if board.is_kingside_castling(move) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | move.from_square << 6 | promotion << 12
+
+def read_lines(path):
+    """
+    Czyta kolejne warianty debiutowe jako partie PGN.
+
+    Pliki .tsv (katalog debiutów lichess) są czytane wierszami z kolumny pgn, pozostałe jako pliki PGN.
+
+    Zwraca:
+    - generator chess.pgn.Game: Kolejne warianty.
+    """
+    if path.endswith('.tsv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f, delimiter='\t'):
+                yield chess.pgn.read_game(io.StringIO(row.get('pgn') or ''))
+        return
+    with open(path, encoding='utf-8', errors='replace') as f:
+        while (game := chess.pgn.read_game(f)) is not None:
+            yield game
+
+def build_book(paths=DEFAULT_INPUTS, output_path=DEFAULT_BOOK, max_plies=None):
+    """
+    Buduje książkę debiutową z katalogu debiutów: waga ruchu to liczba wariantów, które przechodzą
+    przez daną pozycję tym ruchem (np. 1. e4 w pozycji początkowej ma wagę równą liczbie wariantów od 1. e4).
+
+    Wpisy są posortowane według haszu pozycji, a w pozycji malejąco według wagi; wagi większe od
+    MAX_WEIGHT są skalowane proporcjonalnie (najmniejsza waga to 1). Plik jest zapisywany atomowo.
+
+    Parametry:
+    - paths (lista str): Pliki katalogu (.tsv z kolumną pgn) lub pliki PGN.
+    - output_path (str): Ścieżka pliku książki (.bin).
+    - max_plies (int, opcjonalnie): Liczba pierwszych półruchów każdego wariantu.
+
+    Zwraca:
+    - dict: Liczba wariantów, pominiętych wariantów, pozycji i wpisów książki.
+    """
+    counts = Counter()
+    stats = {'lines': 0, 'skipped': 0}
+    for path in paths:
+        for game in read_lines(path):
+            stats['lines'] += 1
+            if game is None or game.errors:
+                logger.warning(f"Pominięto wariant {stats['lines']} z {path}: "
+                               f"{game.errors[0] if game is not None else 'pusty zapis'}")
+                stats['skipped'] += 1
+                continue
+            board = game.board()
+            pairs = set()  # Wariant liczony raz dla każdej pary (pozycja, ruch)
+            for move in list(game.mainline_moves())[:max_plies]:
+                pairs.add((chess.polyglot.zobrist_hash(board), polyglot_move(board, move)))
+                board.push(move)
+            counts.update(pairs)
+
+    scale = min(1.0, MAX_WEIGHT / max(counts.values(), default=1))
+    entries = sorted(((key, move, max(1, int(count * scale))) for (key, move), count in counts.items()),
+                     key=lambda entry: (entry[0], -entry[2], entry[1]))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(f"{output_path}.tmp", 'wb') as f:
+        for key, move, weight in entries:
+            f.write(ENTRY.pack(key, move, weight, 0))
+    os.replace(f"{output_path}.tmp", output_path)
+
+    stats.update(positions=len({key for key, _, _ in entries}), entries=len(entries))
+    logger.info(f"Książka debiutowa {output_path}: {stats['positions']} pozycji, {stats['entries']} ruchów "
+                f"z {stats['lines']} wariantów ({stats['skipped']} pominiętych)")
+    return stats
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_BOOK, temperature=1.0, seed=None):
+        """
+        Otwiera książkę debiutową Polyglot mapowaną do pamięci.
+
+        Wyszukiwanie pozycji to wyszukiwanie binarne haszu Zobrista w posortowanych wpisach pliku,
+        bez wczytywania książki do pamięci procesu.
+
+        Parametry:
+        - path (str): Ścieżka pliku książki (np. z build_book).
+        - temperature (float): Temperatura losowania ruchu: 1 - proporcjonalnie do częstości,
+          mniejsza - częściej najczęstszy ruch, 0 - zawsze najczęstszy ruch.
+        - seed (int, opcjonalnie): Ziarno generatora liczb losowych.
+        """
+        self.path = path
+        self.temperature = temperature
+        self._reader = chess.polyglot.open_reader(path)
+        self._rng = random.Random(seed)
+
+    def __len__(self):
+        return len(self._reader)
+
+    def moves(self, board):
+        """
+        Zwraca legalne ruchy książki w pozycji.
+
+        Zwraca:
+        - lista (chess.Move, int): Ruchy i ich wagi (malejąco według wagi); pusta poza książką.
+        """
+        return [(entry.move, entry.weight) for entry in self._reader.find_all(board)]
+
+    def choose(self, board, temperature=None):
+        """
+        Losuje ruch z książki z wagami podniesionymi do potęgi 1 / temperatura.
+
+        Parametry:
+        - board (chess.Board): Aktualna plansza gry.
+        - temperature (float, opcjonalnie): Temperatura losowania (domyślnie self.temperature).
+
+        Zwraca:
+        - chess.Move lub None: Ruch z książki lub None, jeśli pozycji nie ma w książce.
+        """
+        moves = self.moves(board)
+        if not moves:
+            return None
+        temperature = self.temperature if temperature is None else temperature
+        if temperature <= 0:
+            return max(moves, key=lambda item: item[1])[0]
+        top = max(weight for _, weight in moves)
+        # Wagi względem największej, więc potęgowanie przy małej temperaturze nie przepełnia zakresu
+        weights = [(weight / top) ** (1 / temperature) for _, weight in moves]
+        return self._rng.choices([move for move, _ in moves], weights=weights)[0]
+
+    def close(self):
+        self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Zbuduj książkę debiutową Polyglot z katalogu debiutów')
+    parser.add_argument('inputs', nargs='*', default=DEFAULT_INPUTS, help='Pliki katalogu (.tsv z kolumną pgn) lub PGN')
+    parser.add_argument('--output', type=str, default=DEFAULT_BOOK, help='Ścieżka pliku książki')
+    parser.add_argument('--max_plies', type=int, default=None, help='Liczba pierwszych półruchów każdego wariantu')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    build_book(args.inputs, args.output, max_plies=args.max_plies)
+
+if __name__ == "__main__":
+    main()
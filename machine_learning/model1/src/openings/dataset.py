@@ -0,0 +1,154 @@
+#dataset.py
+
+import sys
+import os
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chess_utils import bitboards_to_planes
+from openings.shards import open_shard, read_manifest
+
+class ShardDataset(Dataset):
+    def __init__(self, directory, split='train'):
+        """
+        Inicjalizuje zbiór debiutów czytany z shardów prepare_data.py mapowanych do pamięci.
+
+        Próbka zajmuje 96 bajtów masek i 2 bajty ruchu zamiast tensora float32 [12, 8, 8] (3 KB);
+        płaszczyzny są dekodowane całymi partiami w collate_planes. Shardy są otwierane leniwie
+        w każdym procesie, więc zbiór działa z DataLoaderem z wieloma procesami roboczymi.
+
+        Parametry:
+        - directory (str): Katalog shardów z manifestem.
+        - split (str): Zbiór 'train' lub 'val'.
+        """
+        self.directory = directory
+        self.split = split
+        manifest = read_manifest(directory)
+        self.channels = manifest['channels']
+        self.shards = manifest['splits'][split]['shards']
+        self.offsets = np.cumsum([0] + [shard['count'] for shard in self.shards])
+        self._arrays = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index):
+        masks, moves = self.__getitems__([index])
+        return masks[0], moves[0]
+
+    def __getitems__(self, indices):
+        """
+        Pobiera partię próbek jednym odczytem na shard.
+
+        Parametry:
+        - indices (lista int): Indeksy próbek.
+
+        Zwraca:
+        - (np.ndarray, np.ndarray): Maski [B, channels] (uint64) i indeksy ruchów [B] (int64).
+        """
+        if self._arrays is None:
+            self._arrays = [open_shard(self.directory, shard, self.channels) for shard in self.shards]
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError(f"Indeks poza zakresem zbioru o rozmiarze {len(self)}")
+        shard_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        masks = np.empty((len(indices), self.channels), dtype=np.uint64)
+        moves = np.empty(len(indices), dtype=np.int64)
+        for shard_id in np.unique(shard_ids):
+            rows = np.nonzero(shard_ids == shard_id)[0]
+            local = indices[rows] - self.offsets[shard_id]
+            shard_masks, shard_moves = self._arrays[shard_id]
+            masks[rows] = shard_masks[local]
+            moves[rows] = shard_moves[local]
+        return masks, moves
+
+    def tensors(self):
+        """
+        Dekoduje cały zbiór do tensorów (dla małych zbiorów, np. walidacji).
+
+        Zwraca:
+        - (torch.Tensor, torch.Tensor): Pozycje [N, 12, 8, 8] i indeksy ruchów [N].
+        """
+        return collate_planes(self.__getitems__(range(len(self))))
+
+    def __getstate__(self):
+        # Mapowania plików nie są przekazywane do procesów roboczych (otwierane ponownie na miejscu)
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
+
+class ShardSampler(Sampler):
+    def __init__(self, dataset, shuffle=True, seed=0):
+        """
+        Inicjalizuje próbkowanie zbioru shardami: kolejność shardów i próbek w shardzie jest losowana,
+        ale kolejne indeksy pochodzą z jednego sharda, więc partie czytają ciągły fragment pliku.
+
+        Parametry:
+        - dataset (ShardDataset): Zbiór próbek.
+        - shuffle (bool): Czy losować kolejność (False zachowuje kolejność w plikach).
+        - seed (int): Ziarno losowania; kolejne epoki zmieniają je przez set_epoch.
+        """
+        self.offsets = dataset.offsets
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __iter__(self):
+        if not self.shuffle:
+            yield from range(len(self))
+            return
+        rng = np.random.default_rng((self.seed, self.epoch))
+        for shard_id in rng.permutation(len(self.offsets) - 1):
+            start, end = self.offsets[shard_id], self.offsets[shard_id + 1]
+            yield from (start + rng.permutation(end - start)).tolist()
+
+def collate_planes(batch):
+    """
+    Dekoduje partię masek do płaszczyzn float32 jednym wywołaniem bitboards_to_planes.
+
+    Parametry:
+    - batch: Wynik ShardDataset.__getitems__ (maski, ruchy) lub lista par z __getitem__.
+
+    Zwraca:
+    - (torch.Tensor, torch.Tensor): Pozycje [B, 12, 8, 8] i indeksy ruchów [B].
+    """
+    if isinstance(batch, list):
+        masks = np.stack([masks for masks, _ in batch])
+        moves = np.array([move for _, move in batch], dtype=np.int64)
+    else:
+        masks, moves = batch
+    return torch.from_numpy(bitboards_to_planes(masks)), torch.from_numpy(moves)
+
+def shard_loader(dataset, batch_size=256, shuffle=True, seed=0, num_workers=0, prefetch_factor=2,
+                 pin_memory=False, drop_last=False):
+    """
+    Tworzy DataLoader dla ShardDataset z próbkowaniem shardami i dekodowaniem partii w collate_planes.
+
+    Parametry:
+    - dataset (ShardDataset): Zbiór próbek.
+    - batch_size (int): Rozmiar partii.
+    - shuffle (bool): Czy losować kolejność próbek.
+    - seed (int): Ziarno losowania.
+    - num_workers (int): Liczba procesów ładujących (partie dekodowane i pobierane z wyprzedzeniem).
+    - prefetch_factor (int): Liczba partii pobieranych z wyprzedzeniem przez proces roboczy.
+    - pin_memory (bool): Czy umieszczać partie w pamięci przypiętej (szybsze kopiowanie na GPU).
+    - drop_last (bool): Czy pomijać ostatnią niepełną partię.
+
+    Zwraca:
+    - DataLoader: Iterator partii (pozycje, indeksy ruchów).
+    """
+    options = {}
+    if num_workers > 0:
+        options = {'prefetch_factor': prefetch_factor, 'persistent_workers': True}
+    return DataLoader(dataset, batch_size=batch_size, sampler=ShardSampler(dataset, shuffle=shuffle, seed=seed),
+                      collate_fn=collate_planes, num_workers=num_workers, pin_memory=pin_memory,
+                      drop_last=drop_last, **options)
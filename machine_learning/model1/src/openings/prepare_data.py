@@ -1,43 +1,276 @@
 #prepare_data.py
 
 
-import pandas as pd
+import argparse
+import csv
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
 import chess
 import sys
 import os
-import torch
+import numpy as np
 
-sys.path.append(os.path.abspath('../'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-from chess_utils import board_to_tensor, move_to_index
-from sklearn.model_selection import train_test_split
+from chess_utils import PIECE_CHANNELS, board_masks, move_to_index
+from keyset import KeySet, pair_key
+from openings.shards import (FORMAT_VERSION, PLANES_DTYPE, MOVES_DTYPE, ShardWriter, is_validation,
+                             position_key, read_manifest, remove_stale_shards, shard_intact, write_manifest)
 
-data = pd.read_csv('../../../datasets/fen_moves.tsv', delimiter='\t')
+logger = logging.getLogger(__name__)
 
-input_tensors = []
-output_indices = []
+dirname = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INPUT = os.path.join(dirname, '..', '..', '..', 'datasets', 'fen_moves.tsv')
+DEFAULT_OUTPUT = os.path.join(dirname, 'data_shards')
 
-for _, row in data.iterrows():
-    fen, move = row['FEN'], row['Move']
-    board = chess.Board(fen)
+def read_rows(path):
+    """
+    Czyta plik TSV (kolumny FEN i Move) wierszami, bez wczytywania całego pliku.
 
-    input_tensor = board_to_tensor(board)
-    input_tensors.append(input_tensor)
+    Zwraca:
+    - generator (str, str): Pary (FEN, ruch UCI).
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f, delimiter='\t'):
+            yield row['FEN'], row['Move']
 
-    move_index = move_to_index(chess.Move.from_uci(move))
-    output_indices.append(move_index)
+def read_blocks(path, block_rows=2**16):
+    """
+    Dzieli plik na bloki o granicach wyznaczonych treścią wierszy.
 
-inputs = torch.stack(input_tensors)
-targets = torch.tensor(output_indices)
+    Blok kończy się po wierszu, którego klucz pair_key jest podzielny przez block_rows (średnio
+    block_rows wierszy, najwyżej 4 * block_rows), więc wstawienie lub usunięcie wierszy zmienia
+    tylko bloki, w których nastąpiło, a pozostałe zachowują skróty i shardy.
 
-train_inputs, val_inputs, train_targets, val_targets = train_test_split(
-    inputs, targets, test_size=0.2, random_state=42
-)
+    Zwraca:
+    - generator (list, np.ndarray): Wiersze bloku i ich klucze uint64.
+    """
+    rows, keys = [], []
+    for fen, uci in read_rows(path):
+        key = pair_key(fen, uci)
+        rows.append((fen, uci))
+        keys.append(key)
+        if key % block_rows == 0 or len(rows) >= 4 * block_rows:
+            yield rows, np.array(keys, dtype=np.uint64)
+            rows, keys = [], []
+    if rows:
+        yield rows, np.array(keys, dtype=np.uint64)
 
-torch.save({
-    'train_inputs': train_inputs,
-    'val_inputs': val_inputs,
-    'train_targets': train_targets,
-    'val_targets': val_targets
-}, "data_preprocessed.pt")
+def block_hash(keys):
+    """
+    Zwraca skrót zawartości bloku (kluczy jego wierszy w kolejności pliku).
+    """
+    return hashlib.blake2b(keys.tobytes(), digest_size=8).hexdigest()
 
+def encode_rows(rows, val_fraction=0.2):
+    """
+    Koduje porcję wierszy do spakowanych masek bierek i indeksów ruchów (wykonywane w procesach roboczych).
+
+    Parametry:
+    - rows (lista (str, str)): Pary (FEN, ruch UCI).
+    - val_fraction (float): Udział zbioru walidacyjnego (podział według klucza pozycji).
+
+    Zwraca:
+    - (np.ndarray, np.ndarray, np.ndarray, int): Maski [N, 12] uint64, indeksy ruchów [N] uint16,
+      maska próbek walidacyjnych [N] i liczba pominiętych, nieprawidłowych wierszy.
+    """
+    masks = np.empty((len(rows), len(PIECE_CHANNELS)), dtype=PLANES_DTYPE)
+    moves = np.empty(len(rows), dtype=MOVES_DTYPE)
+    validation = np.empty(len(rows), dtype=bool)
+    count = 0
+    for fen, uci in rows:
+        try:
+            board = chess.Board(fen)
+            move = chess.Move.from_uci(uci)
+        except (ValueError, TypeError):
+            continue
+        masks[count] = board_masks(board)
+        moves[count] = move_to_index(move)
+        validation[count] = is_validation(position_key(board), val_fraction)
+        count += 1
+    return masks[:count], moves[:count], validation[:count], len(rows) - count
+
+def _reusable_blocks(output_dir, config, verify=False):
+    """
+    Zwraca bloki poprzedniej budowy (według skrótu), których shardy można użyć ponownie.
+
+    Blok nadaje się do ponownego użycia, jeśli poprzednia budowa miała tę samą konfigurację,
+    żaden jego wiersz nie został odrzucony jako duplikat wiersza innego bloku (jego zawartość
+    zależy wtedy tylko od niego samego), a pliki kluczy i shardów są kompletne.
+    """
+    try:
+        previous = read_manifest(output_dir)
+    except (OSError, ValueError):
+        return {}
+    if previous.get('config') != config:
+        return {}
+    blocks = {}
+    for block in previous.get('blocks', []):
+        keys_path = os.path.join(output_dir, block['keys'])
+        shards = block['splits']['train'] + block['splits']['val']
+        if (block['shared'] == 0 and os.path.isfile(keys_path)
+                and os.path.getsize(keys_path) == 8 * (block['rows'] - block['duplicates'])
+                and all(shard_intact(output_dir, shard, config['channels'], verify) for shard in shards)):
+            blocks[block['hash']] = block
+    return blocks
+
+def prepare(input_path=DEFAULT_INPUT, output_dir=DEFAULT_OUTPUT, shard_size=2**18, chunk_size=4096,
+            workers=None, val_fraction=0.2, block_rows=2**16, rebuild=False, verify=False):
+    """
+    Przetwarza strumieniowo fen_moves.tsv do shardów treningowych i walidacyjnych, przyrostowo.
+
+    Plik jest dzielony na bloki o granicach wyznaczonych treścią (read_blocks); manifest zapisuje
+    skrót każdego bloku i każdego sharda. Ponownie kodowane są tylko bloki nowe lub zmienione,
+    a shardy pozostałych są używane bez zmian. Wiersze nowych bloków powtarzające parę (pozycja,
+    ruch) z innego bloku są pomijane (stan deduplikacji to klucze zachowanych bloków). Podział
+    train/val zależy tylko od klucza pozycji, więc po przebudowie próbki walidacyjne nie trafiają
+    do treningu.
+
+    Porcje po chunk_size wierszy są kodowane w puli workers procesów; w toku jest najwyżej
+    2 * workers porcji, a zapis odbywa się shardami po shard_size próbek, więc szczytowe
+    zużycie pamięci nie zależy od rozmiaru wejścia. Kolejność próbek jest taka jak w pliku.
+
+    Parametry:
+    - input_path (str): Plik TSV z kolumnami FEN i Move.
+    - output_dir (str): Katalog shardów i manifestu.
+    - shard_size (int): Liczba próbek w shardzie.
+    - chunk_size (int): Liczba wierszy w porcji dla procesu roboczego.
+    - workers (int, opcjonalnie): Liczba procesów (domyślnie liczba rdzeni, 0 koduje w bieżącym procesie).
+    - val_fraction (float): Udział zbioru walidacyjnego.
+    - block_rows (int): Średnia liczba wierszy bloku.
+    - rebuild (bool): Jeśli True, wszystkie bloki są kodowane od nowa.
+    - verify (bool): Jeśli True, shardy do ponownego użycia są sprawdzane skrótem zawartości, a nie tylko rozmiarem.
+
+    Zwraca:
+    - dict: Zapisany manifest.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    config = {'channels': len(PIECE_CHANNELS), 'shard_size': shard_size, 'val_fraction': val_fraction,
+              'block_rows': block_rows}
+    previous = {} if rebuild else _reusable_blocks(output_dir, config, verify)
+
+    # Pierwsze przejście: skróty bloków; klucze zachowanych bloków tworzą stan deduplikacji
+    hashes = [block_hash(keys) for _, keys in read_blocks(input_path, block_rows)]
+    reused = {}
+    seen = KeySet()
+    for digest in hashes:
+        if digest in previous and digest not in reused:
+            reused[digest] = previous[digest]
+            seen.add(np.fromfile(os.path.join(output_dir, previous[digest]['keys']), dtype='<u8'))
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+    blocks = []
+    names = set()
+    encoded = 0
+    try:
+        # Drugie przejście: kodowanie nowych i zmienionych bloków
+        for (rows, keys), digest in zip(read_blocks(input_path, block_rows), hashes):
+            if digest in reused:
+                block = reused.pop(digest)
+            else:
+                name = digest if digest not in names else f"{digest}_{len(blocks)}"
+                block = _encode_block(rows, keys, seen.add(keys), name, digest, output_dir, config,
+                                      chunk_size, executor, workers)
+                encoded += 1
+            names.add(block['name'])
+            blocks.append(block)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    splits = {split: {'count': sum(shard['count'] for block in blocks for shard in block['splits'][split]),
+                      'shards': [shard for block in blocks for shard in block['splits'][split]]}
+              for split in ('train', 'val')}
+    manifest = {
+        'version': FORMAT_VERSION,
+        'channels': len(PIECE_CHANNELS),
+        'planes_dtype': PLANES_DTYPE,
+        'moves_dtype': MOVES_DTYPE,
+        'shard_size': shard_size,
+        'val_fraction': val_fraction,
+        'config': config,
+        'source': os.path.basename(input_path),
+        'skipped': sum(block['skipped'] for block in blocks),
+        'encoded_blocks': encoded,
+        'blocks': blocks,
+        'splits': splits
+    }
+    write_manifest(output_dir, manifest)
+    remove_stale_shards(output_dir, manifest)
+    if manifest['skipped']:
+        logger.warning(f"Pominięto {manifest['skipped']} nieprawidłowych wierszy")
+    logger.info(f"Zakodowano {encoded} z {len(blocks)} bloków; zapisano {splits['train']['count']} próbek "
+                f"treningowych i {splits['val']['count']} walidacyjnych do {output_dir}")
+    return manifest
+
+def _encode_block(rows, keys, unique, name, digest, output_dir, config, chunk_size, executor, workers):
+    """
+    Koduje unikalne wiersze bloku do shardów i zapisuje klucze bloku.
+
+    Zwraca:
+    - dict: Opis bloku do manifestu.
+    """
+    writers = {split: ShardWriter(output_dir, f"{name}-{split}", shard_size=config['shard_size'],
+                                  channels=config['channels'])
+               for split in ('train', 'val')}
+    skipped = 0
+
+    def store(result):
+        nonlocal skipped
+        masks, moves, validation, invalid = result
+        writers['train'].write(masks[~validation], moves[~validation])
+        writers['val'].write(masks[validation], moves[validation])
+        skipped += invalid
+
+    rows = [row for row, is_unique in zip(rows, unique) if is_unique]
+    chunks = (rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size))
+    if executor is None:
+        for chunk in chunks:
+            store(encode_rows(chunk, config['val_fraction']))
+    else:
+        pending = deque()
+        for chunk in chunks:
+            if len(pending) >= 2 * workers:
+                store(pending.popleft().result())
+            pending.append(executor.submit(encode_rows, chunk, config['val_fraction']))
+        while pending:
+            store(pending.popleft().result())
+
+    keys_file = f"{name}.keys.bin"
+    _write_keys(os.path.join(output_dir, keys_file), keys[unique])
+    splits = {split: writer.close() for split, writer in writers.items()}
+    # Duplikaty: powtórzenia w bloku i wiersze obecne już w innych blokach (shared)
+    duplicates = int(len(keys) - unique.sum())
+    shared = duplicates - (len(keys) - len(np.unique(keys)))
+    return {'name': name, 'hash': digest, 'rows': len(keys), 'duplicates': duplicates, 'shared': shared,
+            'skipped': skipped, 'keys': keys_file, 'splits': splits}
+
+def _write_keys(path, keys):
+    temporary_path = f"{path}.tmp"
+    keys.astype('<u8').tofile(temporary_path)
+    os.replace(temporary_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Przygotuj shardy danych debiutów z fen_moves.tsv')
+    parser.add_argument('--input', type=str, default=DEFAULT_INPUT, help='Plik TSV z kolumnami FEN i Move')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT, help='Katalog shardów i manifestu')
+    parser.add_argument('--shard_size', type=int, default=2**18, help='Liczba próbek w shardzie')
+    parser.add_argument('--chunk_size', type=int, default=4096, help='Liczba wierszy w porcji dla procesu roboczego')
+    parser.add_argument('--workers', type=int, default=None, help='Liczba procesów kodujących (domyślnie liczba rdzeni)')
+    parser.add_argument('--val_fraction', type=float, default=0.2, help='Udział zbioru walidacyjnego')
+    parser.add_argument('--block_rows', type=int, default=2**16, help='Średnia liczba wierszy bloku budowy przyrostowej')
+    parser.add_argument('--rebuild', action='store_true', help='Zakoduj wszystkie bloki od nowa')
+    parser.add_argument('--verify', action='store_true', help='Sprawdzaj skróty zawartości ponownie używanych shardów')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    prepare(args.input, args.output, shard_size=args.shard_size, chunk_size=args.chunk_size,
+            workers=args.workers, val_fraction=args.val_fraction, block_rows=args.block_rows,
+            rebuild=args.rebuild, verify=args.verify)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#shards.py
+
+import hashlib
+import json
+import os
+import chess
+import chess.polyglot
+import numpy as np
+
+# Format shardów: surowe tablice little-endian czytane przez np.memmap według manifestu
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+PLANES_DTYPE = '<u8'  # Jedna 64-bitowa maska na kanał (kolejność chess_utils.PIECE_CHANNELS)
+MOVES_DTYPE = '<u2'   # Indeks ruchu chess_utils.move_to_index (0-4095)
+SPLITS = ('train', 'val')
+
+def position_key(board):
+    """
+    Zwraca klucz pozycji (hasz Zobrista) niezależny od liczników ruchów.
+    """
+    return chess.polyglot.zobrist_hash(board)
+
+def is_validation(key, val_fraction):
+    """
+    Przypisuje pozycję do zbioru walidacyjnego deterministycznie na podstawie jej klucza.
+
+    Wszystkie wiersze tej samej pozycji trafiają do tego samego zbioru, więc pozycje
+    walidacyjne nie przeciekają do treningu.
+
+    Parametry:
+    - key (int): Klucz pozycji (position_key).
+    - val_fraction (float): Udział zbioru walidacyjnego.
+
+    Zwraca:
+    - bool: True, jeśli pozycja należy do zbioru walidacyjnego.
+    """
+    return key % 10000 < int(round(val_fraction * 10000))
+
+class ShardWriter:
+    def __init__(self, directory, prefix, shard_size=2**18, channels=12):
+        """
+        Inicjalizuje zapis próbek do shardów o stałym rozmiarze.
+
+        Bufor ma rozmiar jednego sharda, więc zużycie pamięci nie zależy od liczby próbek.
+        Pełny shard jest zapisywany do pliku tymczasowego i podmieniany atomowo.
+
+        Parametry:
+        - directory (str): Katalog shardów.
+        - prefix (str): Przedrostek nazw plików (np. nazwa zbioru 'train').
+        - shard_size (int): Liczba próbek w shardzie (ostatni może być mniejszy).
+        - channels (int): Liczba masek na pozycję.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.channels = channels
+        self.shards = []
+        self._masks = np.empty((shard_size, channels), dtype=PLANES_DTYPE)
+        self._moves = np.empty(shard_size, dtype=MOVES_DTYPE)
+        self._count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def count(self):
+        return sum(shard['count'] for shard in self.shards) + self._count
+
+    def write(self, masks, moves):
+        """
+        Dopisuje próbki, zapisując kolejne pełne shardy.
+
+        Parametry:
+        - masks (np.ndarray): Maski bierek [N, channels] (uint64).
+        - moves (np.ndarray): Indeksy ruchów [N].
+        """
+        offset = 0
+        while offset < len(moves):
+            take = min(self.shard_size - self._count, len(moves) - offset)
+            self._masks[self._count:self._count + take] = masks[offset:offset + take]
+            self._moves[self._count:self._count + take] = moves[offset:offset + take]
+            self._count += take
+            offset += take
+            if self._count == self.shard_size:
+                self._flush()
+
+    def close(self):
+        """
+        Zapisuje ostatni, niepełny shard.
+
+        Zwraca:
+        - list: Opisy shardów do manifestu.
+        """
+        if self._count:
+            self._flush()
+        return self.shards
+
+    def _flush(self):
+        name = f"{self.prefix}_{len(self.shards):05d}"
+        # Skrót zawartości sharda (maski, potem ruchy) do sprawdzania przy ponownym użyciu
+        digest = hashlib.sha256(self._masks[:self._count].tobytes())
+        digest.update(self._moves[:self._count].tobytes())
+        entry = {'name': name, 'count': self._count, 'sha256': digest.hexdigest(),
+                 'planes': f"{name}.planes.bin", 'moves': f"{name}.moves.bin"}
+        _write_array(os.path.join(self.directory, entry['planes']), self._masks[:self._count])
+        _write_array(os.path.join(self.directory, entry['moves']), self._moves[:self._count])
+        self.shards.append(entry)
+        self._count = 0
+
+def _write_array(path, array):
+    temporary_path = f"{path}.tmp"
+    array.tofile(temporary_path)
+    os.replace(temporary_path, path)
+
+def write_manifest(directory, manifest):
+    """
+    Zapisuje manifest shardów atomowo (po zapisaniu wszystkich shardów).
+    """
+    path = os.path.join(directory, MANIFEST)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+def read_manifest(directory):
+    """
+    Wczytuje manifest shardów.
+
+    Wyjątki:
+    - ValueError: Jeśli wersja formatu nie jest obsługiwana.
+    """
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja formatu shardów: {manifest.get('version')}")
+    return manifest
+
+def open_shard(directory, shard, channels=12):
+    """
+    Mapuje shard do pamięci.
+
+    Parametry:
+    - directory (str): Katalog shardów.
+    - shard (dict): Opis sharda z manifestu.
+    - channels (int): Liczba masek na pozycję.
+
+    Zwraca:
+    - (np.memmap, np.memmap): Maski [count, channels] i indeksy ruchów [count].
+    """
+    count = shard['count']
+    planes = np.memmap(os.path.join(directory, shard['planes']), dtype=PLANES_DTYPE, mode='r', shape=(count, channels))
+    moves = np.memmap(os.path.join(directory, shard['moves']), dtype=MOVES_DTYPE, mode='r', shape=(count,))
+    return planes, moves
+
+def shard_intact(directory, shard, channels=12, verify=False):
+    """
+    Sprawdza, czy pliki sharda istnieją i mają rozmiar z manifestu (verify: także skrót zawartości).
+    """
+    planes_path = os.path.join(directory, shard['planes'])
+    moves_path = os.path.join(directory, shard['moves'])
+    if not (os.path.isfile(planes_path) and os.path.isfile(moves_path)):
+        return False
+    if (os.path.getsize(planes_path) != shard['count'] * channels * np.dtype(PLANES_DTYPE).itemsize
+            or os.path.getsize(moves_path) != shard['count'] * np.dtype(MOVES_DTYPE).itemsize):
+        return False
+    if verify:
+        digest = hashlib.sha256()
+        for path in (planes_path, moves_path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest() == shard['sha256']
+    return True
+
+def remove_stale_shards(directory, manifest):
+    """
+    Usuwa pliki .bin nieobecne w manifeście (pozostałe po wcześniejszych budowach).
+    """
+    referenced = {block['keys'] for block in manifest.get('blocks', [])}
+    for split in manifest['splits'].values():
+        for shard in split['shards']:
+            referenced.update((shard['planes'], shard['moves']))
+    for name in os.listdir(directory):
+        if name.endswith('.bin') and name not in referenced:
+            os.remove(os.path.join(directory, name))
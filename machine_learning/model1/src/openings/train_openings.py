@@ -1,98 +1,186 @@
 #train_openings.py
 
+import argparse
+import copy
 import sys
 import os
+import time
+import chess
+import numpy as np
 import torch
 import matplotlib.pyplot as plt
-
-sys.path.append(os.path.abspath('../'))
-
-from model import LuigiCNN
 from torch.utils.data import DataLoader, TensorDataset
 
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-
-model = LuigiCNN(action_channels=1).to(device)
-
-#model.load_state_dict(torch.load('trained_with_openings.pth'))
-#model.eval()
-
-optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
-criterion = torch.nn.CrossEntropyLoss()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-data = torch.load("data_preprocessed.pt")
-train_inputs = data['train_inputs']
-val_inputs = data['val_inputs']
-train_targets = data['train_targets']
-val_targets = data['val_targets']
-
-train_data = TensorDataset(train_inputs, train_targets)
-val_data = TensorDataset(val_inputs, val_targets)
-
-train_loader = DataLoader(train_data, batch_size=64, shuffle=True)
-val_loader = DataLoader(val_data, batch_size=64, shuffle=False)
+from chess_utils import board_to_tensor, index_to_move
+from model import LuigiCNN, training_autocast
+from openings.dataset import ShardDataset, collate_planes, shard_loader
 
+device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
-def train_model(model, train_loader, val_loader, optimizer, criterion, epochs=50):
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_shards')
+
+
+def train_model(model, train_loader, val_loader, optimizer, criterion, epochs=50, mixed_precision=False,
+                accumulation_steps=1, log_every=0, val_every=1, patience=None, min_delta=0.0, device=device):
+    """
+    Trenuje sieć na parach (pozycja, ruch) z debiutów.
+
+    Strata i trafność kroków są sumowane na urządzeniu i odczytywane (synchronizacja) tylko przy
+    raporcie co log_every kroków optymalizatora oraz na końcu epoki.
+
+    Parametry:
+    - model (LuigiCNN): Trenowana sieć.
+    - train_loader (DataLoader): Partie treningowe (pozycje, indeksy ruchów).
+    - val_loader (DataLoader lub None): Partie walidacyjne (np. losowy podzbiór walidacji).
+    - optimizer (torch.optim.Optimizer): Optymalizator.
+    - criterion: Funkcja straty (CrossEntropyLoss).
+    - epochs (int): Maksymalna liczba epok.
+    - mixed_precision (bool): Przejście w autocast bfloat16 (wagi i strata w float32).
+    - accumulation_steps (int): Liczba partii na krok optymalizatora (efektywna partia = batch_size * accumulation_steps);
+      ostatni krok epoki może obejmować mniej partii.
+    - log_every (int): Co ile kroków optymalizatora wypisywać średnią stratę, trafność i kroki/s (0 wyłącza).
+    - val_every (int): Co ile epok walidować (0 wyłącza walidację).
+    - patience (int, opcjonalnie): Zatrzymanie po tylu walidacjach bez poprawy straty o min_delta;
+      przywracane są wtedy wagi z najlepszej walidacji.
+    - min_delta (float): Minimalna poprawa straty walidacji.
+    - device (torch.device): Urządzenie obliczeń.
+
+    Zwraca:
+    - (list, list, list, list): Suma strat partii na epokę, strata i trafność (%) walidacji na walidację
+      oraz numery epok (od 1), po których przeprowadzono kolejne walidacje.
+    """
     train_losses = []
     val_losses = []
     val_accuracies = []
+    val_epochs = []
+    best_loss = float('inf')
+    best_state = None
+    stale = 0
+    step = 0
 
     for epoch in range(epochs):
         model.train()
-        total_loss = 0
-
-        for inputs, targets in train_loader:
-            inputs, targets = inputs.to(device), targets.to(device)
-
-            outputs, _ = model(inputs, None)
-            outputs = outputs.view(-1, 4096)
+        if hasattr(train_loader.sampler, 'set_epoch'):
+            train_loader.sampler.set_epoch(epoch)
+        total_loss = torch.zeros((), device=device)
+        window_loss = torch.zeros((), device=device)
+        window_correct = torch.zeros((), dtype=torch.long, device=device)
+        window_samples = window_batches = window_steps = 0
+        window_start = time.perf_counter()
+        optimizer.zero_grad(set_to_none=True)
+        # Partie w pełnych grupach akumulacji; ostatnia, niepełna grupa jest uśredniana po swojej liczbie partii
+        full_batches = len(train_loader) // accumulation_steps * accumulation_steps
+
+        for batch, (inputs, targets) in enumerate(train_loader, 1):
+            inputs = inputs.to(device, non_blocking=True)
+            targets = targets.to(device, non_blocking=True)
+
+            with training_autocast(device, mixed_precision):
+                outputs, _ = model(inputs, None)
+            # Softmax i strata zawsze w float32
+            outputs = outputs.view(-1, 4096).float()
 
             loss = criterion(outputs, targets)
-            total_loss += loss.item()
-
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
-
-        train_losses.append(total_loss)
-
-        val_loss, val_accuracy = validate_model(model, val_loader, criterion)
+            group_size = accumulation_steps if batch <= full_batches else len(train_loader) - full_batches
+            (loss / group_size).backward()
+
+            loss = loss.detach()
+            total_loss += loss
+            window_loss += loss
+            window_correct += (outputs.detach().argmax(dim=1) == targets).sum()
+            window_samples += targets.size(0)
+            window_batches += 1
+
+            if batch % accumulation_steps == 0 or batch == len(train_loader):
+                optimizer.step()
+                optimizer.zero_grad(set_to_none=True)
+                step += 1
+                window_steps += 1
+                if log_every and step % log_every == 0:
+                    elapsed = time.perf_counter() - window_start
+                    print(f"step {step}, loss: {window_loss.item() / window_batches:.4f}, "
+                          f"acc: {100 * window_correct.item() / window_samples:.2f}%, "
+                          f"{window_steps / elapsed:.1f} steps/s, {window_samples / elapsed:.0f} samples/s")
+                    window_loss.zero_()
+                    window_correct.zero_()
+                    window_samples = window_batches = window_steps = 0
+                    window_start = time.perf_counter()
+
+        train_losses.append(total_loss.item())
+
+        if val_loader is None or not val_every or (epoch + 1) % val_every:
+            print(f"epoch {epoch+1}/{epochs}, Loss: {train_losses[-1]:.4f}")
+            continue
+
+        val_loss, val_accuracy = validate_model(model, val_loader, criterion, mixed_precision, device=device)
         val_losses.append(val_loss)
         val_accuracies.append(val_accuracy)
+        val_epochs.append(epoch + 1)
+
+        print(f"epoch {epoch+1}/{epochs}, Loss: {train_losses[-1]:.4f}, Val loss: {val_loss:.4f}, Val Acc: {val_accuracy:.2f}%")
+
+        if patience is not None:
+            if val_loss < best_loss - min_delta:
+                best_loss = val_loss
+                best_state = copy.deepcopy(model.state_dict())
+                stale = 0
+            else:
+                stale += 1
+                if stale >= patience:
+                    print(f"Wczesne zatrzymanie po epoce {epoch+1}: brak poprawy straty walidacji przez {patience} walidacje")
+                    break
 
-        print(f"epoch {epoch+1}/{epochs}, Loss: {total_loss:.4f}, Val loss: {val_loss:.4f}, Val Acc: {val_accuracy:.2f}%")
+    if best_state is not None:
+        model.load_state_dict(best_state)
 
-    return train_losses, val_losses, val_accuracies
+    return train_losses, val_losses, val_accuracies, val_epochs
 
-def validate_model(model, val_loader, criterion):
+def validate_model(model, val_loader, criterion, mixed_precision=False, device=device):
     model.eval()
-    total_loss = 0
-    correct = 0
+    total_loss = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.long, device=device)
     total = 0
 
     with torch.no_grad():
         for inputs, targets in val_loader:
-            inputs, targets = inputs.to(device), targets.to(device)
+            inputs, targets = inputs.to(device, non_blocking=True), targets.to(device, non_blocking=True)
 
-            outputs, _ = model(inputs, None)
-            outputs = outputs.view(-1, 4096)
+            with training_autocast(device, mixed_precision):
+                outputs, _ = model(inputs, None)
+            outputs = outputs.view(-1, 4096).float()
 
-            loss = criterion(outputs, targets)
-            total_loss += loss.item()
+            total_loss += criterion(outputs, targets)
 
             _, predicted = torch.max(outputs, dim=1)
-            correct += (predicted == targets).sum().item()
+            correct += (predicted == targets).sum()
             total += targets.size(0)
 
-    accuracy = 100 * correct / total
-    return total_loss, accuracy
+    accuracy = 100 * correct.item() / total
+    return total_loss.item(), accuracy
+
+def validation_loader(dataset, samples=None, batch_size=256, seed=0, **options):
+    """
+    Tworzy loader walidacji na stałym, losowym podzbiorze zbioru walidacyjnego.
 
+    Podzbiór jest dekodowany raz do tensorów, więc kolejne walidacje nie czytają ani nie dekodują shardów.
 
+    Parametry:
+    - dataset (ShardDataset): Zbiór walidacyjny.
+    - samples (int, opcjonalnie): Liczba próbek podzbioru (None lub więcej niż zbiór: cały zbiór przez shard_loader).
+    - batch_size (int): Rozmiar partii.
+    - seed (int): Ziarno losowania podzbioru.
+    - options: Pozostałe argumenty shard_loader (num_workers, prefetch_factor, pin_memory).
 
-train_losses, val_losses, val_accuracies = train_model(model, train_loader, val_loader, optimizer, criterion, epochs=50)
+    Zwraca:
+    - DataLoader: Partie (pozycje, indeksy ruchów) w stałej kolejności.
+    """
+    if samples is None or samples >= len(dataset):
+        return shard_loader(dataset, batch_size=batch_size, shuffle=False, **options)
+    indices = np.sort(np.random.default_rng(seed).choice(len(dataset), size=samples, replace=False))
+    return DataLoader(TensorDataset(*collate_planes(dataset.__getitems__(indices))), batch_size=batch_size)
 
-torch.save(model.state_dict(), 'trained_with_openings.pth')
 
 def predict_move(model, fen):
     board = chess.Board(fen)
@@ -109,21 +197,21 @@ def predict_move(model, fen):
     return move.uci()
 
 
-def plot_metrics():
+def plot_metrics(train_losses, val_losses, val_accuracies, val_epochs, path='postep.pdf'):
     epochs = range(1, len(train_losses) + 1)
 
     plt.figure(figsize=(12,5))
 
     plt.subplot(1, 2, 1)
     plt.plot(epochs, train_losses, label='Training Loss', color='blue')
-    plt.plot(epochs, val_losses, label='Validation Loss', color='red')
+    plt.plot(val_epochs, val_losses, label='Validation Loss', color='red')
     plt.xlabel('Epochs')
     plt.ylabel('Loss')
     plt.title("Training and validation loss")
     plt.legend()
 
     plt.subplot(1,2,2)
-    plt.plot(epochs, val_accuracies, label='Validation Accuracy', color='green')
+    plt.plot(val_epochs, val_accuracies, label='Validation Accuracy', color='green')
     plt.xlabel('Epochs')
     plt.ylabel('Accuracy (%)')
     plt.title('Validation Accuracy')
@@ -131,9 +219,57 @@ def plot_metrics():
 
     plt.tight_layout()
 
-    plt.savefig('postep.pdf')
-
-
-plot_metrics()
-    
-
+    plt.savefig(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trenuj sieć na debiutach (shardy z prepare_data.py)')
+    parser.add_argument('--data_dir', type=str, default=DEFAULT_DATA_DIR, help='Katalog shardów z manifestem')
+    parser.add_argument('--epochs', type=int, default=50, help='Maksymalna liczba epok')
+    parser.add_argument('--batch_size', type=int, default=256, help='Rozmiar partii ładowanej naraz')
+    parser.add_argument('--accumulation_steps', type=int, default=1, help='Liczba partii na krok optymalizatora')
+    parser.add_argument('--lr', type=float, default=1e-4, help='Współczynnik uczenia')
+    parser.add_argument('--num_workers', type=int, default=2, help='Liczba procesów ładujących dane')
+    parser.add_argument('--prefetch_factor', type=int, default=4, help='Liczba partii pobieranych z wyprzedzeniem na proces')
+    parser.add_argument('--log_every', type=int, default=100, help='Co ile kroków raportować stratę i kroki/s (0 wyłącza)')
+    parser.add_argument('--val_every', type=int, default=1, help='Co ile epok walidować (0 wyłącza)')
+    parser.add_argument('--val_samples', type=int, default=None, help='Liczba próbek losowego podzbioru walidacji (domyślnie całość)')
+    parser.add_argument('--patience', type=int, default=None, help='Wczesne zatrzymanie po tylu walidacjach bez poprawy')
+    parser.add_argument('--min_delta', type=float, default=0.0, help='Minimalna poprawa straty walidacji')
+    parser.add_argument('--mixed_precision', action='store_true', help='Trening w autocast bfloat16 (wagi float32)')
+    parser.add_argument('--seed', type=int, default=0, help='Ziarno losowania')
+    parser.add_argument('--init', type=str, default=None, help='Wagi początkowe (state_dict)')
+    parser.add_argument('--output', type=str, default='trained_with_openings.pth', help='Ścieżka zapisu wag')
+    parser.add_argument('--plot', type=str, default='postep.pdf', help='Ścieżka wykresu postępu (pusta wyłącza)')
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    model = LuigiCNN(action_channels=1).to(device)
+    if args.init:
+        model.load_state_dict(torch.load(args.init, map_location=device))
+
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    criterion = torch.nn.CrossEntropyLoss()
+
+    pin_memory = device.type == 'cuda'
+    train_loader = shard_loader(ShardDataset(args.data_dir, 'train'), batch_size=args.batch_size, shuffle=True,
+                                seed=args.seed, num_workers=args.num_workers, prefetch_factor=args.prefetch_factor,
+                                pin_memory=pin_memory)
+    val_data = ShardDataset(args.data_dir, 'val')
+    val_loader = validation_loader(val_data, args.val_samples, batch_size=args.batch_size, seed=args.seed,
+                                   num_workers=args.num_workers, prefetch_factor=args.prefetch_factor,
+                                   pin_memory=pin_memory) if len(val_data) else None
+
+    train_losses, val_losses, val_accuracies, val_epochs = train_model(
+        model, train_loader, val_loader, optimizer, criterion, epochs=args.epochs, mixed_precision=args.mixed_precision,
+        accumulation_steps=args.accumulation_steps, log_every=args.log_every, val_every=args.val_every,
+        patience=args.patience, min_delta=args.min_delta)
+
+    torch.save(model.state_dict(), args.output)
+
+    if args.plot:
+        plot_metrics(train_losses, val_losses, val_accuracies, val_epochs, args.plot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# position_cache.py
+
+from collections import OrderedDict, namedtuple
+import logging
+import torch
+from chess_utils import encode_batch, legal_move_indices
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+# Przybliżony koszt pamięci jednego obiektu chess.Move na liście ruchów (w bajtach)
+MOVE_BYTES = 64
+
+CacheEntry = namedtuple('CacheEntry', ['planes', 'legal_indices', 'legal_moves', 'nbytes'])
+
+class PositionCache:
+    def __init__(self, max_entries=100000, max_bytes=256 * 2**20):
+        """
+        Inicjalizuje ograniczoną pamięć podręczną LRU dla zakodowanych pozycji.
+
+        Kluczem jest klucz transpozycji python-chess (bierki, strona na ruchu, prawa do roszady,
+        bicie w przelocie), więc ta sama pozycja osiągnięta różnymi kolejnościami ruchów
+        korzysta z jednego wpisu. Zwracane tensory i tablice są współdzielone i nie powinny być
+        modyfikowane.
+
+        Parametry:
+        - max_entries (int): Maksymalna liczba przechowywanych pozycji.
+        - max_bytes (int): Budżet pamięci w bajtach dla wszystkich wpisów.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, board):
+        """
+        Zwraca wpis dla pozycji, obliczając go przy braku w pamięci podręcznej.
+
+        Parametry:
+        - board (chess.Board): Aktualna plansza gry.
+
+        Zwraca:
+        - CacheEntry: Płaszczyzny [12, 8, 8], indeksy legalnych akcji (int16) i lista legalnych ruchów.
+        """
+        key = board._transposition_key()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        return self._insert(key, board, encode_batch([board])[0])
+
+    def tensor(self, board):
+        """
+        Zwraca płaszczyzny planszy (jak board_to_tensor).
+        """
+        return self.get(board).planes
+
+    def legal_indices(self, board):
+        """
+        Zwraca indeksy legalnych akcji (jak legal_move_indices).
+        """
+        return self.get(board).legal_indices
+
+    def legal_moves(self, board):
+        """
+        Zwraca listę legalnych ruchów (jak list(board.legal_moves)).
+        """
+        return self.get(board).legal_moves
+
+    def encode_batch(self, boards, out=None):
+        """
+        Koduje wiele plansz, kodując brakujące pozycje jednym wywołaniem encode_batch.
+
+        Parametry:
+        - boards (lista chess.Board): Plansze do zakodowania.
+        - out (torch.Tensor, opcjonalnie): Prealokowany bufor float32 [N, 12, 8, 8].
+
+        Zwraca:
+        - torch.Tensor: Tensor o kształcie [N, 12, 8, 8] identyczny z chess_utils.encode_batch.
+        """
+        if out is None:
+            out = torch.empty(len(boards), 12, 8, 8, dtype=torch.float32)
+
+        missing = {}
+        for i, board in enumerate(boards):
+            key = board._transposition_key()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                out[i] = entry.planes
+            else:
+                missing.setdefault(key, []).append(i)
+
+        if missing:
+            positions = list(missing.values())
+            planes = encode_batch([boards[rows[0]] for rows in positions])
+            for (key, rows), board_planes in zip(missing.items(), planes):
+                self.misses += 1
+                self.hits += len(rows) - 1
+                out[rows] = board_planes
+                self._insert(key, boards[rows[0]], board_planes.clone())
+        return out
+
+    def stats(self):
+        """
+        Zwraca statystyki trafień pamięci podręcznej.
+
+        Zwraca:
+        - dict: Liczba trafień, chybień, usunięć, wpisów, zajęte bajty oraz odsetek trafień.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        """
+        Usuwa wszystkie wpisy (statystyki pozostają bez zmian).
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _insert(self, key, board, planes):
+        """
+        Dodaje wpis i usuwa najdawniej używane pozycje ponad limit liczby wpisów lub bajtów.
+        """
+        legal_moves = list(board.legal_moves)
+        legal_indices = legal_move_indices(board)
+        nbytes = planes.nbytes + legal_indices.nbytes + MOVE_BYTES * len(legal_moves)
+        entry = CacheEntry(planes, legal_indices, legal_moves, nbytes)
+
+        self._entries[key] = entry
+        self.nbytes += nbytes
+        while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+        return entry
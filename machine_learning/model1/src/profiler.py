@@ -0,0 +1,187 @@
+# profiler.py
+
+import contextlib
+import logging
+import os
+import time
+from collections import deque
+import torch
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+# Fazy mierzone w pętli treningowej (kolejność w tabeli podsumowania)
+PHASES = ('stockfish_eval', 'opponent_move', 'encoding', 'forward', 'learn', 'print')
+
+# Współdzielony, pusty kontekst zwracany przy wyłączonym profilerze (bez alokacji)
+_NULL_PHASE = contextlib.nullcontext()
+
+class _Phase:
+    """
+    Kontekst mierzący czas jednego wywołania fazy.
+    """
+    __slots__ = ('profiler', 'name', 'start', 'record')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        # Etykieta fazy w śladzie torch.profiler (tylko gdy ślad jest nagrywany)
+        self.record = torch.profiler.record_function(self.name) if self.profiler._trace is not None else None
+        if self.record is not None:
+            self.record.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.record is not None:
+            self.record.__exit__(exc_type, exc, tb)
+        self.profiler._add(self.name, elapsed)
+        return False
+
+class PhaseProfiler:
+    def __init__(self, enabled=False, summary_every=0, trace_path=None, trace_episodes=None, history_size=1000):
+        """
+        Inicjalizuje profiler faz pętli treningowej (czas i liczba wywołań każdej fazy w epizodzie).
+
+        Fazy nie powinny się zagnieżdżać; czas epizodu niepokryty fazami raportowany jest jako 'other'.
+        Wyłączony profiler zwraca z phase() współdzielony pusty kontekst, więc jego koszt
+        ogranicza się do wywołania metody.
+
+        Parametry:
+        - enabled (bool): Czy mierzyć czasy faz.
+        - summary_every (int): Co ile epizodów logować tabelę podsumowania (0 wyłącza).
+        - trace_path (str, opcjonalnie): Ścieżka pliku śladu Chrome (torch.profiler).
+        - trace_episodes (krotka int, opcjonalnie): Zakres epizodów (pierwszy, ostatni) nagrywanych do śladu.
+        - history_size (int): Liczba ostatnich epizodów przechowywanych w historii (starsze są usuwane).
+        """
+        self.enabled = enabled
+        self.summary_every = summary_every
+        self.trace_path = trace_path
+        self.trace_episodes = trace_episodes if trace_path else None
+        self.history = deque(maxlen=history_size)  # (epizod, liczba epizodów, czas ściany, {faza: (czas, wywołania)})
+        self._trace = None
+        self._reset_window()
+        self._episode = None
+
+    def phase(self, name):
+        """
+        Zwraca kontekst mierzący czas fazy, np. `with profiler.phase('forward'):`.
+
+        Parametry:
+        - name (str): Nazwa fazy (zob. PHASES).
+
+        Zwraca:
+        - Kontekst (pusty, jeśli profiler jest wyłączony).
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def start_episode(self, episode, num_episodes=1):
+        """
+        Rozpoczyna pomiar epizodu (lub grupy epizodów rozgrywanych równolegle).
+
+        Ślad jest nagrywany od pierwszej grupy, której zakres epizodów zachodzi na trace_episodes.
+
+        Parametry:
+        - episode (int): Numer pierwszego epizodu.
+        - num_episodes (int): Liczba epizodów w grupie (partie równoległe, aktorzy).
+        """
+        if not self.enabled:
+            return
+        if self.trace_episodes and self._trace is None:
+            first, last = self.trace_episodes
+            if episode <= last and episode + num_episodes - 1 >= first:
+                self._start_trace()
+        self._episode = episode
+        self._episode_phases = {}
+        self._episode_start = time.perf_counter()
+
+    def end_episode(self, num_episodes=1):
+        """
+        Kończy pomiar epizodu, dopisuje go do historii i co summary_every epizodów loguje podsumowanie.
+
+        Parametry:
+        - num_episodes (int): Liczba epizodów rozegranych od start_episode (partie równoległe).
+        """
+        if not self.enabled or self._episode is None:
+            return
+        wall = time.perf_counter() - self._episode_start
+        last_episode = self._episode + num_episodes - 1
+        self.history.append((self._episode, num_episodes, wall, self._episode_phases))
+
+        self._window_wall += wall
+        self._window_episodes += num_episodes
+        for name, (seconds, calls) in self._episode_phases.items():
+            total_seconds, total_calls = self._window.get(name, (0.0, 0))
+            self._window[name] = (total_seconds + seconds, total_calls + calls)
+        self._episode = None
+
+        if self._trace is not None and last_episode >= self.trace_episodes[1]:
+            self._stop_trace()
+        if self.summary_every and self._window_episodes >= self.summary_every:
+            logger.info(f"Profil faz (epizody do {last_episode}):\n{self.summary()}")
+            self._reset_window()
+
+    def summary(self):
+        """
+        Zwraca tabelę podsumowania faz od ostatniego podsumowania.
+
+        Zwraca:
+        - str: Tabela z łącznym czasem, liczbą wywołań, czasem na wywołanie i udziałem w czasie epizodów.
+        """
+        wall = self._window_wall
+        names = [name for name in PHASES if name in self._window]
+        names += sorted(name for name in self._window if name not in PHASES)
+        lines = [f"{'faza':<16}{'czas [s]':>10}{'wywołania':>11}{'ms/wywołanie':>14}{'udział':>9}"]
+        covered = 0.0
+        for name in names:
+            seconds, calls = self._window[name]
+            covered += seconds
+            share = 100 * seconds / wall if wall else 0.0
+            lines.append(f"{name:<16}{seconds:>10.3f}{calls:>11}{1000 * seconds / max(calls, 1):>14.3f}{share:>8.1f}%")
+        other = max(wall - covered, 0.0)
+        lines.append(f"{'other':<16}{other:>10.3f}{'':>11}{'':>14}{100 * other / wall if wall else 0.0:>8.1f}%")
+        lines.append(f"{'razem':<16}{wall:>10.3f}{self._window_episodes:>11} epizodów")
+        return "\n".join(lines)
+
+    def close(self):
+        """
+        Kończy nagrywanie śladu, jeśli trening zakończył się przed końcem zakresu trace_episodes.
+        """
+        if self._trace is not None:
+            self._stop_trace()
+
+    def _add(self, name, seconds):
+        if self._episode is None:
+            return  # Pomiar poza epizodem (np. przy inicjalizacji)
+        total_seconds, calls = self._episode_phases.get(name, (0.0, 0))
+        self._episode_phases[name] = (total_seconds + seconds, calls + 1)
+
+    def _reset_window(self):
+        self._window = {}
+        self._window_wall = 0.0
+        self._window_episodes = 0
+
+    def _start_trace(self):
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        self._trace = torch.profiler.profile(activities=activities)
+        self._trace.__enter__()
+        logger.info(f"Nagrywanie śladu torch.profiler dla epizodów {self.trace_episodes[0]}-{self.trace_episodes[1]}")
+
+    def _stop_trace(self):
+        trace, self._trace = self._trace, None
+        trace.__exit__(None, None, None)
+        trace_dir = os.path.dirname(self.trace_path)
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+        trace.export_chrome_trace(self.trace_path)
+        logger.info(f"Ślad Chrome zapisany do {self.trace_path}")
+
+# Domyślny, wyłączony profiler dla agenta i środowiska
+NULL_PROFILER = PhaseProfiler(enabled=False)
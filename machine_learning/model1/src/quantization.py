@@ -0,0 +1,184 @@
+# quantization.py
+
+import argparse
+import io
+import logging
+import os
+import time
+import torch
+import torch.nn as nn
+from model import LuigiCNN
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+def _conv_bn_pairs(model):
+    """
+    Zwraca nazwy par (konwolucja, BatchNorm) LuigiCNN, które można scalić w jedną konwolucję.
+    """
+    pairs = [['conv1', 'bn1'], ['conv_final', 'bn_final'], ['value_conv', 'value_bn']]
+    for i in range(len(model.residual_blocks)):
+        pairs.append([f'residual_blocks.{i}.conv1', f'residual_blocks.{i}.bn1'])
+        pairs.append([f'residual_blocks.{i}.conv2', f'residual_blocks.{i}.bn2'])
+    return pairs
+
+def quantize_model(model):
+    """
+    Tworzy kopię modelu do gry na CPU: BatchNorm scalony z konwolucjami, warstwy liniowe w int8.
+
+    Dynamiczna kwantyzacja PyTorch obsługuje tylko warstwy liniowe (m.in. fc2 o rozmiarze
+    1024x4096, który dominuje w czasie i pamięci), więc konwolucje pozostają float32, ale po
+    scaleniu z BatchNorm wykonują jedną operację zamiast dwóch.
+
+    Parametry:
+    - model (LuigiCNN): Model zmiennoprzecinkowy (nie jest modyfikowany).
+
+    Zwraca:
+    - LuigiCNN: Skwantyzowany model w trybie eval na CPU.
+    """
+    float_model = LuigiCNN(action_channels=model.action_channels)
+    float_model.load_state_dict(model.state_dict())
+    float_model.eval()
+    fused = torch.ao.quantization.fuse_modules(float_model, _conv_bn_pairs(float_model))
+    quantized = torch.ao.quantization.quantize_dynamic(fused, {nn.Linear}, dtype=torch.qint8)
+    return quantized.eval()
+
+def quantized_template(action_channels=1):
+    """
+    Zwraca skwantyzowany model o strukturze zgodnej z zapisanym state_dict (do wczytania wag).
+    """
+    return quantize_model(LuigiCNN(action_channels=action_channels))
+
+def model_state_dict_from_checkpoint(checkpoint):
+    """
+    Wyciąga state_dict modelu z punktu kontrolnego agenta (ChessAgent.save_model)
+    lub z samego state_dict (np. trained_with_openings.pth).
+    """
+    if isinstance(checkpoint, dict) and 'model_state_dict' in checkpoint:
+        return checkpoint['model_state_dict']
+    return checkpoint
+
+def export_quantized(checkpoint_path, output_path, action_channels=1):
+    """
+    Wczytuje zmiennoprzecinkowy punkt kontrolny i zapisuje jego skwantyzowaną wersję.
+
+    Zapisany plik może być wczytany przez ChessAgent.load_model (rozpoznaje klucz 'quantized').
+
+    Parametry:
+    - checkpoint_path (str): Ścieżka do punktu kontrolnego modelu float32.
+    - output_path (str): Ścieżka zapisu modelu skwantyzowanego.
+    - action_channels (int): Liczba kanałów akcji modelu.
+
+    Zwraca:
+    - (LuigiCNN, LuigiCNN): Model zmiennoprzecinkowy i skwantyzowany.
+    """
+    checkpoint = torch.load(checkpoint_path, map_location='cpu')
+    float_model = LuigiCNN(action_channels=action_channels)
+    float_model.load_state_dict(model_state_dict_from_checkpoint(checkpoint))
+    float_model.eval()
+    quantized = quantize_model(float_model)
+
+    exported = {'model_state_dict': quantized.state_dict(), 'quantized': True, 'action_channels': action_channels}
+    if isinstance(checkpoint, dict):
+        for key in ('gamma', 'entropy_coef', 'agent_color'):
+            if key in checkpoint:
+                exported[key] = checkpoint[key]
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    torch.save(exported, output_path)
+    logger.info(f"Skwantyzowany model zapisany do {output_path}")
+    return float_model, quantized
+
+def compare_accuracy(float_model, quantized_model, inputs, targets, batch_size=256):
+    """
+    Porównuje trafność modelu float32 i skwantyzowanego na zbiorze walidacyjnym debiutów.
+
+    Parametry:
+    - float_model (LuigiCNN): Model zmiennoprzecinkowy.
+    - quantized_model (LuigiCNN): Model skwantyzowany.
+    - inputs (torch.Tensor): Pozycje [N, 12, 8, 8].
+    - targets (torch.Tensor): Indeksy poprawnych ruchów [N].
+    - batch_size (int): Rozmiar partii.
+
+    Zwraca:
+    - dict: Trafność obu modeli (%), zgodność ich najlepszych ruchów (%) i maksymalna różnica logitów.
+    """
+    float_model.eval()
+    quantized_model.eval()
+    float_correct = quantized_correct = agree = 0
+    max_diff = 0.0
+    with torch.inference_mode():
+        for start in range(0, len(inputs), batch_size):
+            x = inputs[start:start + batch_size].float()
+            y = targets[start:start + batch_size]
+            float_logits = float_model(x, None)[0].view(len(x), -1)
+            quantized_logits = quantized_model(x, None)[0].view(len(x), -1)
+            float_pred = float_logits.argmax(dim=1)
+            quantized_pred = quantized_logits.argmax(dim=1)
+            float_correct += (float_pred == y).sum().item()
+            quantized_correct += (quantized_pred == y).sum().item()
+            agree += (float_pred == quantized_pred).sum().item()
+            max_diff = max(max_diff, (float_logits - quantized_logits).abs().max().item())
+
+    total = max(len(inputs), 1)
+    return {
+        'float_accuracy': 100 * float_correct / total,
+        'quantized_accuracy': 100 * quantized_correct / total,
+        'top1_agreement': 100 * agree / total,
+        'max_logit_diff': max_diff
+    }
+
+def model_size_bytes(model):
+    """
+    Zwraca rozmiar zserializowanego state_dict modelu w bajtach.
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+def latency_ms(model, batch_size=1, repeats=200):
+    """
+    Zwraca średni czas przejścia sieci (ms) dla losowego wejścia.
+    """
+    x = torch.rand(batch_size, 12, 8, 8)
+    with torch.inference_mode():
+        for _ in range(10):
+            model(x, None)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(x, None)
+    return (time.perf_counter() - start) * 1000 / repeats
+
+def main():
+    # Import lokalny: agent importuje ten moduł, a zbiór debiutów potrzebny jest tylko do walidacji
+    from openings.dataset import ShardDataset
+    from openings.shards import MANIFEST
+
+    dirname = os.path.dirname(__file__)
+    parser = argparse.ArgumentParser(description='Eksport skwantyzowanego (int8) modelu LuigiCNN do gry na CPU')
+    parser.add_argument('--checkpoint', type=str, required=True, help='Punkt kontrolny modelu float32')
+    parser.add_argument('--output', type=str, required=True, help='Ścieżka zapisu modelu skwantyzowanego')
+    parser.add_argument('--val_data', type=str, default=os.path.join(dirname, 'openings', 'data_shards'),
+                        help='Katalog shardów debiutów (prepare_data.py) lub plik .pt do sprawdzenia trafności')
+    parser.add_argument('--batch_size', type=int, default=256, help='Rozmiar partii przy walidacji')
+    args = parser.parse_args()
+
+    float_model, quantized = export_quantized(args.checkpoint, args.output)
+    print(f"Rozmiar: {model_size_bytes(float_model) / 2**20:.1f} MB -> {model_size_bytes(quantized) / 2**20:.1f} MB")
+    print(f"Czas przejścia (batch 1): {latency_ms(float_model):.3f} ms -> {latency_ms(quantized):.3f} ms")
+
+    if os.path.isfile(os.path.join(args.val_data, MANIFEST)) or os.path.isfile(args.val_data):
+        if os.path.isdir(args.val_data):
+            val_inputs, val_targets = ShardDataset(args.val_data, 'val').tensors()
+        else:
+            data = torch.load(args.val_data)
+            val_inputs, val_targets = data['val_inputs'], data['val_targets']
+        metrics = compare_accuracy(float_model, quantized, val_inputs, val_targets, args.batch_size)
+        print(f"Trafność na walidacji: float32 {metrics['float_accuracy']:.2f}%, int8 {metrics['quantized_accuracy']:.2f}%")
+        print(f"Zgodność najlepszego ruchu: {metrics['top1_agreement']:.2f}%, maks. różnica logitów: {metrics['max_logit_diff']:.4f}")
+    else:
+        logger.warning(f"Brak danych walidacyjnych w {args.val_data}. Pominięto sprawdzenie trafności.")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import chess
 import logging
+import numpy as np
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.DEBUG)
@@ -15,6 +16,11 @@ PIECE_VALUES = {
     chess.KING: 0
 }
 
+# Wagi składników nagrody w trakcie gry: zmiana oceny, materiał, pozycja
+ALPHA = 0.01
+BETA = 0
+GAMMA = 0
+
 def calculate_in_game_reward(previous_eval, current_eval, agent_color, previous_board, current_board, last_move):
     """
     Oblicz nagrodę w grze na podstawie zmian oceny Stockfisha oraz heurystyk materiałowych/pozycyjnych.
@@ -30,9 +36,9 @@ def calculate_in_game_reward(previous_eval, current_eval, agent_color, previous_
     Zwraca:
     - float: Natychmiastowa nagroda.
     """
-    alpha = 0.01
-    beta = 0
-    gamma = 0
+    alpha = ALPHA
+    beta = BETA
+    gamma = GAMMA
 
     eval_change_reward = 0.0
     material_reward = 0.0
@@ -93,3 +99,141 @@ def calculate_end_game_reward(agent_color, game_result):
     else:
         logger.debug(f"Gra kończy się remisem. Nagroda: {draw_reward}")
         return draw_reward
+
+
+class RewardEngine:
+    def __init__(self, alpha=ALPHA, beta=BETA, gamma=GAMMA):
+        """
+        Inicjalizuje silnik nagród w trakcie gry, liczący tylko składniki o niezerowych wagach.
+
+        Wyniki są bitowo identyczne z calculate_in_game_reward dla tych samych wag: kolejność działań
+        zmiennoprzecinkowych jest zachowana, a pominięte składniki i tak byłyby równe 0.0. Ruchy planszy
+        (mobilność) i bicia są analizowane tylko wtedy, gdy odpowiednia waga jest niezerowa.
+
+        Parametry:
+        - alpha (float): Waga zmiany oceny Stockfisha.
+        - beta (float): Waga wartości zbitej figury przeciwnika.
+        - gamma (float): Waga zmiany mobilności i premii za szacha.
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        # Czy nagroda zależy od planszy (bicia, mobilność, szach), czy tylko od ocen
+        self.needs_boards = bool(beta or gamma)
+
+    def move_features(self, agent_color, previous_board, current_board, last_move):
+        """
+        Zwraca zwięzłe cechy ruchu potrzebne do nagrody (zerowe dla składników o zerowych wagach).
+
+        Zwraca:
+        - (int, int, bool): Wartość zbitej figury przeciwnika, zmiana liczby legalnych ruchów, czy ruch daje szacha.
+        """
+        captured_value = 0
+        if self.beta and previous_board.is_capture(last_move):
+            captured_piece = previous_board.piece_at(last_move.to_square)
+            if captured_piece and captured_piece.color != agent_color:
+                captured_value = PIECE_VALUES.get(captured_piece.piece_type, 0)
+        mobility_difference = 0
+        gives_check = False
+        if self.gamma:
+            mobility_difference = current_board.legal_moves.count() - previous_board.legal_moves.count()
+            gives_check = current_board.is_check()
+        return captured_value, mobility_difference, gives_check
+
+    def in_game_reward(self, previous_eval, current_eval, agent_color, previous_board, current_board, last_move):
+        """
+        Oblicza nagrodę za jeden ruch (argumenty jak w calculate_in_game_reward).
+
+        Zwraca:
+        - float: Natychmiastowa nagroda.
+        """
+        eval_change_reward = 0.0
+        if previous_eval is not None and current_eval is not None:
+            eval_change = current_eval - previous_eval
+            if agent_color == chess.BLACK:
+                eval_change = -eval_change
+            eval_change_reward = self.alpha * eval_change
+        if not self.needs_boards:
+            return eval_change_reward + 0.0 + 0.0
+
+        captured_value, mobility_difference, gives_check = self.move_features(agent_color, previous_board, current_board, last_move)
+        material_reward = 0.0 + self.beta * captured_value if captured_value else 0.0
+        positional_reward = 0.0 + self.gamma * mobility_difference
+        if gives_check:
+            positional_reward += self.gamma * 0.5
+        return eval_change_reward + material_reward + positional_reward
+
+    def trajectory_rewards(self, agent_color, previous_evals, current_evals, captured_values=None,
+                           mobility_differences=None, gives_check=None):
+        """
+        Oblicza nagrody dla całej trajektorii naraz (operacje wektorowe na tablicach).
+
+        Parametry:
+        - agent_color (chess.Color): Kolor agenta.
+        - previous_evals, current_evals (sekwencje int lub None): Oceny przed i po każdym ruchu agenta.
+        - captured_values, mobility_differences, gives_check (sekwencje, opcjonalnie): Cechy ruchów z move_features;
+          wymagane tylko dla niezerowych wag beta i gamma.
+
+        Zwraca:
+        - np.ndarray: Nagrody (float64) w kolejności ruchów.
+        """
+        previous = np.array([np.nan if value is None else value for value in previous_evals], dtype=np.float64)
+        current = np.array([np.nan if value is None else value for value in current_evals], dtype=np.float64)
+        eval_change = current - previous
+        if agent_color == chess.BLACK:
+            eval_change = -eval_change
+        # Brak którejkolwiek oceny daje zerowy składnik (NaN tylko w takich pozycjach)
+        rewards = np.where(np.isnan(eval_change), 0.0, self.alpha * eval_change)
+
+        material_reward = np.zeros_like(rewards)
+        if self.beta:
+            values = np.asarray(captured_values, dtype=np.float64)
+            material_reward = np.where(values != 0, 0.0 + self.beta * values, 0.0)
+        positional_reward = np.zeros_like(rewards)
+        if self.gamma:
+            positional_reward = 0.0 + self.gamma * np.asarray(mobility_differences, dtype=np.float64)
+            positional_reward = np.where(np.asarray(gives_check, dtype=bool), positional_reward + self.gamma * 0.5,
+                                         positional_reward)
+        return rewards + material_reward + positional_reward
+
+
+class RewardTrajectory:
+    def __init__(self, engine, agent_color):
+        """
+        Zbiera zwięzłe dane ruchów agenta (oceny i cechy ruchów), a nagrody oblicza naraz po zakończeniu partii.
+
+        Parametry:
+        - engine (RewardEngine): Silnik nagród.
+        - agent_color (chess.Color): Kolor agenta.
+        """
+        self.engine = engine
+        self.agent_color = agent_color
+        self.previous_evals = []
+        self.current_evals = []
+        self.features = []
+
+    def __len__(self):
+        return len(self.current_evals)
+
+    def add(self, previous_eval, current_eval, previous_board, current_board, last_move):
+        """
+        Zapisuje dane jednego ruchu agenta (argumenty jak w calculate_in_game_reward).
+        """
+        self.previous_evals.append(previous_eval)
+        self.current_evals.append(current_eval)
+        if self.engine.needs_boards:
+            self.features.append(self.engine.move_features(self.agent_color, previous_board, current_board, last_move))
+
+    def rewards(self):
+        """
+        Zwraca nagrody wszystkich zapisanych ruchów.
+
+        Zwraca:
+        - lista float: Nagrody w kolejności ruchów.
+        """
+        if not self.current_evals:
+            return []
+        captured_values, mobility_differences, gives_check = zip(*self.features) if self.features else (None, None, None)
+        rewards = self.engine.trajectory_rewards(self.agent_color, self.previous_evals, self.current_evals,
+                                                 captured_values, mobility_differences, gives_check)
+        return rewards.tolist()
@@ -0,0 +1,132 @@
+# self_play.py
+
+import logging
+import time
+import chess
+from chess_utils import board_masks, legal_move_indices
+from reward import RewardEngine, RewardTrajectory, calculate_end_game_reward
+
+# Konfiguracja logowania
+logger = logging.getLogger(__name__)
+
+class GameTrajectory:
+    def __init__(self):
+        """
+        Przechowuje stan jednej z partii rozgrywanych równolegle oraz jej trajektorię.
+        """
+        self.board = chess.Board()
+        self.states = []
+        self.legal_indices = []
+        self.actions = []
+        self.rewards = []
+        self.total_reward = 0.0
+        self.previous_eval = None
+        self.opponent_move = None  # Ruch przeciwnika z wyszukiwania, które dało previous_eval
+        self.move_count = 0
+        self.done = False
+        self.result = None
+        self.adjudication = None  # Stan wczesnego rozstrzygania partii (GameAdjudication)
+        self.trajectory = None  # Dane ruchów agenta do obliczenia nagród (RewardTrajectory)
+
+def play_batched_episodes(agent, env, num_games, max_moves=100, epsilon=0.1, adjudicator=None, reward_engine=None):
+    """
+    Rozgrywa num_games niezależnych partii z przeciwnikiem Stockfish w krokach synchronicznych.
+
+    W każdym kroku wszystkie pozycje, w których ruch ma agent, są oceniane jednym wsadowym
+    przejściem sieci (ChessAgent.select_moves), a ruchy przeciwnika i oceny pozycji pobierane są
+    zbiorczo (równolegle, jeśli środowisko używa puli silników). Nagrody są liczone tak samo jak w train_agent.
+
+    Parametry:
+    - agent (ChessAgent): Agent wybierający ruchy.
+    - env (ChessEnvironment): Środowisko z silnikiem Stockfish (przeciwnik i oceny pozycji).
+    - num_games (int): Liczba równoległych partii.
+    - max_moves (int): Maksymalna liczba półruchów na partię.
+    - epsilon (float): Prawdopodobieństwo wybrania losowego ruchu przez agenta.
+    - adjudicator (Adjudicator, opcjonalnie): Reguły wczesnego rozstrzygania partii na podstawie ocen.
+    - reward_engine (RewardEngine, opcjonalnie): Silnik nagród w trakcie gry (domyślnie wagi z reward.py).
+
+    Zwraca:
+    - lista GameTrajectory: Zakończone partie ze stanami, akcjami, nagrodami i wynikiem.
+    """
+    start = time.perf_counter()
+    games = [GameTrajectory() for _ in range(num_games)]
+    reward_engine = reward_engine or RewardEngine()
+    for game in games:
+        game.trajectory = RewardTrajectory(reward_engine, agent.agent_color)
+    if adjudicator is not None:
+        for game in games:
+            game.adjudication = adjudicator.start_game(agent.agent_color)
+    if agent.agent_color == chess.WHITE:
+        for game, evaluation in zip(games, env.get_stockfish_evaluations([game.board for game in games])):
+            game.previous_eval = evaluation
+    else:
+        for game, step in zip(games, env.opponent_steps([game.board for game in games])):
+            game.previous_eval, game.opponent_move = step.score, step.move
+
+    active = list(games)
+    while active:
+        agent_games = [game for game in active if game.board.turn == agent.agent_color]
+        opponent_games = [game for game in active if game.board.turn != agent.agent_color]
+
+        # Ruchy przeciwnika (Stockfish)
+        without_move = [game for game in opponent_games if game.opponent_move is None]
+        for game, move in zip(without_move, env.get_opponent_moves([game.board for game in without_move]) if without_move else []):
+            game.opponent_move = move
+        for game in opponent_games:
+            move, game.opponent_move = game.opponent_move, None
+            if move is None:
+                logger.info("Brak dostępnych legalnych ruchów dla przeciwnika.")
+                game.done = True
+                continue
+            game.board.push(move)
+            game.move_count += 1
+
+        # Ruchy agenta - jedno przejście sieci dla wszystkich partii
+        if agent_games:
+            selections = agent.select_moves([game.board for game in agent_games], epsilon=epsilon)
+            moved = []
+            for game, (move, action) in zip(agent_games, selections):
+                if move is None:
+                    logger.info("Brak dostępnych legalnych ruchów dla agenta.")
+                    game.done = True
+                    continue
+
+                with agent.profiler.phase('encoding'):
+                    game.states.append(board_masks(game.board))
+                    game.legal_indices.append(legal_move_indices(game.board))
+                game.actions.append(action)
+
+                previous_board = game.board.copy() if reward_engine.needs_boards else None
+                game.board.push(move)
+                moved.append((game, move, previous_board))
+
+            # Oceny pozycji po ruchach agenta i odpowiedzi przeciwnika - jedno zbiorcze wyszukiwanie
+            steps = env.opponent_steps([game.board for game, _, _ in moved])
+            for (game, move, previous_board), step in zip(moved, steps):
+                current_eval, game.opponent_move = step.score, step.move
+                game.trajectory.add(game.previous_eval, current_eval, previous_board, game.board, move)
+                game.previous_eval = current_eval
+                game.move_count += 1
+                if game.adjudication is not None and adjudicator.update(game.adjudication, game.board, current_eval):
+                    game.done = True
+
+        for game in active:
+            if game.board.is_game_over() or game.move_count >= max_moves:
+                game.done = True
+        active = [game for game in active if not game.done]
+
+    # Nagrody w trakcie gry (liczone naraz dla każdej partii) i nagrody końca gry
+    seconds = (time.perf_counter() - start) / num_games
+    for game in games:
+        for reward in game.trajectory.rewards():
+            game.rewards.append(reward)
+            game.total_reward += reward
+        # Wynik rozstrzygnięcia zastępuje wynik nieukończonej partii
+        game.result = game.adjudication.result if game.adjudication is not None and game.adjudication.result else game.board.result()
+        if game.adjudication is not None:
+            adjudicator.end_game(game.adjudication, game.move_count, seconds)
+        end_game_reward = calculate_end_game_reward(agent.agent_color, game.result)
+        game.rewards.append(end_game_reward)
+        game.total_reward += end_game_reward
+
+    return games
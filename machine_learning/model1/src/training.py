@@ -1,12 +1,21 @@
 import logging
+import time
 
 import numpy as np
-import torch
 import chess
 
+from actor_learner import ActorLearner
+from adjudication import Adjudicator
 from agent import ChessAgent
+from checkpoints import CheckpointManager
+from encoder import IncrementalEncoder
+from engine_limits import EngineLimitScheduler
 from environment import ChessEnvironment
-from reward import calculate_in_game_reward, calculate_end_game_reward
+from eval_cache import EvalCache
+from position_cache import PositionCache
+from profiler import PhaseProfiler
+from self_play import play_batched_episodes
+from reward import RewardEngine, RewardTrajectory, calculate_end_game_reward
 import os
 
 # Ustaw poziom logowania z zmiennej środowiskowej lub domyślnie na INFO
@@ -14,39 +23,224 @@ logging_level = os.getenv('LOGGING_LEVEL', 'INFO').upper()
 logging.basicConfig(level=getattr(logging, logging_level, logging.INFO))  # Ustaw poziom logowania z zmiennej środowiskowej
 logger = logging.getLogger(__name__)
 
+def _opponent_step(env):
+    """
+    Zwraca ocenę pozycji i ruch przeciwnika z jednego wyszukiwania (ChessEnvironment.opponent_step).
+    """
+    step = env.opponent_step()
+    return step.score, step.move
+
+def play_episode(agent, env, max_moves=100, epsilon=0.1, verbose=True, adjudicator=None, reward_engine=None):
+    """
+    Rozgrywa jeden epizod agenta przeciwko Stockfishowi, zapisując trajektorię w buforze agenta.
+
+    Parametry:
+    - agent (ChessAgent): Trenowany agent.
+    - env (ChessEnvironment): Środowisko z silnikiem Stockfish.
+    - max_moves (int): Maksymalna liczba półruchów.
+    - epsilon (float): Prawdopodobieństwo wybrania losowego ruchu.
+    - verbose (bool): Czy wypisywać planszę po każdym ruchu i podsumowanie epizodu.
+    - adjudicator (Adjudicator, opcjonalnie): Reguły wczesnego rozstrzygania partii na podstawie ocen.
+    - reward_engine (RewardEngine, opcjonalnie): Silnik nagród w trakcie gry (domyślnie wagi z reward.py).
+
+    Zwraca:
+    - float: Całkowita nagroda z epizodu.
+    """
+    profiler = agent.profiler
+    start = time.perf_counter()
+    adjudication = adjudicator.start_game(agent.agent_color) if adjudicator is not None else None
+    adjudicated_result = None
+    env.reset()
+    encoder = IncrementalEncoder(env.board)  # Kodowanie planszy aktualizowane przyrostowo
+    move_count = 0
+    total_reward = 0.0
+    # Nagrody w trakcie gry liczone naraz po zakończeniu partii
+    trajectory = RewardTrajectory(reward_engine or RewardEngine(), agent.agent_color)
+    # Ruch przeciwnika wybrany przez wyszukiwanie, które dało ostatnią ocenę (opponent_step)
+    opponent_move = None
+    if env.board.turn == agent.agent_color:
+        previous_eval = env.get_stockfish_evaluation()
+    else:
+        previous_eval, opponent_move = _opponent_step(env)
+
+    while not env.board.is_game_over() and move_count < max_moves:
+        if verbose:
+            with profiler.phase('print'):
+                print(env.board)
+                print("\nBieżący ruch:", move_count + 1)
+
+        if env.board.turn == agent.agent_color:
+            # Ruch agenta
+            move = agent.select_move(env.board, epsilon=epsilon, encoder=encoder)
+
+            if move is None:
+                if verbose:
+                    print("Brak dostępnych legalnych ruchów dla agenta.")
+                break
+
+            previous_board = env.board.copy() if trajectory.engine.needs_boards else None
+            with profiler.phase('encoding'):
+                encoder.push(move)
+
+            # Jedno wyszukiwanie daje ocenę po ruchu agenta i odpowiedź przeciwnika
+            current_eval, opponent_move = _opponent_step(env)
+            trajectory.add(previous_eval, current_eval, previous_board, env.board, move)
+
+            previous_eval = current_eval
+            move_count += 1
+
+            if adjudication is not None:
+                adjudicated_result = adjudicator.update(adjudication, env.board, current_eval)
+                if adjudicated_result is not None:
+                    if verbose:
+                        print(f"Partia rozstrzygnięta na podstawie oceny ({adjudication.reason}).")
+                    break
+
+        else:
+            # Ruch przeciwnika (Stockfish), o ile nie został wybrany przy ocenie pozycji
+            move = opponent_move if opponent_move is not None else env.get_opponent_move()
+            opponent_move = None
+            if move is None:
+                if verbose:
+                    print("Brak dostępnych legalnych ruchów dla przeciwnika.")
+                break
+
+            with profiler.phase('encoding'):
+                encoder.push(move)
+            move_count += 1
+
+    # Nagrody w trakcie gry (w kolejności ruchów)
+    for reward in trajectory.rewards():
+        total_reward += reward
+        agent.remember(reward)
+
+    # Nagroda końca gry (wynik rozstrzygnięcia zastępuje wynik nieukończonej partii)
+    game_result = adjudicated_result or env.board.result()
+    if adjudication is not None:
+        adjudicator.end_game(adjudication, move_count, time.perf_counter() - start)
+    end_game_reward = calculate_end_game_reward(agent.agent_color, game_result)
+    total_reward += end_game_reward
+    agent.remember(end_game_reward)
+
+    # Zamknięcie epizodu; sieć jest aktualizowana co update_every epizodów
+    agent.finish_episode()
+
+    if verbose:
+        print(f"Nagroda końca gry: {end_game_reward}")
+        print(f"Wynik końcowy: {game_result}")
+        print(f"Całkowita nagroda: {total_reward}")
+    return total_reward
+
+
 def train_agent(num_episodes=1000, max_moves=100, agent_color=chess.WHITE, device='cpu',
                 save_every=100, window_size=50, save_path='chess_agent_checkpoint.pth',
                 best_save_path='best_chess_agent_checkpoint.pth',
                 load_checkpoint=None, stockfish_path=None, mcts_binary_path=None,
                 learning_rate=0.0001, gamma=0.95, entropy_coef=0.05,
-                initial_epsilon=1.0, final_epsilon=0.1, decay_rate=0.7):
+                initial_epsilon=1.0, final_epsilon=0.1, decay_rate=0.7,
+                position_cache_bytes=64 * 2**20, parallel_games=1, update_every=1,
+                inference_backend=None, mixed_precision=False,
+                profile=False, profile_every=100, profile_trace=None, profile_trace_episodes=None,
+                num_actors=0, max_staleness=2, eval_cache_path=None, stockfish_engines=1,
+                engine_budget_ms=None, engine_budget_nodes=None, engine_limit_mode='depth', engine_budget_per='search',
+                adjudicate=False, adjudicate_win_cp=1000, adjudicate_win_evals=4,
+                adjudicate_draw_cp=20, adjudicate_draw_evals=10, adjudicate_draw_after=80,
+                checkpoint_dir=None, keep_checkpoints=3):
     """
     Trenuj agenta szachowego przez określoną liczbę epizodów, korzystając z epsilon-greedy.
 
     Dodatkowe funkcje:
     - Implementacja nowej funkcji nagrody, uwzględniającej oceny, materiał i pozycję.
     - Stopniowe zwiększanie głębokości Stockfisha.
+    - Rozgrywanie parallel_games partii naraz z wsadowymi przejściami sieci (parallel_games > 1).
+    - Aktualizacja sieci raz na update_every epizodów, jednym wsadowym przeliczeniem log-prawdopodobieństw.
+    - Wspólna pamięć podręczna pozycji (position_cache_bytes bajtów, 0 wyłącza) dla agenta i środowiska.
+    - Wybór ruchów w trybie inferencji, opcjonalnie przez skompilowany model (inference_backend: 'compile' lub 'trace').
+    - Opcjonalna aktualizacja sieci w mieszanej precyzji bfloat16 (mixed_precision).
+    - Opcjonalny profil faz (profile): czasy Stockfisha, kodowania, przejść sieci, aktualizacji i wypisywania
+      planszy, podsumowywane co profile_every epizodów; ślad Chrome torch.profiler zapisywany do profile_trace
+      dla epizodów z zakresu profile_trace_episodes (pierwszy, ostatni).
+    - Tryb aktor–uczeń (num_actors > 0): num_actors procesów gra ze Stockfishem wagami odświeżanymi przez
+      pamięć współdzieloną, a bieżący proces tylko aktualizuje sieć; trajektorie starsze o więcej niż
+      max_staleness aktualizacji są odrzucane.
+    - Trwała pamięć podręczna ocen Stockfisha w pliku SQLite eval_cache_path, współdzielona przez procesy aktorów.
+    - Pula stockfish_engines procesów Stockfisha, do której partie równoległe wysyłają oceny i ruchy zbiorczo.
+    - Budżet obliczeń silnika (engine_budget_ms i/lub engine_budget_nodes na wyszukiwanie lub epizod,
+      engine_budget_per): limit 'depth' lub 'nodes' (engine_limit_mode) jest dostosowywany do zmierzonego
+      kosztu wyszukiwań, a siła przeciwnika rośnie co 10000 epizodów tylko w granicach budżetu.
+      Wybrany limit jest logowany razem z nagrodą epizodu.
+    - Wczesne rozstrzyganie partii (adjudicate): wygrana/poddanie, gdy |ocena| przekracza adjudicate_win_cp
+      przez adjudicate_win_evals kolejnych ocen (mat od razu), remis, gdy po adjudicate_draw_after półruchach
+      |ocena| nie przekracza adjudicate_draw_cp przez adjudicate_draw_evals ocen. Oszczędności są logowane.
+    - Katalog punktów kontrolnych (checkpoint_dir, zamiast save_path i best_save_path): zapis w tle z atomową
+      podmianą pliku, keep_checkpoints ostatnich punktów kontrolnych i najlepszy, metryki epizodów dopisywane
+      do metrics.jsonl. Bez load_checkpoint trening wznawia się od najnowszego punktu kontrolnego w katalogu,
+      z zapisanymi w nim epsilonem i głębokością Stockfisha.
 
     Zwraca:
     - rewards_history (list): Całkowite nagrody na epizod.
     - moving_avg (list): Średnia ruchoma nagród na przestrzeni epizodów.
     """
+    # Pamięć podręczna kodowań i legalnych ruchów, współdzielona przez agenta i środowisko
+    position_cache = PositionCache(max_bytes=position_cache_bytes) if position_cache_bytes else None
+
+    # Profiler faz pętli treningowej (wyłączony nie generuje narzutu)
+    profiler = PhaseProfiler(enabled=profile or bool(profile_trace and profile_trace_episodes), summary_every=profile_every,
+                             trace_path=profile_trace, trace_episodes=profile_trace_episodes)
+
     # Inicjalizacja ChessAgent
     agent = ChessAgent(agent_color=agent_color, device=device, mcts_binary_path=mcts_binary_path,
-                       lr=learning_rate, gamma=gamma, entropy_coef=entropy_coef)
+                       lr=learning_rate, gamma=gamma, entropy_coef=entropy_coef, position_cache=position_cache,
+                       update_every=update_every, inference_backend=inference_backend,
+                       mixed_precision=mixed_precision, profiler=profiler)
+
+    # Inicjalizacja zmiennych harmonogramu głębokości
+    current_depth = 5
+    depth_update_interval = 10000
 
-    # Inicjalizacja ChessEnvironment
-    env = ChessEnvironment(agent_color=agent_color, stockfish_path=stockfish_path)
+    # Katalog punktów kontrolnych z zapisem w tle
+    checkpoints = CheckpointManager(checkpoint_dir, keep_last=keep_checkpoints) if checkpoint_dir else None
 
     # Wczytaj checkpoint, jeśli podano
+    checkpoint = {}
     if load_checkpoint:
-        agent.load_model(load_checkpoint)
-        checkpoint = torch.load(load_checkpoint, map_location=device)
+        checkpoint = agent.load_model(load_checkpoint) or {}
         rewards_history = checkpoint.get('rewards_history', [])
         logger.info(f"Checkpoint wczytany z {load_checkpoint}")
+    elif checkpoints is not None and checkpoints.latest():
+        # Wznowienie: wagi, epsilon i głębokość z najnowszego punktu kontrolnego, historia nagród z pliku metryk
+        checkpoint = checkpoints.load(agent)
+        rewards_history = [record['reward'] for record in checkpoints.read_metrics(checkpoint.get('episode'))]
     else:
         rewards_history = []
         logger.info("Brak wczytanego checkpointa. Rozpoczynanie treningu od zera.")
+    epsilon = checkpoint.get('epsilon', initial_epsilon)
+    current_depth = checkpoint.get('stockfish_depth', current_depth)
+
+    # Harmonogram limitów silnika w budżecie obliczeń (koszt mierzony tylko w tym procesie)
+    limit_scheduler = None
+    if engine_budget_ms is not None or engine_budget_nodes is not None:
+        if num_actors > 0:
+            logger.warning("Budżet obliczeń silnika nie jest obsługiwany w trybie aktor–uczeń. Używanie stałego harmonogramu głębokości.")
+        else:
+            limit_scheduler = EngineLimitScheduler(mode=engine_limit_mode, budget_ms=engine_budget_ms,
+                                                   budget_nodes=engine_budget_nodes, per=engine_budget_per,
+                                                   start_depth=current_depth, raise_every=depth_update_interval)
+
+    # Reguły wczesnego rozstrzygania partii
+    adjudicator = None
+    if adjudicate:
+        adjudicator = Adjudicator(win_threshold=adjudicate_win_cp, win_evals=adjudicate_win_evals,
+                                  draw_threshold=adjudicate_draw_cp, draw_evals=adjudicate_draw_evals,
+                                  draw_after=adjudicate_draw_after, max_moves=max_moves)
+
+    # Inicjalizacja ChessEnvironment (w trybie aktor–uczeń partie rozgrywają aktorzy z własnymi silnikami)
+    env = eval_cache = None
+    if num_actors == 0:
+        eval_cache = EvalCache(eval_cache_path) if eval_cache_path else None
+        env = ChessEnvironment(agent_color=agent_color, stockfish_path=stockfish_path, position_cache=position_cache,
+                               stockfish_depth=current_depth, profiler=profiler, eval_cache=eval_cache,
+                               stockfish_engines=stockfish_engines, limit_scheduler=limit_scheduler)
 
     # Inicjalizacja średniej ruchomej
     moving_avg = []
@@ -56,108 +250,110 @@ def train_agent(num_episodes=1000, max_moves=100, agent_color=chess.WHITE, devic
 
     # Inicjalizacja zmiennych
     start_episode = len(rewards_history) + 1
-    epsilon = initial_epsilon
-    current_depth = 5
-    depth_update_interval = 10000
+
+    # Procesy aktorów (startują z wagami wczytanymi powyżej)
+    actor_learner = None
+    if num_actors > 0:
+        actor_learner = ActorLearner(agent, num_actors, stockfish_path=stockfish_path, max_moves=max_moves,
+                                     max_staleness=max_staleness, eval_cache_path=eval_cache_path,
+                                     adjudicator=adjudicator)
+        actor_learner.set_epsilon(epsilon)
+        actor_learner.set_depth(current_depth)
+        actor_learner.start()
 
     try:
-        for episode in range(start_episode, start_episode + num_episodes):
-            print(f"--- Epizod {episode} ---")
-            env.reset()
-            move_count = 0
-            total_reward = 0.0
-            previous_eval = env.get_stockfish_evaluation()
-
-            while not env.board.is_game_over() and move_count < max_moves:
-                print(env.board)
-                print("\nBieżący ruch:", move_count + 1)
+        episode = start_episode
+        end_episode = start_episode + num_episodes
+        while episode < end_episode:
+            batch_size = min(num_actors if actor_learner is not None else parallel_games, end_episode - episode)
+            profiler.start_episode(episode, batch_size)
+            if actor_learner is not None:
+                # Epizody rozgrywane przez aktorów; tu tylko aktualizacje sieci
+                episode_rewards = actor_learner.collect(batch_size)
+                print(f"--- Epizody {episode}-{episode + batch_size - 1} (aktorzy, wersja wag {actor_learner.version}) ---")
+            elif batch_size > 1:
+                # Kilka partii naraz: wsadowe przejścia sieci, trajektorie trafiają do bufora agenta
+                print(f"--- Epizody {episode}-{episode + batch_size - 1} ---")
+                games = play_batched_episodes(agent, env, batch_size, max_moves=max_moves, epsilon=epsilon,
+                                              adjudicator=adjudicator)
+                for game in games:
+                    agent.store_episode(game.states, game.legal_indices, game.actions, game.rewards)
+                for game in games:
+                    print(f"Wynik końcowy: {game.result}, Całkowita nagroda: {game.total_reward}")
+                episode_rewards = [game.total_reward for game in games]
+            else:
+                print(f"--- Epizod {episode} ---")
+                episode_rewards = [play_episode(agent, env, max_moves=max_moves, epsilon=epsilon, adjudicator=adjudicator)]
+            profiler.end_episode(len(episode_rewards))
+            # Limit, z którym rozegrano epizody (przed dostosowaniem do zmierzonego kosztu)
+            engine_limit = limit_scheduler.describe() if limit_scheduler is not None else f"depth={current_depth}"
+            if limit_scheduler is not None:
+                limit_scheduler.end_episode(episode + len(episode_rewards) - 1, len(episode_rewards))
+
+            if position_cache is not None:
+                logger.debug(f"Pamięć podręczna pozycji: {position_cache.stats()}")
+            if eval_cache is not None:
+                logger.debug(f"Pamięć podręczna ocen: {eval_cache.stats()}")
+
+            for total_reward in episode_rewards:
+                logger.info(f"Epizod {episode}: nagroda {total_reward:.2f}, limit silnika {engine_limit}")
+                rewards_history.append(total_reward)
+                avg_reward = np.mean(rewards_history[-window_size:]) if len(rewards_history) >= window_size else np.mean(rewards_history)
+                moving_avg.append(avg_reward)
+
+                if checkpoints is not None:
+                    checkpoints.log_metrics(episode, reward=total_reward, moving_avg=avg_reward,
+                                            epsilon=epsilon, engine_limit=engine_limit)
+
+                # Redukcja epsilonu
+                epsilon = max(final_epsilon, epsilon * decay_rate)
+
+                # Okresowa aktualizacja głębokości Stockfisha (z budżetem robi to harmonogram limitów)
+                if limit_scheduler is None and episode % depth_update_interval == 0:
+                    current_depth += 1
+                    if env is not None:
+                        env.set_depth(current_depth)
+                    logger.info(f"Głębokość Stockfisha zwiększona do {current_depth}")
+
+                # Zapisz najlepszy model na podstawie średniej ruchomej
+                best = avg_reward > max(moving_avg[:-1], default=-float('inf'))
+                if checkpoints is not None and best:
+                    checkpoints.save_best(agent, episode, epsilon=epsilon, stockfish_depth=current_depth)
+                elif best_save_path and best:
+                    agent.save_model(best_save_path, episode=episode, rewards_history=rewards_history)
+                    logger.info(f"Najlepszy model zapisany do {best_save_path}")
+
+                # Okresowy zapis modelu
+                if episode % save_every == 0 and (checkpoints is not None or save_path):
+                    if checkpoints is not None:
+                        path = checkpoints.save(agent, episode, epsilon=epsilon, stockfish_depth=current_depth)
+                        logger.info(f"Checkpoint zapisywany do {path}")
+                    else:
+                        agent.save_model(filepath=save_path, episode=episode, rewards_history=rewards_history)
+                        logger.info(f"Checkpoint zapisany do {save_path}")
+                    if adjudicator is not None and adjudicator.games:
+                        logger.info(f"Rozstrzyganie partii: {adjudicator.summary()}")
+
+                episode += 1
 
-                if env.board.turn == agent.agent_color:
-                    # Ruch agenta
-                    move = agent.select_move(env.board, epsilon=epsilon)
-
-                    if move is None:
-                        print("Brak dostępnych legalnych ruchów dla agenta.")
-                        break
-
-                    previous_board = env.board.copy()
-                    env.board.push(move)
-                    env.update_board(env.board)
-
-                    last_move = move
-                    current_eval = env.get_stockfish_evaluation()
-
-                    # Oblicz nagrodę w trakcie gry
-                    reward = calculate_in_game_reward(
-                        previous_eval=previous_eval,
-                        current_eval=current_eval,
-                        agent_color=agent.agent_color,
-                        previous_board=previous_board,
-                        current_board=env.board.copy(),
-                        last_move=last_move
-                    )
-                    total_reward += reward
-                    agent.remember(reward)
-
-                    # Nauka krokowa po każdym ruchu
-                    agent.learn()
-
-                    previous_eval = current_eval
-                    move_count += 1
-
-                else:
-                    # Ruch przeciwnika (Stockfish)
-                    move = env.get_opponent_move()
-                    if move is None:
-                        print("Brak dostępnych legalnych ruchów dla przeciwnika.")
-                        break
-
-                    env.board.push(move)
-                    env.update_board(env.board)
-                    move_count += 1
-
-            # Nagroda końca gry
-            game_result = env.board.result()
-            end_game_reward = calculate_end_game_reward(agent.agent_color, game_result)
-            total_reward += end_game_reward
-            agent.remember(end_game_reward)
-
-            # Końcowy krok nauki
-            agent.learn()
-
-            print(f"Nagroda końca gry: {end_game_reward}")
-            print(f"Wynik końcowy: {game_result}")
-            print(f"Całkowita nagroda: {total_reward}")
-
-            rewards_history.append(total_reward)
-            avg_reward = np.mean(rewards_history[-window_size:]) if len(rewards_history) >= window_size else np.mean(rewards_history)
-            moving_avg.append(avg_reward)
-
-            # Zapisz najlepszy model na podstawie średniej ruchomej
-            if best_save_path and avg_reward > max(moving_avg[:-1], default=-float('inf')):
-                agent.save_model(best_save_path, episode=episode, rewards_history=rewards_history)
-                logger.info(f"Najlepszy model zapisany do {best_save_path}")
-
-            # Okresowy zapis modelu
-            if save_path and episode % save_every == 0:
-                agent.save_model(filepath=save_path, episode=episode, rewards_history=rewards_history)
-                logger.info(f"Checkpoint zapisany do {save_path}")
-
-            # Redukcja epsilonu
-            epsilon = max(final_epsilon, epsilon * decay_rate)
-
-            # Okresowa aktualizacja głębokości Stockfisha
-            if episode % depth_update_interval == 0:
-                current_depth += 1
-                env.set_depth(current_depth)
-                logger.info(f"Głębokość Stockfisha zwiększona do {current_depth}")
+            if actor_learner is not None:
+                actor_learner.set_epsilon(epsilon)
+                actor_learner.set_depth(current_depth)
 
     except KeyboardInterrupt:
         logger.info("Trening przerwany przez użytkownika.")
     except Exception as e:
         logger.error(f"Wystąpił błąd: {e}")
     finally:
-        env.close()
+        if actor_learner is not None:
+            actor_learner.close()
+        if adjudicator is not None and adjudicator.games:
+            logger.info(f"Rozstrzyganie partii: {adjudicator.summary()}")
+        if checkpoints is not None:
+            checkpoints.close()
+        profiler.close()
+        if env is not None:
+            env.close()
         agent.close_mcts()
         logger.info("ChessEnvironment zamknięte.")
 
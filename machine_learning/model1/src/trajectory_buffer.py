@@ -0,0 +1,157 @@
+# trajectory_buffer.py
+
+import numpy as np
+
+# Liczba kroków przetwarzanych naraz przy dyskontowaniu (ogranicza niedomiar gamma ** t)
+RETURNS_BLOCK = 64
+
+# Wypełnienie kroków spoza polityki (nie są używane przy aktualizacji)
+OFF_POLICY_MASKS = (0,) * 12
+OFF_POLICY_INDICES = np.empty(0, dtype=np.int16)
+
+def discounted_returns(rewards, gamma):
+    """
+    Oblicza zdyskontowane sumy nagród G_t = r_t + gamma * G_{t+1} operacjami wektorowymi.
+
+    Sumy liczone są odwróconą sumą skumulowaną w blokach od końca epizodu, więc potęgi
+    gamma nie schodzą poniżej gamma ** RETURNS_BLOCK niezależnie od długości epizodu.
+    Dla małych gamma blok jest skracany tak, by gamma ** (blok - 1) nie spadło do zera.
+
+    Parametry:
+    - rewards (sekwencja float): Nagrody kolejnych kroków epizodu.
+    - gamma (float): Współczynnik dyskontowania.
+
+    Zwraca:
+    - np.ndarray: Tablica float64 zdyskontowanych nagród o długości len(rewards).
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    if gamma == 0:
+        return rewards.copy()
+    returns = np.empty_like(rewards)
+    block_len = RETURNS_BLOCK
+    if gamma < 1:
+        # Najdłuższy blok, w którym gamma ** (blok - 1) pozostaje powyżej najmniejszej liczby float64
+        block_len = min(RETURNS_BLOCK, max(1, int(np.log(np.finfo(np.float64).tiny) / np.log(gamma))))
+    carry = 0.0
+    for end in range(len(rewards), 0, -block_len):
+        start = max(0, end - block_len)
+        block = rewards[start:end]
+        powers = gamma ** np.arange(len(block), dtype=np.float64)
+        # G_t * gamma^t = suma od t do końca bloku (r_k * gamma^k) + gamma^len * carry
+        tail = np.cumsum((block * powers)[::-1])[::-1] + carry * gamma ** len(block)
+        returns[start:end] = tail / powers
+        carry = returns[start]
+    return returns
+
+class TrajectoryBuffer:
+    def __init__(self):
+        """
+        Inicjalizuje bufor trajektorii przechowujący jedynie zwarte dane kroków.
+
+        Dla każdego kroku zapisywane są maski bierek (12 x uint64), indeksy legalnych akcji
+        i wybrana akcja (-1, jeśli ruch nie pochodzi z polityki sieci, np. losowy lub z MCTS).
+        Log-prawdopodobieństwa są liczone dopiero przy aktualizacji, więc bufor nie
+        przetrzymuje grafów autograd.
+        """
+        self.episodes = []
+        self._start_episode()
+
+    def __len__(self):
+        """
+        Zwraca liczbę zakończonych epizodów w buforze.
+        """
+        return len(self.episodes)
+
+    def record(self, masks, legal_indices, action):
+        """
+        Zapisuje krok bieżącego epizodu.
+
+        Parametry:
+        - masks (sekwencja int): 12 masek bierek (chess_utils.board_masks).
+        - legal_indices (np.ndarray): Indeksy legalnych akcji.
+        - action (int): Indeks wybranej akcji lub -1 dla ruchu spoza polityki.
+        """
+        self._states.append(masks)
+        self._legal_indices.append(legal_indices)
+        self._actions.append(action)
+
+    def record_off_policy(self):
+        """
+        Zapisuje krok spoza polityki sieci (ruch losowy lub z MCTS) bez danych pozycji.
+
+        Krok zajmuje jedynie miejsce w trajektorii, aby kolejne nagrody były poprawnie
+        przypisane; nie wnosi wkładu w gradient.
+        """
+        self.record(OFF_POLICY_MASKS, OFF_POLICY_INDICES, -1)
+
+    def remember(self, reward):
+        """
+        Zapisuje nagrodę bieżącego epizodu.
+
+        Parametry:
+        - reward (float): Otrzymana nagroda.
+        """
+        self._rewards.append(reward)
+
+    def end_episode(self):
+        """
+        Zamyka bieżący epizod i rozpoczyna nowy. Puste epizody są pomijane.
+        """
+        if self._actions or self._rewards:
+            self.add_episode(self._states, self._legal_indices, self._actions, self._rewards)
+        self._start_episode()
+
+    def add_episode(self, states, legal_indices, actions, rewards):
+        """
+        Dodaje kompletny epizod (np. z partii rozgrywanej równolegle).
+
+        Parametry:
+        - states (lista sekwencji int): Maski bierek kolejnych kroków.
+        - legal_indices (lista np.ndarray): Indeksy legalnych akcji kolejnych kroków.
+        - actions (lista int): Wybrane akcje (-1 dla ruchów spoza polityki).
+        - rewards (lista float): Nagrody epizodu (mogą obejmować nagrodę końcową).
+        """
+        self.episodes.append((np.asarray(states, dtype=np.uint64).reshape(-1, 12),
+                              list(legal_indices),
+                              np.asarray(actions, dtype=np.int64),
+                              np.asarray(rewards, dtype=np.float64)))
+
+    def batch(self, gamma):
+        """
+        Łączy zakończone epizody w jedną partię kroków do aktualizacji.
+
+        Nagrody są dyskontowane osobno w każdym epizodzie; k-ty krok otrzymuje k-tą
+        zdyskontowaną nagrodę. Kroki spoza polityki (akcja -1) są pomijane.
+
+        Parametry:
+        - gamma (float): Współczynnik dyskontowania.
+
+        Zwraca:
+        - (np.ndarray, lista np.ndarray, np.ndarray, np.ndarray): Maski [T, 12], indeksy legalnych
+          akcji, akcje [T] oraz zdyskontowane nagrody [T] (float32).
+        """
+        states, legal_indices, actions, returns = [], [], [], []
+        for ep_states, ep_legal, ep_actions, ep_rewards in self.episodes:
+            steps = min(len(ep_actions), len(ep_rewards))
+            keep = np.flatnonzero(ep_actions[:steps] >= 0)
+            states.append(ep_states[keep])
+            legal_indices.extend(ep_legal[i] for i in keep)
+            actions.append(ep_actions[keep])
+            returns.append(discounted_returns(ep_rewards, gamma)[keep])
+
+        if not states:
+            return np.empty((0, 12), dtype=np.uint64), [], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return (np.concatenate(states), legal_indices, np.concatenate(actions),
+                np.concatenate(returns).astype(np.float32))
+
+    def clear(self):
+        """
+        Usuwa zakończone epizody (bieżący epizod pozostaje bez zmian).
+        """
+        self.episodes = []
+
+    def _start_episode(self):
+        self._states = []
+        self._legal_indices = []
+        self._actions = []
+        self._rewards = []
@@ -0,0 +1,79 @@
+import sys
+import os
+import pytest
+import chess
+import numpy as np
+import torch.multiprocessing as mp
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from actor_learner import ActorLearner, episode_to_message, message_to_episode
+from agent import ChessAgent
+from chess_utils import board_masks, legal_move_indices
+from trajectory_buffer import TrajectoryBuffer
+
+def test_message_round_trip():
+    board = chess.Board()
+    buffer = TrajectoryBuffer()
+    for uci in ['e2e4', 'e7e5']:
+        buffer.record(board_masks(board), legal_move_indices(board), 12)
+        buffer.remember(0.5)
+        board.push_uci(uci)
+    buffer.remember(1.0)
+    buffer.end_episode()
+
+    actor_id, version, total_reward, episode = message_to_episode(episode_to_message(3, 7, 2.0, buffer.episodes[0]))
+    assert (actor_id, version, total_reward) == (3, 7, 2.0)
+    for expected, actual in zip(buffer.episodes[0], episode):
+        if isinstance(expected, list):
+            assert all(np.array_equal(a, b) for a, b in zip(expected, actual))
+        else:
+            assert np.array_equal(expected, actual)
+            assert expected.dtype == actual.dtype
+
+def test_actors_deliver_episodes_and_stop():
+    # Bez Stockfisha partie kończą się po pierwszym ruchu agenta
+    agent = ChessAgent(update_every=1)
+    actor_learner = ActorLearner(agent, num_actors=2, max_moves=4, max_staleness=0)
+    actor_learner.set_epsilon(0.0)
+    actor_learner.start()
+    try:
+        rewards = actor_learner.collect(3)
+    finally:
+        actor_learner.close(timeout=20.0)
+    assert len(rewards) == 3
+    assert actor_learner.version == 3
+    assert not any(actor.is_alive() for actor in actor_learner._actors)
+
+def test_actor_failure_is_reported_to_learner():
+    agent = ChessAgent(update_every=1)
+    actor_learner = ActorLearner(agent, num_actors=1, stockfish_path=os.path.join(current_dir, 'brak_silnika'))
+    actor_learner.start()
+    try:
+        with pytest.raises(RuntimeError, match='Aktor 0 zakończony błędem'):
+            actor_learner.collect(1)
+    finally:
+        actor_learner.close(timeout=20.0)
+    assert actor_learner._actors[0].exitcode == 1
+
+def test_learner_detects_actors_exiting_without_message():
+    agent = ChessAgent(update_every=1)
+    # Aktor, który nie działa, a jego sygnał zakończenia nie dotarł do kolejki
+    actor_learner = ActorLearner(agent, num_actors=1)
+    actor_learner._running = 1
+    with pytest.raises(RuntimeError, match='Wszyscy aktorzy zakończyli pracę'):
+        actor_learner.collect(1)
+
+    # Aktor zakończony niezerowym kodem wyjścia bez wiadomości ActorFailure
+    actor_learner = ActorLearner(agent, num_actors=1)
+    actor_learner._actors = [mp.get_context('spawn').Process(target=sys.exit, args=(3,), daemon=True)]
+    actor_learner.start()
+    try:
+        with pytest.raises(RuntimeError, match='Aktor 0 zakończony błędem \\(kod wyjścia 3\\)'):
+            actor_learner.collect(1)
+    finally:
+        actor_learner.close(timeout=20.0)
@@ -0,0 +1,74 @@
+import sys
+import os
+import pytest
+import chess
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from adjudication import Adjudicator, MATE_EVAL
+from agent import ChessAgent
+from environment import ChessEnvironment
+from training import play_episode
+
+def board_after(plies):
+    board = chess.Board()
+    for move in ['g1f3', 'g8f6', 'f3g1', 'f6g8'] * (plies // 4 + 1):
+        if len(board.move_stack) == plies:
+            break
+        board.push_uci(move)
+    return board
+
+def test_win_after_consecutive_evals():
+    adjudicator = Adjudicator(win_threshold=500, win_evals=3)
+    game = adjudicator.start_game(chess.WHITE)
+    board = board_after(1)  # Czarne na ruchu: ocena -600 to +600 dla białego agenta
+    assert adjudicator.update(game, board, -600) is None
+    assert adjudicator.update(game, board, 0) is None  # Przerwana seria
+    assert adjudicator.update(game, board, -600) is None
+    assert adjudicator.update(game, board, -600) is None
+    assert adjudicator.update(game, board, -600) == '1-0'
+    assert game.reason == 'przewaga'
+
+def test_mate_resigns_immediately():
+    adjudicator = Adjudicator()
+    game = adjudicator.start_game(chess.BLACK)
+    board = board_after(2)  # Białe na ruchu i mają mata
+    assert adjudicator.update(game, board, MATE_EVAL) == '1-0'
+    assert game.reason == 'mat'
+
+def test_draw_only_after_move_count():
+    adjudicator = Adjudicator(win_threshold=None, draw_threshold=20, draw_evals=2, draw_after=8)
+    game = adjudicator.start_game(chess.WHITE)
+    assert adjudicator.update(game, board_after(4), 5) is None
+    assert adjudicator.update(game, board_after(6), 5) is None
+    assert adjudicator.update(game, board_after(8), -10) is None
+    assert adjudicator.update(game, board_after(10), 0) == '1/2-1/2'
+
+def test_stats_report_savings():
+    adjudicator = Adjudicator(max_moves=100)
+    game = adjudicator.start_game(chess.WHITE)
+    adjudicator.update(game, board_after(2), MATE_EVAL)
+    adjudicator.end_game(game, plies=20, seconds=2.0)
+    adjudicator.end_game(adjudicator.start_game(chess.WHITE), plies=100, seconds=10.0)
+    stats = adjudicator.stats()
+    assert stats['adjudicated'] == {'mat': 1}
+    assert stats['plies_saved'] == 80
+    assert stats['mean_plies'] == 60
+    assert stats['seconds_saved'] == pytest.approx(80 * 12.0 / 120)
+
+def test_play_episode_uses_adjudicated_result():
+    agent = ChessAgent(update_every=float('inf'))
+    env = ChessEnvironment(stockfish_path='lite:depth_cap=1')
+    adjudicator = Adjudicator(win_threshold=1, win_evals=1, max_moves=50)
+    try:
+        play_episode(agent, env, max_moves=50, epsilon=1.0, verbose=False, adjudicator=adjudicator)
+    finally:
+        env.close()
+    rewards = agent.buffer.episodes[0][3]
+    assert len(env.board.move_stack) < 50
+    assert rewards[-1] in (1000.0, -1000.0)
+    assert sum(adjudicator.stats()['adjudicated'].values()) == 1
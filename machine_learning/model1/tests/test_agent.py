@@ -0,0 +1,125 @@
+import sys
+import os
+import pytest
+import chess
+import torch
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from agent import ChessAgent
+from chess_utils import encode_batch, get_action_mask_batch, move_to_index
+
+def _boards():
+    board = chess.Board()
+    boards = [board.copy()]
+    for uci in ['e2e4', 'e7e5', 'g1f3']:
+        board.push_uci(uci)
+        boards.append(board.copy())
+    return boards
+
+def test_policy_logits_matches_eval_forward():
+    agent = ChessAgent()
+    states = encode_batch(_boards())
+    logits = agent.policy_logits(states)
+    agent.model.eval()
+    with torch.no_grad():
+        expected, _ = agent.model(states, None)
+    assert logits.shape == (4, 4096)
+    assert torch.allclose(logits, expected.view(4, -1))
+
+def test_trace_backend_shares_weights_and_batch_size():
+    agent = ChessAgent(inference_backend='trace')
+    states = encode_batch(_boards())
+    agent.policy_logits(states[:1])
+    # Zmiana wag po utworzeniu grafu musi być widoczna w ścieżce inferencji
+    with torch.no_grad():
+        agent.model.fc2.bias.add_(1.0)
+    eager = ChessAgent()
+    eager.model.load_state_dict(agent.model.state_dict())
+    assert torch.allclose(agent.policy_logits(states), eager.policy_logits(states), atol=1e-5)
+
+def test_failed_inference_build_falls_back_to_eager(monkeypatch, caplog):
+    agent = ChessAgent(inference_backend='trace')
+    def failing_trace(*args, **kwargs):
+        raise RuntimeError("trace niedostępny")
+    monkeypatch.setattr(torch.jit, 'trace', failing_trace)
+    states = encode_batch(_boards())
+    with caplog.at_level('WARNING', logger='agent'):
+        logits = agent.policy_logits(states)
+    assert 'trace niedostępny' in caplog.text
+    eager = ChessAgent()
+    eager.model.load_state_dict(agent.model.state_dict())
+    assert torch.allclose(logits, eager.policy_logits(states), atol=1e-5)
+    assert agent.select_move(chess.Board(), epsilon=0.0) in chess.Board().legal_moves
+
+def test_eager_forward_errors_propagate():
+    agent = ChessAgent()
+    # Błędny kształt wejścia w trybie eager nie jest maskowany przejściem na tryb eager
+    with pytest.raises(RuntimeError):
+        agent.policy_logits(torch.zeros(1, 5, 8, 8))
+
+def test_select_move_random_skips_encoding():
+    agent = ChessAgent()
+    board = chess.Board()
+    move = agent.select_move(board, epsilon=1.0)
+    assert move in board.legal_moves
+    agent.buffer.remember(0.0)
+    agent.buffer.end_episode()
+    states, legal_indices, actions, returns = agent.buffer.batch(agent.gamma)
+    assert len(actions) == 0  # Ruch losowy nie jest używany przy aktualizacji
+
+def test_select_move_policy_records_step():
+    agent = ChessAgent()
+    board = chess.Board()
+    move = agent.select_move(board, epsilon=0.0)
+    assert move in board.legal_moves
+    agent.buffer.remember(1.0)
+    agent.buffer.end_episode()
+    states, legal_indices, actions, returns = agent.buffer.batch(agent.gamma)
+    assert len(actions) == 1
+    assert actions[0] == move_to_index(move)
+
+def test_learn_mixed_precision_keeps_float32_weights():
+    agent = ChessAgent(mixed_precision=True)
+    before = agent.model.fc2.weight.detach().clone()
+    board = chess.Board()
+    agent.select_move(board, epsilon=0.0)
+    agent.buffer.remember(1.0)
+    agent.finish_episode()
+    assert agent.model.fc2.weight.dtype == torch.float32
+    assert not torch.equal(agent.model.fc2.weight, before)
+    assert all(value.dtype == torch.float32 for value in agent.model.state_dict().values() if value.is_floating_point())
+
+def test_learn_recomputes_sampling_log_probs():
+    torch.manual_seed(0)
+    agent = ChessAgent(update_every=float('inf'))
+    boards = _boards()
+    sampled = []
+    policy_logits = agent.policy_logits
+    def record(states):
+        logits = policy_logits(states)
+        sampled.append(torch.log_softmax(logits.masked_fill(~get_action_mask_batch(boards[len(sampled):len(sampled) + 1]), -1e9), dim=-1))
+        return logits
+    agent.policy_logits = record
+    actions = [move_to_index(agent.select_move(board, epsilon=0.0)) for board in boards]
+    for _ in boards:
+        agent.buffer.remember(1.0)
+    agent.buffer.end_episode()
+    expected = torch.stack([log_probs[0, action] for log_probs, action in zip(sampled, actions)])
+
+    # learn() przelicza log-prawdopodobieństwa tej samej polityki (BatchNorm ze statystykami bieżącymi)
+    recomputed = []
+    action_log_probs = agent.action_log_probs
+    def capture(*args):
+        log_probs = action_log_probs(*args)
+        recomputed.append(log_probs.detach())
+        return log_probs
+    agent.action_log_probs = capture
+    running_mean = agent.model.bn1.running_mean.clone()
+    agent.learn()
+    assert torch.allclose(torch.cat(recomputed), expected, atol=1e-4)
+    assert torch.equal(agent.model.bn1.running_mean, running_mean)
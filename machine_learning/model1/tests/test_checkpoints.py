@@ -0,0 +1,89 @@
+import sys
+import os
+import pytest
+import torch
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from agent import ChessAgent
+from checkpoints import CheckpointManager, snapshot
+
+def weights(agent):
+    return {key: value.clone() for key, value in agent.model.state_dict().items()}
+
+def perturb(agent):
+    with torch.no_grad():
+        for parameter in agent.model.parameters():
+            parameter.add_(torch.randn_like(parameter))
+
+def test_snapshot_is_independent_copy():
+    tensor = torch.zeros(3)
+    copy = snapshot({'a': [tensor], 'b': 1})
+    tensor.add_(1)
+    assert torch.equal(copy['a'][0], torch.zeros(3))
+    assert copy['b'] == 1
+
+def test_rotation_keeps_last_and_best(tmp_path):
+    agent = ChessAgent()
+    with CheckpointManager(str(tmp_path), keep_last=2) as checkpoints:
+        checkpoints.save_best(agent, 1)
+        for episode in range(1, 6):
+            checkpoints.save(agent, episode)
+        checkpoints.wait()
+        names = sorted(os.listdir(tmp_path))
+    assert names == ['best.pth', 'checkpoint_00000004.pth', 'checkpoint_00000005.pth', 'metrics.jsonl']
+
+def test_keep_last_must_keep_a_checkpoint(tmp_path):
+    with pytest.raises(ValueError):
+        CheckpointManager(str(tmp_path), keep_last=0)
+    with CheckpointManager(str(tmp_path), keep_last=1) as checkpoints:
+        agent = ChessAgent()
+        for episode in (1, 2):
+            checkpoints.save(agent, episode)
+        checkpoints.wait()
+        assert [os.path.basename(path) for path in checkpoints.checkpoints()] == ['checkpoint_00000002.pth']
+
+def test_resume_restores_saved_weights(tmp_path):
+    agent = ChessAgent()
+    with CheckpointManager(str(tmp_path)) as checkpoints:
+        checkpoints.save(agent, 7, epsilon=0.343, stockfish_depth=6)
+        saved = weights(agent)
+        # Zmiana wag po zleceniu zapisu nie trafia do punktu kontrolnego
+        perturb(agent)
+    restored = ChessAgent()
+    with CheckpointManager(str(tmp_path)) as checkpoints:
+        assert checkpoints.latest().endswith('checkpoint_00000007.pth')
+        checkpoint = checkpoints.load(restored, mmap=True)
+    assert checkpoint['episode'] == 7
+    assert checkpoint['epsilon'] == 0.343
+    assert checkpoint['stockfish_depth'] == 6
+    for key, value in weights(restored).items():
+        assert torch.equal(value, saved[key])
+
+def test_metrics_append_and_resume_view(tmp_path):
+    with CheckpointManager(str(tmp_path)) as checkpoints:
+        for episode in range(1, 4):
+            checkpoints.log_metrics(episode, reward=float(episode), engine_limit='depth=5')
+    # Wznowienie od epizodu 2: epizod 3 rozegrany ponownie nadpisuje stary wpis
+    with CheckpointManager(str(tmp_path)) as checkpoints:
+        checkpoints.log_metrics(3, reward=30.0)
+        with open(os.path.join(tmp_path, 'metrics.jsonl'), 'a') as f:
+            f.write('{"episode": 4, "rew')  # Przerwany zapis
+        records = checkpoints.read_metrics()
+        assert [record['reward'] for record in records] == [1.0, 2.0, 30.0]
+        assert [record['episode'] for record in checkpoints.read_metrics(up_to_episode=2)] == [1, 2]
+
+def test_write_errors_are_reported(tmp_path, monkeypatch):
+    checkpoints = CheckpointManager(str(tmp_path))
+    def fail(state, path, rotate):
+        raise OSError('dysk pełny')
+    monkeypatch.setattr(checkpoints, '_write', fail)
+    checkpoints.save(ChessAgent(), 1)
+    with pytest.raises(OSError):
+        checkpoints.wait()
+    checkpoints.close()
+    assert not os.path.exists(os.path.join(tmp_path, 'checkpoint_00000001.pth'))
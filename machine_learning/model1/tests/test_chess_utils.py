@@ -16,7 +16,11 @@ from chess_utils import (
     generate_bitboards,
     board_to_tensor,
     index_to_move,
-    get_action_mask
+    get_action_mask,
+    encode_batch,
+    legal_move_indices,
+    indices_to_mask,
+    get_action_mask_batch
 )
 
 @pytest.fixture
@@ -340,3 +344,51 @@ def test_promotion_moves():
         assert bitboards[channel, row, col] == 1.0
 
 
+
+def _reference_board_to_tensor(board):
+    # Kodowanie pole po polu, względem którego sprawdzamy wersję wektorową
+    symbols = 'PNBRQKpnbrqk'
+    tensor = torch.zeros(12, 8, 8)
+    for square, piece in board.piece_map().items():
+        tensor[symbols.index(piece.symbol()), 7 - square // 8, square % 8] = 1.0
+    return tensor
+
+def test_encode_batch_matches_per_board(generate_en_passant_board, custom_board):
+    boards = [chess.Board(), chess.Board(None), custom_board, generate_en_passant_board,
+              chess.Board('r3k2r/pPpp1ppp/8/8/8/8/PpPP1PPP/R3K2R w KQkq - 0 1')]
+    batch = encode_batch(boards)
+    assert batch.shape == (len(boards), 12, 8, 8)
+    assert batch.dtype == torch.float32
+    for board, planes in zip(boards, batch):
+        assert torch.equal(planes, _reference_board_to_tensor(board))
+        assert torch.equal(board_to_tensor(board), planes)
+
+def test_encode_batch_fills_buffer_in_place(initial_board):
+    out = torch.full((2, 12, 8, 8), 7.0)
+    result = encode_batch([initial_board, chess.Board(None)], out=out)
+    assert result is out
+    assert torch.equal(out[0], _reference_board_to_tensor(initial_board))
+    assert torch.all(out[1] == 0.0)
+
+    with pytest.raises(ValueError):
+        encode_batch([initial_board], out=out)
+
+def test_legal_move_indices_match_dense_mask(generate_en_passant_board):
+    board = chess.Board('8/P7/8/8/8/8/8/k6K w - - 0 1')  # Promocje dzielą jeden indeks
+    for position in (chess.Board(), generate_en_passant_board, board, chess.Board(None)):
+        indices = legal_move_indices(position)
+        assert indices.dtype == np.int16
+        expected = sorted({move.from_square * 64 + move.to_square for move in position.legal_moves})
+        assert indices.tolist() == expected
+        assert np.flatnonzero(indices_to_mask(indices)).tolist() == expected
+
+def test_get_action_mask_batch(initial_board, custom_board):
+    boards = [initial_board, chess.Board(None), custom_board]
+    mask = get_action_mask_batch(boards)
+    assert mask.shape == (3, 4096)
+    assert mask.dtype == torch.bool
+    for row, board in zip(mask, boards):
+        assert torch.equal(row, torch.from_numpy(indices_to_mask(legal_move_indices(board))))
+
+    from_indices = get_action_mask_batch(indices=[legal_move_indices(board) for board in boards])
+    assert torch.equal(mask, from_indices)
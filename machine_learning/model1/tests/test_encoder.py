@@ -0,0 +1,55 @@
+import sys
+import os
+import random
+import pytest
+import chess
+import torch
+import numpy as np
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from encoder import IncrementalEncoder
+from chess_utils import board_to_tensor, generate_bitboards
+
+
+def _assert_matches_full_encoding(encoder):
+    assert torch.equal(encoder.tensor(), board_to_tensor(encoder.board))
+    assert np.array_equal(encoder.bitboards(), generate_bitboards(encoder.board))
+
+def test_random_games_match_full_encoding():
+    rng = random.Random(0)
+    for _ in range(20):
+        encoder = IncrementalEncoder(chess.Board(), debug=True)
+        for _ in range(120):
+            moves = list(encoder.board.legal_moves)
+            if not moves:
+                break
+            encoder.push(rng.choice(moves))
+        # Cofnij część partii i sprawdź stan po cofnięciu
+        for _ in range(rng.randrange(len(encoder.board.move_stack) + 1)):
+            encoder.pop()
+        _assert_matches_full_encoding(encoder)
+
+@pytest.mark.parametrize("fen, uci", [
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1g1"),  # Roszada krótka
+    ("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1", "e8c8"),  # Roszada długa
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2", "e5d6"),     # Bicie w przelocie
+    ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8n"),     # Promocja z biciem
+    ("4k3/8/8/8/8/8/4r3/R3K3 w Q - 0 1", "a1a8"),      # Odsłonięcie linii ataku
+])
+def test_special_moves_push_pop(fen, uci):
+    board = chess.Board(fen)
+    encoder = IncrementalEncoder(board, debug=True)
+    before = encoder.tensor().clone()
+
+    encoder.push(chess.Move.from_uci(uci))
+    _assert_matches_full_encoding(encoder)
+
+    assert encoder.pop() == chess.Move.from_uci(uci)
+    assert board.fen() == fen
+    assert torch.equal(encoder.tensor(), before)
+    _assert_matches_full_encoding(encoder)
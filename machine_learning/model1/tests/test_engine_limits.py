@@ -0,0 +1,76 @@
+import sys
+import os
+import pytest
+import chess
+import chess.engine
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from engine_limits import EngineLimitScheduler
+from environment import ChessEnvironment
+
+def play_episode(scheduler, episode, cost_ms, searches=10):
+    for _ in range(searches):
+        scheduler.record(cost_ms / 1000)
+    return scheduler.end_episode(episode)
+
+def test_requires_budget():
+    with pytest.raises(ValueError):
+        EngineLimitScheduler()
+
+def test_depth_lowered_when_over_budget():
+    scheduler = EngineLimitScheduler(budget_ms=10, start_depth=5)
+    assert play_episode(scheduler, 1, cost_ms=50)
+    assert scheduler.depth == 4
+    assert scheduler.limit() == chess.engine.Limit(depth=4)
+
+def test_depth_raised_only_to_target_within_budget():
+    scheduler = EngineLimitScheduler(budget_ms=100, start_depth=2, raise_every=10)
+    # Docelowa głębokość to jeszcze 2: tani koszt nie podnosi limitu
+    assert not play_episode(scheduler, 1, cost_ms=1)
+    # Po 10 epizodach cel rośnie do 3, a przewidywany koszt mieści się w budżecie
+    assert play_episode(scheduler, 10, cost_ms=1)
+    assert scheduler.depth == 3
+    # Głębokość 3 jest zbyt droga: powrót do 2 mimo celu 3
+    assert play_episode(scheduler, 11, cost_ms=500)
+    assert scheduler.depth == 2
+    # Zmierzony koszt głębokości 3 blokuje ponowny wzrost
+    assert not play_episode(scheduler, 12, cost_ms=1)
+    assert scheduler.depth == 2
+
+def test_nodes_scaled_to_budget():
+    scheduler = EngineLimitScheduler(mode='nodes', budget_ms=10, start_nodes=8000, nodes_step=1000)
+    assert play_episode(scheduler, 1, cost_ms=20)
+    assert scheduler.nodes == 4000
+    assert scheduler.limit() == chess.engine.Limit(nodes=4000)
+
+def test_episode_budget_uses_total_cost():
+    scheduler = EngineLimitScheduler(budget_ms=100, per='episode', start_depth=3)
+    # 10 wyszukiwań po 20 ms to 200 ms na epizod
+    assert play_episode(scheduler, 1, cost_ms=20)
+    assert scheduler.depth == 2
+    assert scheduler.history[0][2] == pytest.approx(200)
+
+def test_environment_reports_search_cost():
+    scheduler = EngineLimitScheduler(mode='nodes', budget_nodes=200, start_nodes=1000, min_nodes=100, nodes_step=100)
+    env = ChessEnvironment(stockfish_path='lite', limit_scheduler=scheduler)
+    try:
+        board = chess.Board()
+        env.get_stockfish_evaluation(board)
+        env.opponent_step(board)
+        assert scheduler._episode_searches == 2
+        assert scheduler._episode_nodes > 0
+        assert scheduler.end_episode(1)
+        assert scheduler.nodes < 1000
+    finally:
+        env.close()
+
+def test_history_keeps_last_episodes():
+    scheduler = EngineLimitScheduler(budget_ms=100, history_size=3)
+    for episode in range(1, 11):
+        play_episode(scheduler, episode, cost_ms=100)
+    assert [record[0] for record in scheduler.history] == [8, 9, 10]
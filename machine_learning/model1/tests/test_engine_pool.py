@@ -0,0 +1,65 @@
+import sys
+import os
+import signal
+import time
+import chess
+import chess.engine
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from engine_pool import EnginePool
+from environment import ChessEnvironment
+
+# Minimalny silnik UCI w Pythonie zamiast Stockfisha
+STUB_ENGINE = [sys.executable, os.path.join(current_dir, 'uci_stub.py')]
+
+def positions():
+    boards = [chess.Board()]
+    for uci in ('e2e4', 'd7d5', 'e4d5', 'd8d5'):
+        board = boards[-1].copy()
+        board.push_uci(uci)
+        boards.append(board)
+    return boards
+
+def test_analyse_many_keeps_order():
+    boards = positions()
+    limit = chess.engine.Limit(depth=1)
+    with EnginePool(STUB_ENGINE, size=2) as pool:
+        single = [pool.analyse(board, limit)["score"] for board in boards]
+        batch = [info["score"] for info in pool.analyse_many(boards, limit)]
+    assert batch == single
+    # Po e4xd5 białe mają pionka przewagi, a na ruchu są czarne
+    assert single[3].relative == chess.engine.Cp(-100)
+
+def test_play_many_returns_legal_moves():
+    boards = positions()
+    with EnginePool(STUB_ENGINE, size=3) as pool:
+        results = pool.play_many(boards, chess.engine.Limit(depth=1))
+    assert [result.move in board.legal_moves for board, result in zip(boards, results)] == [True] * len(boards)
+
+def test_restart_after_engine_killed():
+    board = chess.Board()
+    with EnginePool(STUB_ENGINE, size=1) as pool:
+        os.kill(pool._engines[0].transport.get_pid(), signal.SIGKILL)
+        time.sleep(0.2)
+        info = pool.analyse(board, chess.engine.Limit(depth=1))
+        assert info["score"].relative == chess.engine.Cp(0)
+        assert pool.restarts == 1
+
+def test_timeout_returns_none_in_batch():
+    with EnginePool(STUB_ENGINE, size=1, timeout=0.2, options={"Delay": 2000}, max_retries=0) as pool:
+        results = pool.analyse_many([chess.Board()], chess.engine.Limit(depth=1))
+    assert results == [None]
+
+def test_environment_batch_matches_single_calls():
+    boards = positions()
+    env = ChessEnvironment(stockfish_path=STUB_ENGINE, stockfish_engines=2)
+    try:
+        assert env.get_stockfish_evaluations(boards) == [env.get_stockfish_evaluation(board) for board in boards]
+        assert env.get_opponent_moves(boards) == [env.get_opponent_move(board) for board in boards]
+    finally:
+        env.close()
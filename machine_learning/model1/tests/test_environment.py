@@ -0,0 +1,75 @@
+import sys
+import os
+import random
+import pytest
+import chess
+import chess.engine
+import numpy as np
+import torch
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from agent import ChessAgent
+from environment import ChessEnvironment, OpponentStep
+from training import play_episode
+
+# Minimalny silnik UCI w Pythonie zamiast Stockfisha
+STUB_ENGINE = [sys.executable, os.path.join(current_dir, 'uci_stub.py')]
+
+class CountingEngine:
+    # Opakowanie silnika liczące wyszukiwania
+    def __init__(self, engine):
+        self.engine = engine
+        self.searches = 0
+
+    def analyse(self, board, limit, **kwargs):
+        self.searches += 1
+        return self.engine.analyse(board, limit, **kwargs)
+
+    def play(self, board, limit, **kwargs):
+        self.searches += 1
+        return self.engine.play(board, limit, **kwargs)
+
+    def quit(self):
+        self.engine.quit()
+
+class TwoSearchEnvironment(ChessEnvironment):
+    # Dawny przebieg: osobna ocena pozycji i osobne wyszukiwanie ruchu przeciwnika
+    def opponent_step(self, board=None):
+        return OpponentStep(None, self.get_stockfish_evaluation(board), [])
+
+def run_episode(env_class, agent_color, seed=0):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    agent = ChessAgent(agent_color=agent_color, update_every=float('inf'))
+    env = env_class(agent_color=agent_color, stockfish_path=STUB_ENGINE)
+    env.stockfish = CountingEngine(env.stockfish)
+    try:
+        play_episode(agent, env, max_moves=30, epsilon=0.5, verbose=False)
+        return list(agent.buffer.episodes[0][3]), env.stockfish.searches
+    finally:
+        env.close()
+
+def test_opponent_step_matches_separate_searches():
+    env = ChessEnvironment(stockfish_path=STUB_ENGINE)
+    board = chess.Board()
+    board.push_uci('e2e4')
+    try:
+        step = env.opponent_step(board)
+        assert step.score == env.get_stockfish_evaluation(board)
+        assert step.move == env.get_opponent_move(board)
+        assert step.pv[0] == step.move
+    finally:
+        env.close()
+
+@pytest.mark.parametrize('agent_color', [chess.WHITE, chess.BLACK])
+def test_single_search_keeps_rewards(agent_color):
+    rewards, searches = run_episode(ChessEnvironment, agent_color)
+    legacy_rewards, legacy_searches = run_episode(TwoSearchEnvironment, agent_color)
+    assert rewards == legacy_rewards
+    assert searches < legacy_searches
@@ -0,0 +1,98 @@
+import sys
+import os
+import pytest
+import chess
+import chess.engine
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from eval_cache import CachedEngine, EvalCache, limit_key, LIMIT_DEPTH, LIMIT_NODES
+
+class CountingEngine:
+    # Silnik testowy: ocena zależy od głębokości, liczy wywołania analyse()
+    def __init__(self):
+        self.calls = 0
+
+    def analyse(self, board, limit, **kwargs):
+        self.calls += 1
+        return {"score": chess.engine.PovScore(chess.engine.Cp(10 * (limit.depth or 1)), board.turn)}
+
+    def quit(self):
+        return "quit"
+
+def test_limit_key():
+    assert limit_key(chess.engine.Limit(depth=5)) == (LIMIT_DEPTH, 5)
+    assert limit_key(chess.engine.Limit(nodes=1000)) == (LIMIT_NODES, 1000)
+    assert limit_key(chess.engine.Limit(time=0.1)) is None
+    assert limit_key(chess.engine.Limit(depth=5, nodes=10)) is None
+
+def test_memory_hit_and_stats():
+    cache = EvalCache()
+    engine = CountingEngine()
+    board = chess.Board()
+    first = cache.analyse(engine, board, chess.engine.Limit(depth=5))
+    second = cache.analyse(engine, board, chess.engine.Limit(depth=5))
+    assert engine.calls == 1
+    assert second["score"] == first["score"]
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['misses']) == (1, 1)
+    assert stats['hit_rate'] == pytest.approx(0.5)
+
+def test_deeper_answers_shallower():
+    cache = EvalCache()
+    engine = CountingEngine()
+    board = chess.Board()
+    cache.analyse(engine, board, chess.engine.Limit(depth=8))
+    info = cache.analyse(engine, board, chess.engine.Limit(depth=5))
+    assert engine.calls == 1
+    assert info["depth"] == 8
+    # Płytszy wynik nie odpowiada na głębsze zapytanie i nie nadpisuje głębszego
+    cache.analyse(engine, board, chess.engine.Limit(depth=10))
+    assert engine.calls == 2
+    cache.put(board, chess.engine.Limit(depth=3), chess.engine.PovScore(chess.engine.Cp(0), board.turn))
+    assert cache.get(board, chess.engine.Limit(depth=9))["depth"] == 10
+
+    exact = EvalCache(allow_deeper=False)
+    exact.put(board, chess.engine.Limit(depth=8), chess.engine.PovScore(chess.engine.Cp(5), board.turn))
+    assert exact.get(board, chess.engine.Limit(depth=5)) is None
+
+def test_disk_store_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'evals.sqlite')
+    board = chess.Board()
+    board.push_uci('e2e4')
+    writer = EvalCache(path)
+    writer.put(board, chess.engine.Limit(depth=6), chess.engine.PovScore(chess.engine.Mate(-3), chess.WHITE))
+
+    reader = EvalCache(path)
+    info = reader.get(board, chess.engine.Limit(depth=6))
+    assert info["score"].white() == chess.engine.Mate(-3)
+    assert reader.stats()['disk_hits'] == 1
+    # Kolejne zapytanie obsługuje warstwa w pamięci
+    reader.get(board, chess.engine.Limit(depth=6))
+    assert reader.stats()['memory_hits'] == 1
+    assert reader.get(chess.Board(), chess.engine.Limit(depth=6)) is None
+    writer.close()
+    reader.close()
+
+def test_lru_eviction():
+    cache = EvalCache(max_memory_entries=2)
+    board = chess.Board()
+    for uci in ['e2e4', 'e7e5', 'g1f3']:
+        board.push_uci(uci)
+        cache.put(board, chess.engine.Limit(depth=5), chess.engine.PovScore(chess.engine.Cp(1), board.turn))
+    assert cache.stats()['entries'] == 2
+
+def test_cached_engine_wraps_engine():
+    engine = CountingEngine()
+    cached = CachedEngine(engine, EvalCache())
+    board = chess.Board()
+    cached.analyse(board=board, limit=chess.engine.Limit(depth=5))
+    cached.analyse(board=board, limit=chess.engine.Limit(depth=5))
+    assert engine.calls == 1
+    cached.analyse(board, chess.engine.Limit(depth=5), multipv=2)
+    assert engine.calls == 2
+    assert cached.quit() == "quit"
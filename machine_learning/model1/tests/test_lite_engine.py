@@ -0,0 +1,82 @@
+import sys
+import os
+import pytest
+import chess
+import chess.engine
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from lite_engine import LiteEngine, engine_command, parse_spec
+from environment import ChessEnvironment
+from training import train_agent
+
+MIDDLEGAME = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+
+def test_finds_mate_in_one():
+    engine = LiteEngine()
+    board = chess.Board("6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1")
+    info = engine.analyse(board, chess.engine.Limit(depth=3))
+    assert info["pv"][0] == chess.Move.from_uci("a1a8")
+    assert info["score"].relative == chess.engine.Mate(1)
+
+def test_checkmated_position():
+    engine = LiteEngine()
+    board = chess.Board("R5k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1")
+    info = engine.analyse(board, chess.engine.Limit(depth=2))
+    assert info["pv"] == []
+    assert info["score"].relative.mate() == 0
+
+def test_material_evaluation():
+    engine = LiteEngine(evaluation='material')
+    board = chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")
+    assert engine.evaluate(board) == -900
+
+def test_deterministic_for_seed_and_node_limit():
+    board = chess.Board(MIDDLEGAME)
+    limit = chess.engine.Limit(nodes=500)
+    first = LiteEngine(seed=3).analyse(board, limit)
+    second = LiteEngine(seed=3).analyse(board, limit)
+    assert (first["pv"], first["score"], first["nodes"]) == (second["pv"], second["score"], second["nodes"])
+    assert first["depth"] >= 1
+
+def test_depth_cap():
+    info = LiteEngine(depth_cap=1).analyse(chess.Board(), chess.engine.Limit(depth=5))
+    assert info["depth"] == 1
+
+def test_parse_spec():
+    assert parse_spec('lite') == {}
+    assert parse_spec('lite:depth_cap=2,evaluation=material,quiescence=false') == \
+        {'depth_cap': 2, 'evaluation': 'material', 'quiescence': False}
+    assert parse_spec('/usr/bin/stockfish') is None
+    with pytest.raises(ValueError):
+        parse_spec('lite:threads=4')
+
+def test_uci_subprocess_matches_in_process():
+    board = chess.Board(MIDDLEGAME)
+    limit = chess.engine.Limit(depth=2)
+    expected = LiteEngine(seed=1, evaluation='material').analyse(board, limit)
+    with chess.engine.SimpleEngine.popen_uci(engine_command('lite:seed=1,evaluation=material')) as engine:
+        info = engine.analyse(board, limit)
+        result = engine.play(board, limit)
+    assert info["score"] == expected["score"]
+    assert info["pv"] == expected["pv"]
+    assert result.move == expected["pv"][0]
+
+def test_environment_with_lite_engine():
+    env = ChessEnvironment(stockfish_path='lite:depth_cap=1')
+    try:
+        assert env.get_stockfish_evaluation(chess.Board()) is not None
+        assert env.get_opponent_move(chess.Board()) in chess.Board().legal_moves
+    finally:
+        env.close()
+
+def test_train_agent_smoke(tmp_path):
+    rewards, moving_avg = train_agent(num_episodes=2, max_moves=10, device='cpu',
+                                      save_path=str(tmp_path / 'agent.pth'),
+                                      best_save_path=str(tmp_path / 'best_agent.pth'),
+                                      stockfish_path='lite:depth_cap=1', position_cache_bytes=0)
+    assert len(rewards) == 2
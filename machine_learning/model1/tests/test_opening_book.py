@@ -0,0 +1,97 @@
+import sys
+import os
+import pytest
+import chess
+import chess.polyglot
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from agent import ChessAgent
+from openings.book import OpeningBook, build_book
+
+LINES = ['1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O', '1. e4 e5 2. Nf3', '1. e4 c5',
+         '1. d4 d5 2. Nc3 Nc6 3. Bf4 Bf5 4. Qd2 Qd7 5. O-O-O', '1. Nf3', '1. e5', '']
+PROMOTION_FEN = '8/4P1k1/8/8/8/8/6K1/8 w - - 0 1'
+
+def board_after(sans):
+    board = chess.Board()
+    for san in sans:
+        board.push_san(san)
+    return board
+
+def write_book(tmp_path):
+    with open(tmp_path / 'a.tsv', 'w') as f:
+        f.write('eco\tname\tpgn\n')
+        f.writelines(f"A00\tDebiut\t{line}\n" for line in LINES)
+    with open(tmp_path / 'promocja.pgn', 'w') as f:
+        f.write(f'[FEN "{PROMOTION_FEN}"]\n[SetUp "1"]\n\n1. e8=N *\n\n')
+    path = str(tmp_path / 'book.bin')
+    return build_book([str(tmp_path / 'a.tsv'), str(tmp_path / 'promocja.pgn')], path), path
+
+def test_book_counts_lines_and_round_trips_special_moves(tmp_path):
+    stats, path = write_book(tmp_path)
+    assert stats['lines'] == 8
+    assert stats['skipped'] == 2
+    with OpeningBook(path) as book:
+        assert len(book) == stats['entries']
+        # Waga to liczba wariantów przechodzących przez pozycję danym ruchem
+        moves = book.moves(chess.Board())
+        assert moves[0] == (chess.Move.from_uci('e2e4'), 3)
+        assert {move.uci(): weight for move, weight in moves} == {'e2e4': 3, 'd2d4': 1, 'g1f3': 1}
+        assert book.moves(board_after(['e4'])) == [(chess.Move.from_uci('e7e5'), 2), (chess.Move.from_uci('c7c5'), 1)]
+        assert book.moves(board_after(['e4', 'e5'])) == [(chess.Move.from_uci('g1f3'), 2)]
+        assert book.moves(board_after(['e4', 'e5', 'Nf3', 'Nc6', 'Bc4', 'Bc5'])) == [(chess.Move.from_uci('e1g1'), 1)]
+        assert book.moves(board_after(['d4', 'd5', 'Nc3', 'Nc6', 'Bf4', 'Bf5', 'Qd2', 'Qd7'])) == [(chess.Move.from_uci('e1c1'), 1)]
+        assert book.moves(chess.Board(PROMOTION_FEN)) == [(chess.Move.from_uci('e7e8n'), 1)]
+    # Plik jest zwykłą książką Polyglot
+    with chess.polyglot.open_reader(path) as reader:
+        assert reader.find(chess.Board()).move == chess.Move.from_uci('e2e4')
+
+def test_book_temperature(tmp_path):
+    _, path = write_book(tmp_path)
+    board = chess.Board()
+    with OpeningBook(path, temperature=0) as book:
+        assert {book.choose(board) for _ in range(20)} == {chess.Move.from_uci('e2e4')}
+        assert len({book.choose(board, temperature=1.0) for _ in range(200)}) == 3
+        board.push_uci('a2a3')
+        assert book.choose(board) is None
+
+def test_agent_plays_book_moves_without_network(tmp_path):
+    _, path = write_book(tmp_path)
+    agent = ChessAgent(opening_book=OpeningBook(path, temperature=0))
+    def forward(*args, **kwargs):
+        raise AssertionError("Przejście sieci dla pozycji z książki")
+    agent.policy_logits = forward
+    board = chess.Board()
+    assert agent.select_move(board, epsilon=0.0) == chess.Move.from_uci('e2e4')
+    board.push_uci('a2a3')
+    # Poza książką ruch wybiera sieć
+    with pytest.raises(AssertionError):
+        agent.select_move(board, epsilon=0.0)
+    agent.buffer.remember(0.0)
+    agent.buffer.end_episode()
+    _, _, actions, _ = agent.buffer.episodes[0]
+    assert actions.tolist() == [-1]
+
+def test_agent_prefers_book_over_epsilon(tmp_path):
+    _, path = write_book(tmp_path)
+    agent = ChessAgent(opening_book=OpeningBook(path, temperature=0))
+    board = chess.Board()
+    # Ruch z książki ma pierwszeństwo przed losowym ruchem eksploracji
+    assert {agent.select_move(board, epsilon=1.0) for _ in range(10)} == {chess.Move.from_uci('e2e4')}
+    board.push_uci('a2a3')
+    assert agent.select_move(board, epsilon=1.0) in board.legal_moves
+
+def test_batched_selection_prefers_book_over_epsilon(tmp_path):
+    _, path = write_book(tmp_path)
+    agent = ChessAgent(opening_book=OpeningBook(path, temperature=0))
+    off_book = chess.Board()
+    off_book.push_uci('a2a3')
+    for epsilon in (0.0, 1.0):
+        (book_move, book_action), (move, _) = agent.select_moves([chess.Board(), off_book], epsilon=epsilon)
+        assert (book_move, book_action) == (chess.Move.from_uci('e2e4'), -1)
+        assert move in off_book.legal_moves
@@ -0,0 +1,74 @@
+import sys
+import os
+import pytest
+import chess
+import numpy as np
+import torch
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from chess_utils import encode_batch, move_to_index
+from openings.dataset import ShardDataset, ShardSampler, collate_planes, shard_loader
+from openings.prepare_data import prepare
+
+@pytest.fixture(scope='module')
+def shards(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('openings')
+    board = chess.Board()
+    rows = []
+    for i in range(60):
+        moves = sorted(board.legal_moves, key=lambda move: move.uci())
+        if not moves:
+            break
+        move = moves[(7 * i) % len(moves)]
+        rows.append((board.fen(), move.uci()))
+        board.push(move)
+    with open(directory / 'fen_moves.tsv', 'w') as f:
+        f.write('FEN\tMove\n')
+        f.writelines(f"{fen}\t{move}\n" for fen, move in rows)
+    prepare(str(directory / 'fen_moves.tsv'), str(directory / 'shards'), shard_size=8, workers=0, val_fraction=0)
+    return str(directory / 'shards'), rows
+
+def test_batches_decode_to_reference_planes(shards):
+    directory, rows = shards
+    dataset = ShardDataset(directory, 'train')
+    assert len(dataset) == len(rows)
+    expected = encode_batch([chess.Board(fen) for fen, _ in rows])
+    expected_moves = torch.tensor([move_to_index(chess.Move.from_uci(move)) for _, move in rows])
+    indices = [len(rows) - 1, 0, 9, 8, 17]
+    planes, moves = collate_planes(dataset.__getitems__(indices))
+    assert planes.dtype == torch.float32
+    assert torch.equal(planes, expected[indices])
+    assert torch.equal(moves, expected_moves[indices])
+    # Pojedyncze próbki (bez __getitems__) dają ten sam wynik
+    single = collate_planes([dataset[i] for i in indices])
+    assert torch.equal(single[0], planes) and torch.equal(single[1], moves)
+    with pytest.raises(IndexError):
+        dataset.__getitems__([len(rows)])
+
+def test_sampler_visits_every_sample_once_per_epoch(shards):
+    dataset = ShardDataset(shards[0], 'train')
+    sampler = ShardSampler(dataset, seed=3)
+    first = list(sampler)
+    assert sorted(first) == list(range(len(dataset)))
+    assert list(sampler) == first
+    sampler.set_epoch(1)
+    assert list(sampler) != first
+    # Kolejne indeksy pochodzą z jednego sharda
+    shard_of = np.searchsorted(dataset.offsets, first, side='right') - 1
+    assert np.count_nonzero(np.diff(shard_of)) == len(dataset.shards) - 1
+
+def test_multi_worker_loader_matches_single_process(shards):
+    dataset = ShardDataset(shards[0], 'train')
+    single = list(shard_loader(dataset, batch_size=5, seed=1))
+    pooled = list(shard_loader(dataset, batch_size=5, seed=1, num_workers=2))
+    assert len(single) == len(pooled)
+    for (a, b), (c, d) in zip(single, pooled):
+        assert torch.equal(a, c) and torch.equal(b, d)
+    inputs, targets = dataset.tensors()
+    assert inputs.shape == (len(dataset), 12, 8, 8)
+    assert targets.dtype == torch.int64
@@ -0,0 +1,127 @@
+import sys
+import os
+import csv
+import gzip
+import importlib.util
+import random
+import chess
+import chess.pgn
+import numpy as np
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+# Skrypt machine_learning/datasets/openings.py wczytywany pod inną nazwą (openings to pakiet w src)
+spec = importlib.util.spec_from_file_location(
+    'openings_extractor', os.path.join(current_dir, '..', '..', 'datasets', 'openings.py'))
+extractor = importlib.util.module_from_spec(spec)
+sys.modules['openings_extractor'] = extractor
+spec.loader.exec_module(extractor)
+
+def random_games(count, plies, seed):
+    rng = random.Random(seed)
+    games = []
+    for i in range(count):
+        game = chess.pgn.Game()
+        game.headers['Event'] = f"Partia {i}"
+        node = game
+        board = chess.Board()
+        for _ in range(plies):
+            moves = sorted(board.legal_moves, key=lambda move: move.uci())
+            if not moves:
+                break
+            # Pierwsze ruchy powtarzają się między partiami
+            move = moves[0] if len(board.move_stack) < 2 else rng.choice(moves)
+            node = node.add_variation(move)
+            board.push(move)
+        games.append(game)
+    return games
+
+def read_pairs(path):
+    with open(path, newline='') as f:
+        return [(row['FEN'], row['Move']) for row in csv.DictReader(f, delimiter='\t')]
+
+def expected_pairs(games, max_plies=None):
+    pairs, seen = [], set()
+    for game in games:
+        board = game.board()
+        for move in list(game.mainline_moves())[:max_plies]:
+            key = (' '.join(board.fen().split()[:4]), move.uci())
+            if key not in seen:
+                seen.add(key)
+                pairs.append((board.fen(), move.uci()))
+            board.push(move)
+    return pairs
+
+def test_key_set_matches_python_set():
+    rng = np.random.default_rng(0)
+    keys = extractor.KeySet(min_recent=4, merge_ratio=2)
+    reference = set()
+    for _ in range(50):
+        batch = rng.integers(0, 300, size=20).astype(np.uint64)
+        expected = []
+        for key in batch.tolist():
+            expected.append(key not in reference)
+            reference.add(key)
+        assert keys.add(batch).tolist() == expected
+    assert len(keys) == len(reference)
+    assert keys.keys().tolist() == sorted(reference)
+
+def test_extracts_unique_pairs_from_compressed_and_plain_files(tmp_path):
+    games = random_games(12, 20, seed=1)
+    with open(tmp_path / 'a.pgn', 'w') as f:
+        for game in games[:6]:
+            print(game, file=f, end='\n\n')
+    with gzip.open(tmp_path / 'b.pgn.gz', 'wt') as f:
+        for game in games[6:]:
+            print(game, file=f, end='\n\n')
+    paths = [str(tmp_path / 'a.pgn'), str(tmp_path / 'b.pgn.gz')]
+    stats = extractor.extract(paths, str(tmp_path / 'single.tsv'), workers=0, games_per_chunk=5)
+    assert stats['games'] == 12
+    assert read_pairs(tmp_path / 'single.tsv') == expected_pairs(games)
+    assert stats['unique'] < stats['positions']
+
+    extractor.extract(paths, str(tmp_path / 'pooled.tsv'), workers=2, games_per_chunk=5)
+    assert read_pairs(tmp_path / 'pooled.tsv') == read_pairs(tmp_path / 'single.tsv')
+
+def test_catalogue_tsv_and_known_keys(tmp_path):
+    games = random_games(4, 8, seed=2)
+    with open(tmp_path / 'a.tsv', 'w') as f:
+        f.write('eco\tname\tpgn\n')
+        for game in games:
+            movetext = game.accept(chess.pgn.StringExporter(headers=False))
+            f.write(f"A00\tDebiut\t{movetext}\n")
+    seen = extractor.KeySet()
+    extractor.extract([str(tmp_path / 'a.tsv')], str(tmp_path / 'first.tsv'), workers=0, max_plies=4, seen=seen)
+    assert read_pairs(tmp_path / 'first.tsv') == expected_pairs(games, max_plies=4)
+    # Pary znane z poprzedniej ekstrakcji są pomijane
+    extractor.extract([str(tmp_path / 'a.tsv')], str(tmp_path / 'second.tsv'), workers=0, seen=seen)
+    first = set(read_pairs(tmp_path / 'first.tsv'))
+    assert read_pairs(tmp_path / 'second.tsv') == [pair for pair in expected_pairs(games) if pair not in first]
+
+def test_incremental_build_reextracts_changed_inputs(tmp_path):
+    games = random_games(8, 12, seed=3)
+    def write(name, selected):
+        with open(tmp_path / name, 'w') as f:
+            for game in selected:
+                print(game, file=f, end='\n\n')
+    write('a.pgn', games[:4])
+    write('b.pgn', games[4:])
+    paths = [str(tmp_path / 'a.pgn'), str(tmp_path / 'b.pgn')]
+    cache = str(tmp_path / 'build')
+    first = extractor.build(paths, str(tmp_path / 'out.tsv'), cache_dir=cache, workers=0)
+    assert len(first['extracted']) == 2
+    assert read_pairs(tmp_path / 'out.tsv') == expected_pairs(games)
+
+    assert extractor.build(paths, str(tmp_path / 'out.tsv'), cache_dir=cache, workers=0)['extracted'] == []
+
+    # Zmiana jednego wejścia: tylko ono jest wyodrębniane ponownie
+    write('b.pgn', games[4:6] + games[:1])
+    manifest = extractor.build(paths, str(tmp_path / 'out.tsv'), cache_dir=cache, workers=0)
+    assert manifest['extracted'] == [os.path.abspath(paths[1])]
+    assert read_pairs(tmp_path / 'out.tsv') == expected_pairs(games[:6])
+    full = extractor.build(paths, str(tmp_path / 'full.tsv'), cache_dir=str(tmp_path / 'full'), workers=0)
+    assert full['output']['sha256'] == manifest['output']['sha256']
@@ -0,0 +1,57 @@
+import sys
+import os
+import chess
+import torch
+import numpy as np
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from position_cache import PositionCache
+from chess_utils import board_to_tensor, legal_move_indices, encode_batch
+
+def _board(*sans):
+    board = chess.Board()
+    for san in sans:
+        board.push_san(san)
+    return board
+
+def test_entries_match_direct_computation():
+    cache = PositionCache()
+    for board in (chess.Board(), _board('e4', 'd5'), chess.Board(None)):
+        assert torch.equal(cache.tensor(board), board_to_tensor(board))
+        assert np.array_equal(cache.legal_indices(board), legal_move_indices(board))
+        assert cache.legal_moves(board) == list(board.legal_moves)
+
+def test_transpositions_share_entry():
+    cache = PositionCache()
+    cache.get(_board('Nf3', 'Nf6', 'Nc3'))
+    cache.get(_board('Nc3', 'Nf6', 'Nf3'))
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert len(cache) == 1
+
+def test_lru_eviction_respects_byte_budget():
+    cache_entry_bytes = PositionCache().get(chess.Board()).nbytes
+    cache = PositionCache(max_bytes=2 * cache_entry_bytes + 1)
+    boards = [chess.Board(), _board('e4'), _board('d4')]
+    cache.get(boards[0])
+    cache.get(boards[1])
+    cache.get(boards[0])  # boards[1] jest teraz najdawniej używany
+    cache.get(boards[2])
+
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.stats()['evictions'] >= 1
+    cache.get(boards[0])
+    assert cache.stats()['hits'] == 2
+
+def test_encode_batch_matches_uncached():
+    cache = PositionCache()
+    boards = [chess.Board(), _board('e4'), chess.Board(), _board('e4', 'e5')]
+    cache.get(boards[1])
+    out = cache.encode_batch(boards)
+    assert torch.equal(out, encode_batch(boards))
+    assert cache.stats()['misses'] == 3
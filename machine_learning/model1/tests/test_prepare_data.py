@@ -0,0 +1,141 @@
+import sys
+import os
+import chess
+import numpy as np
+import torch
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from chess_utils import bitboards_to_planes, encode_batch, move_to_index
+from openings.prepare_data import prepare
+from openings.shards import open_shard, read_manifest
+
+def unique_rows(rows):
+    seen = set()
+    result = []
+    for fen, move in rows:
+        key = (fen.rsplit(' ', 2)[0], move)
+        if key not in seen:
+            seen.add(key)
+            result.append((fen, move))
+    return result
+
+def write_tsv(path, plies=40):
+    board = chess.Board()
+    rows = []
+    for i in range(plies):
+        moves = sorted(board.legal_moves, key=lambda move: move.uci())
+        move = moves[i % len(moves)]
+        rows.append((board.fen(), move.uci()))
+        # Ta sama pozycja z innym ruchem
+        rows.append((board.fen(), moves[-1].uci()))
+        board.push(move)
+    with open(path, 'w') as f:
+        f.write('FEN\tMove\n')
+        for fen, move in rows:
+            f.write(f"{fen}\t{move}\n")
+        f.write('niepoprawny fen\te2e4\n')
+    return rows
+
+def read_split(directory, split):
+    manifest = read_manifest(directory)
+    planes, moves = [], []
+    for shard in manifest['splits'][split]['shards']:
+        shard_planes, shard_moves = open_shard(directory, shard)
+        planes.append(np.asarray(shard_planes))
+        moves.append(np.asarray(shard_moves))
+    return np.concatenate(planes), np.concatenate(moves)
+
+def test_shards_match_reference_encoding(tmp_path):
+    rows = unique_rows(write_tsv(tmp_path / 'fen_moves.tsv'))
+    output = str(tmp_path / 'shards')
+    manifest = prepare(str(tmp_path / 'fen_moves.tsv'), output, shard_size=16, chunk_size=7, workers=0, block_rows=8)
+    assert manifest['skipped'] == 1
+    assert all(shard['count'] <= 16 for split in manifest['splits'].values() for shard in split['shards'])
+    assert manifest['splits']['train']['count'] + manifest['splits']['val']['count'] == len(rows)
+
+    # Kolejność w zbiorach jest kolejnością wierszy pliku
+    train_planes, train_moves = read_split(output, 'train')
+    val_planes, val_moves = read_split(output, 'val')
+    planes = torch.from_numpy(bitboards_to_planes(np.concatenate([train_planes, val_planes])))
+    moves = np.concatenate([train_moves, val_moves])
+    boards = [chess.Board(fen) for fen, _ in rows]
+    expected = encode_batch(boards)
+    expected_moves = [move_to_index(chess.Move.from_uci(move)) for _, move in rows]
+    order = sorted(range(len(rows)), key=lambda i: (expected[i].numpy().tobytes(), expected_moves[i]))
+    got = sorted(range(len(rows)), key=lambda i: (planes[i].numpy().tobytes(), int(moves[i])))
+    assert torch.equal(planes[got], expected[order])
+    assert moves[got].tolist() == [expected_moves[i] for i in order]
+
+def test_split_keeps_positions_together(tmp_path):
+    write_tsv(tmp_path / 'fen_moves.tsv')
+    output = str(tmp_path / 'shards')
+    prepare(str(tmp_path / 'fen_moves.tsv'), output, workers=0, val_fraction=0.5)
+    train_positions = {row.tobytes() for row in read_split(output, 'train')[0]}
+    val_positions = {row.tobytes() for row in read_split(output, 'val')[0]}
+    assert train_positions and val_positions
+    assert not train_positions & val_positions
+
+def test_worker_pool_matches_single_process(tmp_path):
+    write_tsv(tmp_path / 'fen_moves.tsv')
+    single = str(tmp_path / 'single')
+    pooled = str(tmp_path / 'pooled')
+    prepare(str(tmp_path / 'fen_moves.tsv'), single, shard_size=10, chunk_size=5, workers=0)
+    prepare(str(tmp_path / 'fen_moves.tsv'), pooled, shard_size=10, chunk_size=5, workers=2)
+    assert read_manifest(single) == read_manifest(pooled)
+    for split in ('train', 'val'):
+        for a, b in zip(read_split(single, split), read_split(pooled, split)):
+            assert np.array_equal(a, b)
+
+def test_rebuild_removes_stale_shards(tmp_path):
+    write_tsv(tmp_path / 'fen_moves.tsv')
+    output = str(tmp_path / 'shards')
+    prepare(str(tmp_path / 'fen_moves.tsv'), output, shard_size=4, workers=0)
+    manifest = prepare(str(tmp_path / 'fen_moves.tsv'), output, shard_size=1000, workers=0)
+    (block,) = manifest['blocks']
+    assert sorted(os.listdir(output)) == sorted([
+        'manifest.json', block['keys'],
+        *(name for split in ('train', 'val') for shard in block['splits'][split] for name in (shard['planes'], shard['moves']))])
+    assert manifest['encoded_blocks'] == 1
+
+def split_positions(directory):
+    return {split: {(row.tobytes(), int(move)) for row, move in zip(*read_split(directory, split))}
+            for split in ('train', 'val')}
+
+def test_incremental_build_reencodes_only_changed_blocks(tmp_path):
+    path = tmp_path / 'fen_moves.tsv'
+    rows = write_tsv(path, plies=120)
+    output = str(tmp_path / 'shards')
+    first = prepare(str(path), output, workers=0, block_rows=16)
+    assert first['encoded_blocks'] == len(first['blocks']) > 3
+
+    # Bez zmian: nic nie jest kodowane ponownie
+    assert prepare(str(path), output, workers=0, block_rows=16, verify=True)['encoded_blocks'] == 0
+
+    # Zmiana wierszy w środku pliku: nowe wiersze i duplikat wiersza z innego bloku
+    middle = len(rows) // 2
+    changed = rows[:middle] + [(chess.Board().fen(), 'g1h3'), rows[0]] + rows[middle + 3:]
+    with open(path, 'w') as f:
+        f.write('FEN\tMove\n')
+        f.writelines(f"{fen}\t{move}\n" for fen, move in changed)
+        f.write('niepoprawny fen\te2e4\n')
+    incremental = prepare(str(path), output, workers=0, block_rows=16)
+    assert 0 < incremental['encoded_blocks'] <= 2
+
+    # Wynik jest równy pełnej przebudowie (te same próbki w tych samych zbiorach)
+    full = str(tmp_path / 'full')
+    rebuilt = prepare(str(path), full, workers=0, block_rows=16)
+    assert incremental['splits']['train']['count'] == rebuilt['splits']['train']['count']
+    assert split_positions(output) == split_positions(full)
+    assert sum(block['shared'] for block in incremental['blocks']) == 1
+
+def test_config_change_rebuilds_everything(tmp_path):
+    write_tsv(tmp_path / 'fen_moves.tsv')
+    output = str(tmp_path / 'shards')
+    prepare(str(tmp_path / 'fen_moves.tsv'), output, workers=0, block_rows=8)
+    manifest = prepare(str(tmp_path / 'fen_moves.tsv'), output, workers=0, block_rows=8, val_fraction=0.5)
+    assert manifest['encoded_blocks'] == len(manifest['blocks'])
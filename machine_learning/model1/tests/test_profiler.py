@@ -0,0 +1,79 @@
+import sys
+import os
+import time
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from profiler import NULL_PROFILER, PhaseProfiler
+
+def test_disabled_profiler_records_nothing():
+    profiler = PhaseProfiler(enabled=False)
+    profiler.start_episode(1)
+    with profiler.phase('forward'):
+        pass
+    profiler.end_episode()
+    assert len(profiler.history) == 0
+    assert NULL_PROFILER.phase('forward') is profiler.phase('learn')
+
+def test_phase_times_and_counts_per_episode():
+    profiler = PhaseProfiler(enabled=True)
+    profiler.start_episode(1)
+    for _ in range(3):
+        with profiler.phase('forward'):
+            time.sleep(0.001)
+    with profiler.phase('learn'):
+        pass
+    profiler.end_episode()
+
+    episode, num_episodes, wall, phases = profiler.history[0]
+    assert (episode, num_episodes) == (1, 1)
+    assert phases['forward'][1] == 3
+    assert phases['learn'][1] == 1
+    assert 0.003 <= phases['forward'][0] <= wall
+
+def test_summary_lists_phases_and_resets(caplog):
+    profiler = PhaseProfiler(enabled=True, summary_every=2)
+    with caplog.at_level('INFO', logger='profiler'):
+        for episode in (1, 2):
+            profiler.start_episode(episode)
+            with profiler.phase('stockfish_eval'):
+                pass
+            profiler.end_episode()
+    assert 'stockfish_eval' in caplog.text
+    assert 'other' in caplog.text
+    # Po podsumowaniu okno jest czyszczone, historia pozostaje
+    assert 'stockfish_eval' not in profiler.summary()
+    assert len(profiler.history) == 2
+
+def test_phase_outside_episode_is_ignored():
+    profiler = PhaseProfiler(enabled=True)
+    with profiler.phase('forward'):
+        pass
+    profiler.start_episode(1)
+    profiler.end_episode()
+    assert profiler.history[0][3] == {}
+
+def test_history_keeps_last_episodes():
+    profiler = PhaseProfiler(enabled=True, history_size=3)
+    for episode in range(1, 11):
+        profiler.start_episode(episode)
+        profiler.end_episode()
+    assert [record[0] for record in profiler.history] == [8, 9, 10]
+
+def test_trace_starts_for_batched_episodes(tmp_path):
+    trace_path = str(tmp_path / 'trace.json')
+    profiler = PhaseProfiler(trace_path=trace_path, trace_episodes=(5, 6), enabled=True)
+    # Grupy po 8 epizodów: zakres 5-6 mieści się w pierwszej grupie, która zaczyna się od epizodu 1
+    for episode in (1, 9, 17):
+        profiler.start_episode(episode, 8)
+        assert (profiler._trace is not None) == (episode == 1)
+        with profiler.phase('forward'):
+            pass
+        profiler.end_episode(8)
+        assert profiler._trace is None
+    profiler.close()
+    assert os.path.exists(trace_path)
@@ -0,0 +1,69 @@
+import sys
+import os
+import pytest
+import chess
+import torch
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from agent import ChessAgent
+from chess_utils import encode_batch
+from model import LuigiCNN
+from quantization import compare_accuracy, export_quantized, quantize_model
+
+def _inputs():
+    board = chess.Board()
+    boards = [board.copy()]
+    for uci in ['d2d4', 'g8f6', 'c2c4', 'e7e6']:
+        board.push_uci(uci)
+        boards.append(board.copy())
+    return encode_batch(boards)
+
+def test_quantized_model_close_to_float():
+    model = LuigiCNN()
+    model.eval()
+    quantized = quantize_model(model)
+    x = _inputs()
+    with torch.no_grad():
+        expected, _ = model(x, None)
+        actual, _ = quantized(x, None)
+    assert actual.shape == expected.shape
+    assert torch.allclose(actual, expected, atol=1e-2)
+    # Model źródłowy nie jest modyfikowany
+    assert isinstance(model.fc2, torch.nn.Linear)
+
+def test_compare_accuracy_agreement():
+    model = LuigiCNN()
+    model.eval()
+    x = _inputs()
+    targets = torch.zeros(len(x), dtype=torch.long)
+    metrics = compare_accuracy(model, quantize_model(model), x, targets, batch_size=2)
+    assert metrics['top1_agreement'] == pytest.approx(100.0)
+    assert metrics['float_accuracy'] == pytest.approx(metrics['quantized_accuracy'])
+
+def test_agent_loads_quantized_checkpoint(tmp_path):
+    agent = ChessAgent()
+    float_path = str(tmp_path / 'float.pth')
+    quantized_path = str(tmp_path / 'int8.pth')
+    agent.save_model(float_path)
+    export_quantized(float_path, quantized_path)
+
+    served = ChessAgent()
+    served.load_model(quantized_path)
+    assert served.quantized
+    board = chess.Board()
+    assert served.select_move(board, epsilon=0.0) in board.legal_moves
+    with pytest.raises(RuntimeError):
+        served.buffer.remember(1.0)
+        served.buffer.end_episode()
+        served.learn()
+
+    converted = ChessAgent()
+    converted.load_model(float_path, quantized=True)
+    assert converted.quantized
+    x = _inputs()
+    assert torch.allclose(converted.policy_logits(x), served.policy_logits(x))
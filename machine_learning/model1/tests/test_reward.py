@@ -0,0 +1,67 @@
+import sys
+import os
+import random
+import pytest
+import chess
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+import reward
+from reward import RewardEngine, RewardTrajectory, calculate_in_game_reward
+
+def random_moves(seed, plies=60):
+    # (poprzednia ocena, bieżąca ocena, plansza przed ruchem, plansza po ruchu, ruch)
+    rng = random.Random(seed)
+    board = chess.Board()
+    steps = []
+    previous_eval = rng.choice([None, 0])
+    for _ in range(plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        # Preferuj bicia, aby składnik materiałowy był niezerowy
+        captures = [move for move in moves if board.is_capture(move)]
+        move = rng.choice(captures or moves)
+        previous_board = board.copy()
+        board.push(move)
+        current_eval = rng.choice([None, 100000, -100000, 0, rng.randint(-900, 900)])
+        steps.append((previous_eval, current_eval, previous_board, board.copy(), move))
+        previous_eval = current_eval
+    return steps
+
+@pytest.mark.parametrize('weights', [(0.01, 0, 0), (0.01, 0.5, 0.1), (0.3, 1, 0), (0, 0, 0.25)])
+@pytest.mark.parametrize('agent_color', [chess.WHITE, chess.BLACK])
+def test_bit_identical_to_reference(monkeypatch, weights, agent_color):
+    alpha, beta, gamma = weights
+    monkeypatch.setattr(reward, 'ALPHA', alpha)
+    monkeypatch.setattr(reward, 'BETA', beta)
+    monkeypatch.setattr(reward, 'GAMMA', gamma)
+    engine = RewardEngine(alpha, beta, gamma)
+    for seed in range(3):
+        steps = random_moves(seed)
+        expected = [calculate_in_game_reward(p, c, agent_color, before, after, move).hex()
+                    for p, c, before, after, move in steps]
+        single = [engine.in_game_reward(p, c, agent_color, before, after, move).hex()
+                  for p, c, before, after, move in steps]
+        trajectory = RewardTrajectory(engine, agent_color)
+        for step in steps:
+            trajectory.add(*step)
+        batched = [value.hex() for value in trajectory.rewards()]
+        assert single == expected
+        assert batched == expected
+
+def test_default_engine_skips_board_features():
+    engine = RewardEngine()
+    assert not engine.needs_boards
+    trajectory = RewardTrajectory(engine, chess.WHITE)
+    # Plansze nie są potrzebne, gdy beta i gamma są zerowe
+    trajectory.add(10, 30, None, None, None)
+    trajectory.add(None, 30, None, None, None)
+    assert trajectory.rewards() == [0.01 * 20 + 0.0 + 0.0, 0.0]
+
+def test_empty_trajectory():
+    assert RewardTrajectory(RewardEngine(), chess.BLACK).rewards() == []
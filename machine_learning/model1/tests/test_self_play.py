@@ -0,0 +1,94 @@
+import sys
+import os
+import random
+import pytest
+import chess
+import numpy as np
+import torch
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from agent import ChessAgent
+from chess_utils import board_masks, legal_move_indices, index_to_move
+from environment import ChessEnvironment
+from self_play import play_batched_episodes
+
+def random_boards(count, seed=0, max_plies=30):
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randrange(max_plies)):
+            board.push(rng.choice(list(board.legal_moves)))
+            if board.is_game_over():
+                break
+        if not board.is_game_over():
+            boards.append(board)
+    return boards
+
+@pytest.fixture
+def env():
+    env = ChessEnvironment(stockfish_path='lite:depth_cap=1', stockfish_depth=1)
+    yield env
+    env.close()
+
+@pytest.mark.parametrize('agent_color', [chess.WHITE, chess.BLACK])
+def test_batched_episodes_fill_trajectories_and_buffer(env, agent_color):
+    torch.manual_seed(0)
+    random.seed(0)
+    agent = ChessAgent(agent_color=agent_color, update_every=float('inf'))
+    games = play_batched_episodes(agent, env, num_games=3, max_moves=12, epsilon=0.3)
+    assert len(games) == 3
+    for game in games:
+        assert game.done
+        assert game.move_count <= 12
+        assert game.board.is_game_over() or game.move_count == 12
+        assert game.result == game.board.result()
+        # Krok na każdy ruch agenta, nagroda na każdy ruch i nagroda końca gry
+        agent_moves = len(game.board.move_stack[0 if agent_color == chess.WHITE else 1::2])
+        assert len(game.states) == len(game.legal_indices) == len(game.actions) == agent_moves
+        assert len(game.rewards) == agent_moves + 1
+        assert game.total_reward == pytest.approx(sum(game.rewards))
+
+        # Zapisane stany i akcje odpowiadają pozycjom przed ruchami agenta
+        replay = chess.Board()
+        step = 0
+        for move in game.board.move_stack:
+            if replay.turn == agent_color:
+                assert tuple(game.states[step]) == tuple(board_masks(replay))
+                assert np.array_equal(game.legal_indices[step], legal_move_indices(replay))
+                action = game.actions[step]
+                assert action == -1 or index_to_move(replay, action) == move
+                step += 1
+            replay.push(move)
+
+    for game in games:
+        agent.store_episode(game.states, game.legal_indices, game.actions, game.rewards)
+    assert len(agent.buffer) == 3
+    for game, (states, legal_indices, actions, rewards) in zip(games, agent.buffer.episodes):
+        assert states.shape == (len(game.states), 12)
+        assert actions.tolist() == game.actions
+        assert rewards.tolist() == pytest.approx(game.rewards)
+        assert len(legal_indices) == len(game.legal_indices)
+
+def test_select_moves_matches_select_move():
+    torch.manual_seed(0)
+    agent = ChessAgent()
+    boards = random_boards(8)
+    # Wyostrzona polityka: losowanie z obu ścieżek wybiera najbardziej prawdopodobny legalny ruch
+    policy_logits = agent.policy_logits
+    agent.policy_logits = lambda states: policy_logits(states) * 1e6
+    selections = agent.select_moves(boards, epsilon=0.0)
+    assert len(selections) == len(boards)
+    for board, (move, action) in zip(boards, selections):
+        assert move in board.legal_moves
+        assert index_to_move(board, action) == move
+        assert agent.select_move(board, epsilon=0.0) == move
+    # select_moves nie zapisuje kroków w buforze agenta, select_move tak
+    agent.buffer.end_episode()
+    _, _, actions, _ = agent.buffer.episodes[0]
+    assert actions.tolist() == [action for _, action in selections]
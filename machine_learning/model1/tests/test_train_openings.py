@@ -0,0 +1,96 @@
+import sys
+import os
+import pytest
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from openings.train_openings import train_model, validate_model
+
+class TinyPolicy(torch.nn.Module):
+    # Mała sieć o interfejsie LuigiCNN (logity [B, 4096], wartość)
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(12 * 8 * 8, 4096)
+
+    def forward(self, x, action_mask):
+        return self.linear(x.flatten(1)), None
+
+def make_data(count, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    inputs = torch.randint(0, 2, (count, 12, 8, 8), generator=generator).float()
+    targets = torch.randint(0, 4096, (count,), generator=generator)
+    return TensorDataset(inputs, targets)
+
+def train(data, batch_size, accumulation_steps, epochs=1):
+    torch.manual_seed(0)
+    model = TinyPolicy()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.5)
+    loader = DataLoader(data, batch_size=batch_size, shuffle=False)
+    losses, _, _, _ = train_model(model, loader, None, optimizer, torch.nn.CrossEntropyLoss(), epochs=epochs,
+                                  accumulation_steps=accumulation_steps, device=torch.device('cpu'))
+    return model, losses
+
+def test_accumulation_matches_large_batch():
+    data = make_data(64)
+    large, large_losses = train(data, batch_size=32, accumulation_steps=1, epochs=2)
+    accumulated, accumulated_losses = train(data, batch_size=8, accumulation_steps=4, epochs=2)
+    for a, b in zip(large.parameters(), accumulated.parameters()):
+        assert torch.allclose(a, b, atol=1e-5)
+    # Suma strat partii: cztery razy więcej partii o średnio tej samej stracie
+    assert accumulated_losses[0] == pytest.approx(4 * large_losses[0], rel=1e-4)
+
+def test_partial_accumulation_steps_at_epoch_end():
+    data = make_data(40)
+    # 5 partii po 8 przy 4 na krok: krok ze średniej 4 partii (32 próbki) i krok z ostatniej partii (8 próbek)
+    accumulated, _ = train(data, batch_size=8, accumulation_steps=4)
+    large, _ = train(data, batch_size=32, accumulation_steps=1)
+    for a, b in zip(large.parameters(), accumulated.parameters()):
+        assert torch.allclose(a, b, atol=1e-5)
+    assert all(parameter.grad is None for parameter in accumulated.parameters())
+
+def test_early_stopping_restores_best_weights():
+    torch.manual_seed(0)
+    model = TinyPolicy()
+    # Zbyt duży krok: strata walidacji przestaje się poprawiać po kilku epokach
+    optimizer = torch.optim.SGD(model.parameters(), lr=1e3)
+    train_loader = DataLoader(make_data(32, seed=1), batch_size=8)
+    val_loader = DataLoader(make_data(32, seed=2), batch_size=8)
+    criterion = torch.nn.CrossEntropyLoss()
+    train_losses, val_losses, _, _ = train_model(model, train_loader, val_loader, optimizer, criterion, epochs=50,
+                                                 patience=2, device=torch.device('cpu'))
+    assert len(train_losses) < 50
+    assert len(val_losses) == len(train_losses)
+    val_loss, _ = validate_model(model, val_loader, criterion, device=torch.device('cpu'))
+    assert val_loss == pytest.approx(min(val_losses))
+
+def test_validation_cadence():
+    torch.manual_seed(0)
+    model = TinyPolicy()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    train_loader = DataLoader(make_data(16), batch_size=8)
+    val_loader = DataLoader(make_data(16, seed=1), batch_size=8)
+    train_losses, val_losses, val_accuracies, val_epochs = train_model(
+        model, train_loader, val_loader, optimizer, torch.nn.CrossEntropyLoss(), epochs=6, val_every=3,
+        log_every=1, device=torch.device('cpu'))
+    assert len(train_losses) == 6
+    assert len(val_losses) == len(val_accuracies) == 2
+    assert val_epochs == [3, 6]
+
+def test_validation_epochs_when_epochs_not_multiple_of_cadence():
+    torch.manual_seed(0)
+    model = TinyPolicy()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    train_loader = DataLoader(make_data(16), batch_size=8)
+    val_loader = DataLoader(make_data(16, seed=1), batch_size=8)
+    train_losses, val_losses, _, val_epochs = train_model(
+        model, train_loader, val_loader, optimizer, torch.nn.CrossEntropyLoss(), epochs=5, val_every=2,
+        device=torch.device('cpu'))
+    assert len(train_losses) == 5
+    assert len(val_losses) == 2
+    assert val_epochs == [2, 4]
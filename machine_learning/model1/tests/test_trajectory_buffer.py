@@ -0,0 +1,51 @@
+import sys
+import os
+import pytest
+import numpy as np
+
+# Add the src directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.join(current_dir, '..', 'src')
+
+
+sys.path.insert(0, parent_dir)
+from trajectory_buffer import TrajectoryBuffer, discounted_returns
+
+def _loop_returns(rewards, gamma):
+    # Pętla z dawnej wersji ChessAgent.learn
+    discounted = []
+    R = 0
+    for r in reversed(rewards):
+        R = r + gamma * R
+        discounted.insert(0, R)
+    return discounted
+
+@pytest.mark.parametrize("length", [0, 1, 5, 64, 65, 1000])
+@pytest.mark.parametrize("gamma", [0.0, 1e-6, 0.5, 0.95, 0.99, 1.0])
+def test_discounted_returns_match_loop(length, gamma):
+    rewards = np.random.default_rng(length).normal(size=length) * 10
+    rewards[-1:] = 1000.0  # Nagroda końcowa
+    np.testing.assert_allclose(discounted_returns(rewards, gamma), _loop_returns(list(rewards), gamma),
+                               rtol=1e-9, atol=1e-9)
+
+def test_batch_aligns_steps_with_returns_and_skips_off_policy():
+    buffer = TrajectoryBuffer()
+    masks = [1 << i for i in range(12)]
+    for action, reward in [(5, 1.0), (-1, 2.0), (7, 3.0)]:
+        buffer.record(masks, np.array([5, 7], dtype=np.int16), action)
+        buffer.remember(reward)
+    buffer.remember(100.0)  # Nagroda końca gry
+    buffer.end_episode()
+    buffer.add_episode([masks], [np.array([9], dtype=np.int16)], [9], [4.0])
+
+    assert len(buffer) == 2
+    states, legal_indices, actions, returns = buffer.batch(gamma=0.5)
+    expected = _loop_returns([1.0, 2.0, 3.0, 100.0], 0.5)
+    assert actions.tolist() == [5, 7, 9]
+    np.testing.assert_allclose(returns, [expected[0], expected[2], 4.0])
+    assert states.shape == (3, 12) and states.dtype == np.uint64
+    assert [idx.tolist() for idx in legal_indices] == [[5, 7], [5, 7], [9]]
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert len(buffer.batch(gamma=0.5)[2]) == 0
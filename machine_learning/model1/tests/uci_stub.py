@@ -0,0 +1,46 @@
+# Minimalny silnik UCI do testów: ocena = różnica materiału, ruch = pierwszy legalny ruch
+import sys
+import time
+import chess
+
+VALUES = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+def main():
+    board = chess.Board()
+    delay = 0.0
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        command = parts[0]
+        if command == 'uci':
+            print('id name UciStub')
+            print('option name Delay type spin default 0 min 0 max 100000')
+            print('uciok')
+        elif command == 'isready':
+            print('readyok')
+        elif command == 'setoption' and parts[2] == 'Delay':
+            delay = int(parts[4]) / 1000
+        elif command == 'position':
+            board = chess.Board() if parts[1] == 'startpos' else chess.Board(' '.join(parts[2:8]))
+            if 'moves' in parts:
+                for uci in parts[parts.index('moves') + 1:]:
+                    board.push_uci(uci)
+        elif command == 'go':
+            time.sleep(delay)
+            depth = int(parts[parts.index('depth') + 1]) if 'depth' in parts else 1
+            score = sum(VALUES[piece.piece_type] * (1 if piece.color == board.turn else -1)
+                        for piece in board.piece_map().values())
+            moves = sorted(board.legal_moves, key=lambda move: move.uci())
+            if moves:
+                print(f'info depth {depth} score cp {score} pv {moves[0].uci()}')
+                print(f'bestmove {moves[0].uci()}')
+            else:
+                print('info depth 0 score mate 0')
+                print('bestmove (none)')
+        elif command == 'quit':
+            break
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()